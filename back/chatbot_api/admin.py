@@ -1,3 +1,10 @@
 from django.contrib import admin
+from .models import GenerationJob
 
-# Register your models here.
+
+@admin.register(GenerationJob)
+class GenerationJobAdmin(admin.ModelAdmin):
+    list_display = ['topic', 'program', 'track', 'difficulty', 'type', 'status', 'attempts', 'created_at', 'finished_at']
+    list_filter = ['status', 'program', 'difficulty', 'created_at']
+    search_fields = ['topic', 'error']
+    readonly_fields = ['challenge', 'attempts', 'created_at', 'started_at', 'finished_at']
@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+
+from chatbot_api.models import GenerationJob
+from chatbot_api.services import (
+    DEFAULT_BATCH_TYPE,
+    DEFAULT_DIFFICULTIES,
+    DEFAULT_PROGRAMS,
+    DEFAULT_TRACKS,
+    claim_batch,
+    enqueue_generation_batch,
+    run_batch,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Generates challenges for every program x track x difficulty combination '
+        '(by default the 36 challenge badge slots; certificates use the HARD ones).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--programs', nargs='+', default=DEFAULT_PROGRAMS, help='Programs (default: all)')
+        parser.add_argument('--tracks', nargs='+', default=DEFAULT_TRACKS, help='Tracks (default: trails 1 to 4)')
+        parser.add_argument(
+            '--difficulties',
+            nargs='+',
+            default=DEFAULT_DIFFICULTIES,
+            help='Difficulties, as EASY/MEDIUM/HARD or Fácil/Médio/Difícil (default: all)'
+        )
+        parser.add_argument('--type', default=DEFAULT_BATCH_TYPE, help='Challenge type (Cálculo or Discursiva)')
+        parser.add_argument('--topic', help='Topic of every challenge (default: the track and program)')
+        parser.add_argument('--workers', type=int, help='Challenges generated in parallel')
+        parser.add_argument(
+            '--enqueue',
+            action='store_true',
+            help='Only queue the batch for run_generation_worker instead of generating it now'
+        )
+
+    def handle(self, *args, **options):
+        batch = enqueue_generation_batch(
+            options['programs'],
+            options['tracks'],
+            options['difficulties'],
+            options['type'],
+            options['topic']
+        )
+        total = GenerationJob.objects.filter(batch=batch).count()
+        self.stdout.write(f'Batch {batch}: {total} challenge(s) queued')
+
+        if options['enqueue']:
+            return
+
+        jobs = run_batch(claim_batch(batch), max_workers=options['workers'])
+        for job in jobs:
+            if job.status == GenerationJob.Status.SUCCEEDED:
+                self.stdout.write(f'  ✅ {job.program} - {job.track} - {job.difficulty}: challenge {job.challenge_id}')
+            else:
+                self.stdout.write(f'  ❌ {job.program} - {job.track} - {job.difficulty}: {job.error}')
+
+        succeeded = sum(job.status == GenerationJob.Status.SUCCEEDED for job in jobs)
+        self.stdout.write(self.style.SUCCESS(f'{succeeded}/{len(jobs)} challenge(s) generated'))
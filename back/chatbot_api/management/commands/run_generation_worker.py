@@ -0,0 +1,139 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from chatbot_api.rag_loader import get_rag_pipeline
+from chatbot_api.services import (
+    DEFAULT_MAX_ATTEMPTS, DEFAULT_STALE_AFTER, claim_batch, claim_next_job, requeue_stale_jobs, run_batch, run_job
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _run_jobs_in_thread(jobs):
+    """Run a job, or the jobs of a batch together, on a pool thread, releasing the thread's DB connection afterwards"""
+    try:
+        if len(jobs) == 1 and jobs[0].batch is None:
+            return [run_job(jobs[0])]
+        return run_batch(jobs)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = 'Processes the queued challenge generation jobs with a pool of worker threads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Number of challenges generated in parallel'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Seconds to wait before checking an empty queue again'
+        )
+        parser.add_argument(
+            '--stale-after',
+            type=int,
+            default=int(DEFAULT_STALE_AFTER.total_seconds()),
+            help='Seconds after which a running job of a stopped worker is queued again'
+        )
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            default=DEFAULT_MAX_ATTEMPTS,
+            help='Number of times an abandoned job is claimed before it is marked failed'
+        )
+        parser.add_argument(
+            '--requeue-interval',
+            type=float,
+            default=60.0,
+            help='Seconds between two checks for jobs abandoned by a stopped worker'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit when the queue is empty instead of waiting for new jobs'
+        )
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        stale_after = timedelta(seconds=options['stale_after'])
+
+        self._requeue_stale_jobs(stale_after, options['max_attempts'])
+        last_requeue = time.monotonic()
+
+        # Load the knowledge base once, before the pool threads share the pipeline
+        self.stdout.write('Loading RAG pipeline...')
+        if get_rag_pipeline() is None:
+            self.stdout.write(self.style.WARNING('RAG pipeline not available, jobs will save fallback challenges'))
+
+        self.stdout.write(f'Generation worker started with {workers} thread(s)')
+        # Future of each running job (or batch) -> its jobs
+        running = {}
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='generation-job') as executor:
+            try:
+                while True:
+                    # Fill the free threads with pending jobs
+                    while len(running) < workers:
+                        job = claim_next_job()
+                        if job is None:
+                            break
+                        if job.batch is None:
+                            self.stdout.write(f'Job {job.id} started: {job.topic}')
+                            jobs = [job]
+                        else:
+                            # The whole batch runs together (one retrieval per topic, one bulk insert)
+                            jobs = [job] + claim_batch(job.batch)
+                            self.stdout.write(f'Batch {job.batch} started: {len(jobs)} job(s)')
+                        running[executor.submit(_run_jobs_in_thread, jobs)] = jobs
+
+                    if running:
+                        done, _ = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                        for future in done:
+                            jobs = running.pop(future)
+                            try:
+                                finished = future.result()
+                            except Exception as e:
+                                # The outcome could not be recorded (e.g. a database error): the jobs stay
+                                # running and are requeued once stale, the worker keeps going
+                                logger.exception('Generation jobs %s crashed', [job.id for job in jobs])
+                                self.stderr.write(self.style.ERROR(
+                                    f'Job(s) {", ".join(str(job.id) for job in jobs)} crashed: {e}'
+                                ))
+                                continue
+                            for job in finished:
+                                self.stdout.write(f'Job {job.id} {job.status.lower()}')
+                    elif options['once']:
+                        break
+                    else:
+                        close_old_connections()
+                        time.sleep(options['poll_interval'])
+
+                    if time.monotonic() - last_requeue >= options['requeue_interval']:
+                        running_ids = [job.id for jobs in running.values() for job in jobs]
+                        self._requeue_stale_jobs(stale_after, options['max_attempts'], running_ids)
+                        last_requeue = time.monotonic()
+            except KeyboardInterrupt:
+                self.stdout.write('Stopping: waiting for the running jobs to finish...')
+
+        self.stdout.write(self.style.SUCCESS('Generation worker stopped'))
+
+    def _requeue_stale_jobs(self, stale_after, max_attempts, running_ids=()):
+        """Requeue the jobs abandoned by stopped workers; a database error is logged, not raised"""
+        try:
+            requeued = requeue_stale_jobs(stale_after, max_attempts, exclude_ids=running_ids)
+        except Exception as e:
+            logger.exception('Could not requeue abandoned generation jobs')
+            self.stderr.write(self.style.ERROR(f'Could not requeue abandoned jobs: {e}'))
+            return
+        if requeued:
+            self.stdout.write(f'Requeued {requeued} abandoned job(s)')
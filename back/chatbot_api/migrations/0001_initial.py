@@ -0,0 +1,40 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('questions', '0004_discursivequestion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GenerationJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('program', models.CharField(max_length=100)),
+                ('track', models.CharField(max_length=100)),
+                ('topic', models.CharField(max_length=200)),
+                ('difficulty', models.CharField(max_length=50)),
+                ('type', models.CharField(max_length=50)),
+                ('status', models.CharField(choices=[('PENDING', 'Pendente'), ('RUNNING', 'Em execução'), ('SUCCEEDED', 'Concluído'), ('FAILED', 'Falhou')], default='PENDING', max_length=10)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('challenge', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='generation_jobs', to='questions.challenge')),
+            ],
+            options={
+                'verbose_name': 'Generation job',
+                'verbose_name_plural': 'Generation jobs',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='chatbot_api_status_e8e115_idx')],
+            },
+        ),
+    ]
@@ -1,3 +1,49 @@
 from django.db import models
 
-# Create your models here.
+
+class GenerationJob(models.Model):
+    """
+    Challenge generation request, queued by the API and processed by the
+    run_generation_worker management command
+    """
+
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'Pendente'
+        RUNNING = 'RUNNING', 'Em execução'
+        SUCCEEDED = 'SUCCEEDED', 'Concluído'
+        FAILED = 'FAILED', 'Falhou'
+
+    # Generation parameters, as sent by the admin UI
+    program = models.CharField(max_length=100)
+    track = models.CharField(max_length=100)
+    topic = models.CharField(max_length=200)
+    difficulty = models.CharField(max_length=50)
+    type = models.CharField(max_length=50)
+
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    challenge = models.ForeignKey(
+        'questions.Challenge',
+        on_delete=models.SET_NULL,
+        related_name='generation_jobs',
+        blank=True,
+        null=True
+    )
+    error = models.TextField(blank=True, null=True)
+    # Jobs queued together by the bulk endpoint share a batch and are generated together
+    batch = models.UUIDField(blank=True, null=True, db_index=True)
+    attempts = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        verbose_name = "Generation job"
+        verbose_name_plural = "Generation jobs"
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.topic} ({self.get_status_display()})"
@@ -5,7 +5,7 @@ RAG Pipeline Loader - Manages a single instance of the RAGPipeline
 import sys
 import os
 import logging
-import shutil
+import threading
 from typing import Optional
 
 # Add the chatbot module to the Python path
@@ -20,12 +20,22 @@ logger = logging.getLogger(__name__)
 
 # Global variable to store the unique instance
 _rag_pipeline_instance = None
+# Async views call the loader from worker threads: only one of them may build the pipeline
+_rag_pipeline_lock = threading.Lock()
 
 def get_rag_pipeline():
     """
     Returns the unique instance of the RAGPipeline.
-    If it doesn't exist, creates a new instance with forced rebuild.
+    If it doesn't exist, creates a new instance and loads the persisted knowledge base.
     """
+    if _rag_pipeline_instance is not None:
+        return _rag_pipeline_instance
+    
+    with _rag_pipeline_lock:
+        return _create_rag_pipeline()
+
+def _create_rag_pipeline():
+    """Create the instance if no other thread did it first (called with the lock held)"""
     global _rag_pipeline_instance
     
     if _rag_pipeline_instance is None:
@@ -58,31 +68,30 @@ def get_rag_pipeline():
             except Exception as e:
                 logger.error(f"Error listing files: {e}")
             
-            # Force cleanup of existing vector store to ensure fresh rebuild with OCR
+            # The vector store is persisted between boots; the manifest stored next to it
+            # tells the pipeline which documents changed since the last build
             persist_directory = os.path.join(project_root, "data", "chroma_db")
-            if os.path.exists(persist_directory):
-                logger.info(f"Removing existing vector store at {persist_directory}")
-                try:
-                    shutil.rmtree(persist_directory)
-                    logger.info("Existing vector store removed successfully")
-                except Exception as e:
-                    logger.warning(f"Could not remove existing vector store: {e}")
             
             # Create the instance with memory-optimized parameters
             logger.info("Creating RAGPipeline instance with memory optimization...")
-            _rag_pipeline_instance = RAGPipeline(
+            # Built into a local variable: the lock-free fast path of get_rag_pipeline must
+            # never hand out a pipeline whose knowledge base is still loading
+            pipeline = RAGPipeline(
                 documents_path=documents_path,
                 persist_directory=persist_directory,
                 chunk_size=600,  # Reduced for memory optimization
-                chunk_overlap=50   # Reduced for memory optimization
+                chunk_overlap=50,  # Reduced for memory optimization
+                # Optional cross-encoder re-ranking, e.g. cross-encoder/mmarco-mMiniLMv2-L12-H384-v1
+                rerank_model=os.getenv("RAG_RERANK_MODEL") or None
             )
             
-            # Build the knowledge base with force rebuild
-            logger.info("Building knowledge base with OCR support...")
-            success = _rag_pipeline_instance.build_knowledge_base(force_rebuild=True)
+            # Load the knowledge base, re-indexing only the documents that changed
+            logger.info("Loading knowledge base...")
+            success = pipeline.build_knowledge_base()
             
             if success:
                 logger.info("✅ RAGPipeline initialized successfully with OCR support")
+                _rag_pipeline_instance = pipeline
             else:
                 logger.warning("⚠️ RAGPipeline could not be initialized completely")
                 
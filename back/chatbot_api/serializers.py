@@ -1,4 +1,6 @@
 from rest_framework import serializers
+from questions.serializers import ChallengeSerializer
+from .models import GenerationJob
 
 
 class ChatMessageSerializer(serializers.Serializer):
@@ -36,6 +38,33 @@ class QuestionGenerationSerializer(serializers.Serializer):
         fields = ['program', 'track', 'topic', 'difficulty', 'type']
 
 
+class GenerationBatchSerializer(serializers.Serializer):
+    """Serializer for bulk challenge generation requests (one challenge per program x track x difficulty)"""
+    programs = serializers.ListField(
+        child=serializers.CharField(max_length=100),
+        required=False,
+        allow_empty=False,
+        help_text="Programs (default: all)"
+    )
+    tracks = serializers.ListField(
+        child=serializers.CharField(max_length=100),
+        required=False,
+        allow_empty=False,
+        help_text="Tracks (default: trails 1 to 4)"
+    )
+    difficulties = serializers.ListField(
+        child=serializers.CharField(max_length=50),
+        required=False,
+        allow_empty=False,
+        help_text="Difficulty levels (default: all)"
+    )
+    type = serializers.CharField(max_length=50, required=False, help_text="Challenge type (default: Cálculo)")
+    topic = serializers.CharField(max_length=200, required=False, help_text="Topic of every challenge (default: the track and program)")
+    
+    class Meta:
+        fields = ['programs', 'tracks', 'difficulties', 'type', 'topic']
+
+
 class QuestionResponseSerializer(serializers.Serializer):
     """Serializer for generated question responses"""
     topic = serializers.CharField(help_text="Question topic")
@@ -56,4 +85,14 @@ class QuestionResponseSerializer(serializers.Serializer):
     documents_used = serializers.IntegerField(help_text="Number of documents used to generate the question")
     
     class Meta:
-        fields = ['topic', 'question', 'options', 'answer', 'explanation', 'difficulty', 'sources', 'confidence', 'avg_score', 'documents_used'] 
\ No newline at end of file
+        fields = ['topic', 'question', 'options', 'answer', 'explanation', 'difficulty', 'sources', 'confidence', 'avg_score', 'documents_used']
+
+
+class GenerationJobSerializer(serializers.ModelSerializer):
+    """Serializer for challenge generation jobs (the challenge is included once generated)"""
+    challenge = ChallengeSerializer(read_only=True)
+    
+    class Meta:
+        model = GenerationJob
+        fields = ['id', 'status', 'program', 'track', 'topic', 'difficulty', 'type', 'challenge', 'error', 'created_at', 'started_at', 'finished_at']
+        read_only_fields = fields
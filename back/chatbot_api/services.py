@@ -0,0 +1,545 @@
+"""
+Challenge generation services - generation with the RAG pipeline, persistence and the job queue
+"""
+
+import json
+import logging
+import re
+import uuid
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from progress.models import get_trail_name
+from questions.models import Program, Track, Challenge, Source, ProblemQuestion, DiscursiveQuestion, MultipleChoiceQuestion, Question
+from .models import GenerationJob
+from .rag_loader import get_rag_pipeline
+
+logger = logging.getLogger(__name__)
+
+# Jobs running for longer than this were abandoned by a stopped worker
+DEFAULT_STALE_AFTER = timedelta(minutes=15)
+# Abandoned jobs are requeued until they were claimed this many times, then marked failed
+DEFAULT_MAX_ATTEMPTS = 3
+
+# Default matrix of the bulk generation: every badge slot (program x trail x difficulty)
+DEFAULT_PROGRAMS = ['PROIND', 'PRODEPE', 'PRODEAUTO']
+DEFAULT_TRACKS = [get_trail_name(trail) for trail in range(1, 5)]
+DEFAULT_DIFFICULTIES = [label for _, label in Question.Difficulty.choices]
+# Certificates draw from the calculation questions of the HARD challenges
+DEFAULT_BATCH_TYPE = 'Cálculo'
+
+
+class GenerationError(Exception):
+    """The RAG pipeline could not generate a valid challenge"""
+
+
+def fallback_challenge_data(topic):
+    """Placeholder content saved when the RAG pipeline is not available"""
+    return {
+        "sources": [{"file_name": "fallback.txt"}],
+        "challenges": [
+            {
+                "challenge": f"Desafio sobre {topic}: Explique os conceitos fundamentais relacionados ao tema {topic}.",
+                "challenge_answer": "Resposta esperada sobre os conceitos fundamentais do tema.",
+                "challenge_justification": "Esta questão aborda os conceitos básicos necessários para compreender o tema."
+            }
+        ],
+        "questions": [
+            {
+                "question": f"Qual é a importância do tema {topic}?",
+                "options": {
+                    "A": "Opção A",
+                    "B": "Opção B",
+                    "C": "Opção C",
+                    "D": "Opção D",
+                    "E": "Opção E"
+                },
+                "correct_answer": "A",
+                "question_justification": "Justificativa da resposta correta."
+            }
+        ]
+    }
+
+
+def validate_generated_data(question_data):
+    """
+    Parse and validate the response of the RAG pipeline before attempting DB writes
+
+    Returns:
+        dict: Generated sources, challenges and questions
+
+    Raises:
+        GenerationError: If the response is an error or is malformed
+    """
+    if isinstance(question_data, str):
+        try:
+            question_data = json.loads(question_data)
+        except json.JSONDecodeError:
+            raise GenerationError("Invalid question format from RAG pipeline")
+
+    if not isinstance(question_data, dict):
+        raise GenerationError("Unexpected format from RAG pipeline")
+
+    if question_data.get("error"):
+        raise GenerationError(question_data.get("error"))
+
+    required_top_level_keys = ["sources", "challenges", "questions"]
+    missing_keys = [k for k in required_top_level_keys if k not in question_data]
+    if missing_keys:
+        raise GenerationError(f"Missing keys in AI response: {', '.join(missing_keys)}")
+
+    return question_data
+
+
+def _decimal_answer(raw_answer):
+    """Parse the numeric answer of a calculation challenge (accept formats with comma or dot)"""
+    match = re.search(r"[-+]?\d+[\.,]?\d*", str(raw_answer))
+    if not match:
+        raise ValueError("challenge_answer must include a decimal number for calculation type")
+    normalized_number = match.group(0).replace(',', '.')
+    try:
+        return Decimal(normalized_number)
+    except InvalidOperation:
+        raise ValueError("Invalid decimal value in challenge_answer")
+
+
+def _is_discursive(type):
+    """Whether a challenge type is saved as discursive (instead of calculation) questions"""
+    is_calculation = str(type).strip().lower().startswith(('calc', 'cálc', 'c\u00e1lc'))
+    is_discursive = str(type).strip().lower().startswith(('disc', 'discur', 'discurs', 'discursiva'))
+    return is_discursive and not is_calculation
+
+
+def _question_rows(type, question_data, validate=True):
+    """
+    Build the unsaved question rows of a generated challenge (the challenge is set when saving)
+
+    Returns:
+        tuple: (discursive or problem questions, multiple choice questions)
+
+    Raises:
+        ValueError: If an item of the response is malformed
+    """
+    discursive = _is_discursive(type)
+    challenge_rows = []
+    for pq_data in question_data.get('challenges', []):
+        if validate and not all(key in pq_data for key in ['challenge', 'challenge_answer', 'challenge_justification']):
+            raise ValueError("Malformed 'challenges' item from AI response")
+        if discursive:
+            challenge_rows.append(DiscursiveQuestion(
+                statement=pq_data['challenge'],
+                answer_text=pq_data['challenge_answer'],
+                justification=pq_data['challenge_justification']
+            ))
+        else:
+            challenge_rows.append(ProblemQuestion(
+                statement=pq_data['challenge'],
+                correct_answer=_decimal_answer(pq_data['challenge_answer']) if validate else Decimal('0.0'),
+                justification=pq_data['challenge_justification']
+            ))
+
+    question_rows = []
+    for mcq_data in question_data.get('questions', []):
+        if validate:
+            if not all(key in mcq_data for key in ['question', 'options', 'correct_answer', 'question_justification']):
+                raise ValueError("Malformed 'questions' item from AI response")
+            options = mcq_data['options']
+            if not isinstance(options, dict) or not all(k in options for k in ['A','B','C','D','E']):
+                raise ValueError("Options must include A, B, C, D, E")
+        question_rows.append(MultipleChoiceQuestion(
+            statement=mcq_data['question'],
+            option_a=mcq_data['options']['A'],
+            option_b=mcq_data['options']['B'],
+            option_c=mcq_data['options']['C'],
+            option_d=mcq_data['options']['D'],
+            option_e=mcq_data['options']['E'],
+            correct_option=mcq_data['correct_answer'],
+            justification=mcq_data['question_justification']
+        ))
+
+    return challenge_rows, question_rows
+
+
+def resolve_sources(file_names):
+    """
+    Get or create the sources of generated challenges with a few queries
+
+    Args:
+        file_names (iterable): File names of the sources
+
+    Returns:
+        dict: Source of each file name
+    """
+    file_names = set(file_names)
+    if not file_names:
+        return {}
+
+    sources = {source.file_name: source for source in Source.objects.filter(file_name__in=file_names)}
+    missing = file_names - sources.keys()
+    if missing:
+        # ignore_conflicts: another worker may create the same source concurrently
+        Source.objects.bulk_create([Source(file_name=file_name) for file_name in missing], ignore_conflicts=True)
+        sources.update((source.file_name, source) for source in Source.objects.filter(file_name__in=missing))
+    return sources
+
+
+def save_challenges(items):
+    """
+    Persist many generated challenges with one bulk insert per table
+
+    Args:
+        items (list): Dicts with the "program", "track", "topic", "difficulty", "type" and
+            "question_data" of each challenge, plus optional "title" and "validate"
+
+    Returns:
+        list: Persisted Challenge of each item, or the ValueError of a malformed item, in order
+    """
+    difficulty_map = {v: k for k, v in Question.Difficulty.choices}
+    results = [None] * len(items)
+    prepared = []
+    for index, item in enumerate(items):
+        try:
+            rows = _question_rows(item['type'], item['question_data'], item.get('validate', True))
+        except ValueError as e:
+            results[index] = e
+            continue
+        prepared.append((index, item, rows))
+
+    if not prepared:
+        return results
+
+    # Sources have a unique file name, so they are safely resolved before the transaction
+    sources = resolve_sources(
+        source_data['file_name']
+        for _, item, _ in prepared
+        for source_data in item['question_data'].get('sources', [])
+    )
+
+    with transaction.atomic():
+        # Track names are not unique: lock the program row so concurrent workers cannot
+        # both miss the track and create it twice. A batch spans a few programs and
+        # tracks: resolve each once
+        tracks = {}
+        for _, item, _ in prepared:
+            key = (item['program'].upper(), item['track'].capitalize())
+            if key not in tracks:
+                program, _ = Program.objects.get_or_create(name=key[0])
+                program = Program.objects.select_for_update().get(pk=program.pk)
+                tracks[key], _ = Track.objects.get_or_create(program=program, name=key[1])
+
+        challenges = Challenge.objects.bulk_create([
+            Challenge(
+                track=tracks[(item['program'].upper(), item['track'].capitalize())],
+                title=item.get('title') or f"{item['topic'].capitalize()}",
+                difficulty=difficulty_map.get(item['difficulty'].capitalize(), Question.Difficulty.MEDIUM),
+                status=Challenge.ChallengeStatus.PENDING
+            )
+            for _, item, _ in prepared
+        ])
+
+        source_links = []
+        rows_by_model = {DiscursiveQuestion: [], ProblemQuestion: [], MultipleChoiceQuestion: []}
+        for challenge, (index, item, (challenge_rows, question_rows)) in zip(challenges, prepared):
+            results[index] = challenge
+            linked = {source_data['file_name'] for source_data in item['question_data'].get('sources', [])}
+            source_links.extend(
+                Challenge.sources.through(challenge_id=challenge.id, source_id=sources[file_name].id)
+                for file_name in linked
+            )
+            for row in challenge_rows + question_rows:
+                row.challenge = challenge
+                rows_by_model[type(row)].append(row)
+
+        Challenge.sources.through.objects.bulk_create(source_links)
+        for model, rows in rows_by_model.items():
+            if rows:
+                model.objects.bulk_create(rows)
+
+    return results
+
+
+def save_challenge(program_name, track_name, topic, difficulty, type, question_data, title=None, validate=True):
+    """
+    Persist a generated challenge with its sources and questions in one short transaction
+
+    Args:
+        program_name (str): Program of the challenge
+        track_name (str): Track of the challenge
+        topic (str): Topic, used as title by default
+        difficulty (str): Difficulty label (e.g. "Médio")
+        type (str): Challenge type ("Discursiva" or "Cálculo")
+        question_data (dict): Generated sources, challenges and questions
+        title (str): Title of the challenge
+        validate (bool): Reject malformed items (the fallback content is trusted and
+            saves calculation answers as 0)
+
+    Returns:
+        Challenge: Persisted challenge
+
+    Raises:
+        ValueError: If an item of the response is malformed
+    """
+    challenge, = save_challenges([{
+        'program': program_name,
+        'track': track_name,
+        'topic': topic,
+        'difficulty': difficulty,
+        'type': type,
+        'question_data': question_data,
+        'title': title,
+        'validate': validate
+    }])
+    if isinstance(challenge, ValueError):
+        raise challenge
+    return challenge
+
+
+def generate_challenge(program_name, track_name, topic, difficulty, type):
+    """
+    Generate a challenge with the RAG pipeline and persist it
+
+    Returns:
+        Challenge: Persisted challenge (placeholder content when the pipeline is not available)
+
+    Raises:
+        GenerationError: If the pipeline response is an error or is malformed
+        ValueError: If an item of the response is malformed
+    """
+    # Use the loader to get the unique instance of the RAGPipeline
+    pipeline = get_rag_pipeline()
+
+    if pipeline is None:
+        # Fallback challenge when pipeline is not available
+        return save_challenge(
+            program_name, track_name, topic, difficulty, type,
+            fallback_challenge_data(topic),
+            title=f"{topic.capitalize()} (Fallback)",
+            validate=False
+        )
+
+    question_data = validate_generated_data(pipeline.generate_challenges_and_questions(topic, difficulty, type))
+    return save_challenge(program_name, track_name, topic, difficulty, type, question_data)
+
+
+def enqueue_generation(program_name, track_name, topic, difficulty, type):
+    """Queue a challenge generation for the worker"""
+    return GenerationJob.objects.create(
+        program=program_name,
+        track=track_name,
+        topic=topic,
+        difficulty=difficulty,
+        type=type
+    )
+
+
+def default_topic(program_name, track_name):
+    """Topic of a bulk generated challenge when none is given"""
+    return f"{track_name} - {program_name}"
+
+
+def difficulty_label(difficulty):
+    """Accept a difficulty as key ("HARD") or label ("Difícil") and return the label"""
+    return dict(Question.Difficulty.choices).get(str(difficulty).upper(), difficulty)
+
+
+def enqueue_generation_batch(programs, tracks, difficulties, type, topic=None):
+    """
+    Queue one job per program x track x difficulty combination, as one batch
+
+    Returns:
+        uuid.UUID: Batch ID
+    """
+    batch = uuid.uuid4()
+    GenerationJob.objects.bulk_create([
+        GenerationJob(
+            program=program_name,
+            track=track_name,
+            topic=topic or default_topic(program_name, track_name),
+            difficulty=difficulty_label(difficulty),
+            type=type,
+            batch=batch
+        )
+        for program_name in programs
+        for track_name in tracks
+        for difficulty in difficulties
+    ])
+    return batch
+
+
+def _claim(job_id):
+    """Switch a pending job to running; False if another worker claimed it first"""
+    return GenerationJob.objects.filter(id=job_id, status=GenerationJob.Status.PENDING).update(
+        status=GenerationJob.Status.RUNNING,
+        started_at=timezone.now(),
+        attempts=F('attempts') + 1
+    ) == 1
+
+
+def claim_next_job():
+    """
+    Take the oldest pending job
+
+    The status is switched with a conditional update, so concurrent workers (threads or
+    processes) never run the same job
+
+    Returns:
+        GenerationJob: Claimed job, or None if the queue is empty
+    """
+    while True:
+        job_id = (
+            GenerationJob.objects
+            .filter(status=GenerationJob.Status.PENDING)
+            .order_by('created_at', 'id')
+            .values_list('id', flat=True)
+            .first()
+        )
+        if job_id is None:
+            return None
+
+        if _claim(job_id):
+            return GenerationJob.objects.get(id=job_id)
+
+
+def claim_batch(batch):
+    """
+    Take the pending jobs of a batch
+
+    Returns:
+        list: Claimed jobs, in queue order
+    """
+    job_ids = list(
+        GenerationJob.objects
+        .filter(batch=batch, status=GenerationJob.Status.PENDING)
+        .values_list('id', flat=True)
+    )
+    claimed_ids = [job_id for job_id in job_ids if _claim(job_id)]
+    return list(GenerationJob.objects.filter(id__in=claimed_ids).order_by('created_at', 'id'))
+
+
+def requeue_stale_jobs(stale_after, max_attempts=DEFAULT_MAX_ATTEMPTS, exclude_ids=()):
+    """
+    Put back in the queue the jobs left running by a worker that stopped. Jobs that
+    were already claimed max_attempts times are marked failed instead, so a job that
+    keeps crashing its worker is not retried forever
+
+    Args:
+        stale_after (timedelta): Running time after which a job is considered abandoned
+        max_attempts (int): Number of claims after which an abandoned job fails
+        exclude_ids (iterable): Jobs still running in the calling worker
+
+    Returns:
+        int: Number of jobs requeued
+    """
+    now = timezone.now()
+    stale = GenerationJob.objects.filter(
+        status=GenerationJob.Status.RUNNING,
+        started_at__lt=now - stale_after
+    ).exclude(id__in=list(exclude_ids))
+
+    failed = stale.filter(attempts__gte=max_attempts).update(
+        status=GenerationJob.Status.FAILED,
+        error=f"Generation abandoned after {max_attempts} attempts",
+        finished_at=now
+    )
+    if failed:
+        logger.warning(f"{failed} abandoned generation job(s) reached {max_attempts} attempts and failed")
+
+    return stale.filter(attempts__lt=max_attempts).update(status=GenerationJob.Status.PENDING)
+
+
+def run_job(job):
+    """Generate the challenge of a claimed job and record the outcome"""
+    logger.info(f"Running generation job {job.id}: {job.topic}")
+    try:
+        challenge = generate_challenge(job.program, job.track, job.topic, job.difficulty, job.type)
+    except GenerationError as e:
+        job.status = GenerationJob.Status.FAILED
+        job.error = str(e)
+    except ValueError as e:
+        job.status = GenerationJob.Status.FAILED
+        job.error = f"Error saving generated challenge to the database: {str(e)}"
+    except Exception as e:
+        logger.exception(f"Generation job {job.id} failed")
+        job.status = GenerationJob.Status.FAILED
+        job.error = f"Error generating question: {str(e)}"
+    else:
+        job.status = GenerationJob.Status.SUCCEEDED
+        job.challenge = challenge
+        job.error = None
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'challenge', 'error', 'finished_at'])
+    logger.info(f"Generation job {job.id} finished: {job.status}")
+    return job
+
+
+def run_batch(jobs, max_workers=None):
+    """
+    Generate the challenges of claimed batch jobs together: one retrieval per topic,
+    model calls in parallel and bulk inserts
+
+    Args:
+        jobs (list): Claimed jobs
+        max_workers (int): Challenges generated in parallel (pipeline default if None)
+
+    Returns:
+        list: Jobs with their outcome recorded
+    """
+    if not jobs:
+        return jobs
+    logger.info(f"Running generation batch {jobs[0].batch}: {len(jobs)} jobs")
+
+    items = {}
+    try:
+        pipeline = get_rag_pipeline()
+        if pipeline is None:
+            # Fallback challenges when pipeline is not available
+            for job in jobs:
+                items[job.id] = {
+                    'question_data': fallback_challenge_data(job.topic),
+                    'title': f"{job.topic.capitalize()} (Fallback)",
+                    'validate': False
+                }
+        else:
+            results = pipeline.generate_challenge_set(
+                [{"topic": job.topic, "difficulty": job.difficulty, "type": job.type} for job in jobs],
+                max_workers=max_workers
+            )
+            for job, question_data in zip(jobs, results):
+                try:
+                    items[job.id] = {'question_data': validate_generated_data(question_data)}
+                except GenerationError as e:
+                    job.status = GenerationJob.Status.FAILED
+                    job.error = str(e)
+
+        saving = [job for job in jobs if job.id in items]
+        saved = save_challenges([
+            dict(items[job.id], program=job.program, track=job.track, topic=job.topic, difficulty=job.difficulty, type=job.type)
+            for job in saving
+        ])
+        for job, challenge in zip(saving, saved):
+            if isinstance(challenge, ValueError):
+                job.status = GenerationJob.Status.FAILED
+                job.error = f"Error saving generated challenge to the database: {str(challenge)}"
+            else:
+                job.status = GenerationJob.Status.SUCCEEDED
+                job.challenge = challenge
+                job.error = None
+    except Exception as e:
+        logger.exception(f"Generation batch {jobs[0].batch} failed")
+        for job in jobs:
+            if job.status == GenerationJob.Status.RUNNING:
+                job.status = GenerationJob.Status.FAILED
+                job.error = f"Error generating question: {str(e)}"
+
+    finished_at = timezone.now()
+    for job in jobs:
+        job.finished_at = finished_at
+    GenerationJob.objects.bulk_update(jobs, ['status', 'challenge', 'error', 'finished_at'])
+    succeeded = sum(job.status == GenerationJob.Status.SUCCEEDED for job in jobs)
+    logger.info(f"Generation batch {jobs[0].batch} finished: {succeeded}/{len(jobs)} succeeded")
+    return jobs
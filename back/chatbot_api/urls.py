@@ -1,5 +1,8 @@
 from django.urls import path
-from .views import ChatbotChatView, QuestionGenerationView, health_check
+from .views import (
+    ChatbotChatView, ChatbotChatStreamView, QuestionGenerationView, GenerationJobStatusView,
+    GenerationBatchView, GenerationBatchStatusView, health_check
+)
 
 app_name = 'chatbot_api'
 
@@ -10,6 +13,16 @@ urlpatterns = [
     # Chat endpoint
     path('chat/', ChatbotChatView.as_view(), name='chat'),
     
+    # Streaming chat endpoint (Server-Sent Events)
+    path('chat/stream/', ChatbotChatStreamView.as_view(), name='chat_stream'),
+    
     # Question generation endpoint
     path('generate-question/', QuestionGenerationView.as_view(), name='generate_question'),
+    
+    # Status of a queued challenge generation
+    path('generate-question/jobs/<int:job_id>/', GenerationJobStatusView.as_view(), name='generation_job'),
+    
+    # Bulk challenge generation (programs x tracks x difficulties) and its status
+    path('generate-question/batch/', GenerationBatchView.as_view(), name='generation_batch'),
+    path('generate-question/batch/<uuid:batch_id>/', GenerationBatchStatusView.as_view(), name='generation_batch_status'),
 ] 
\ No newline at end of file
@@ -9,58 +9,101 @@ from .serializers import (
     ChatMessageSerializer, 
     ChatResponseSerializer,
     QuestionGenerationSerializer,
-    QuestionResponseSerializer
+    QuestionResponseSerializer,
+    GenerationBatchSerializer,
+    GenerationJobSerializer
 )
 
 # Import the loader of the RAGPipeline
 from .rag_loader import get_rag_pipeline, is_initialized
-from django.db import transaction
-from questions.models import Program, Track, Challenge, Source, ProblemQuestion, DiscursiveQuestion, MultipleChoiceQuestion, Question
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from .models import GenerationJob
+from .services import (
+    DEFAULT_BATCH_TYPE,
+    DEFAULT_DIFFICULTIES,
+    DEFAULT_PROGRAMS,
+    DEFAULT_TRACKS,
+    enqueue_generation,
+    enqueue_generation_batch
+)
+
+
+def _chat_request_data(request):
+    """Return the chat payload, accepting JSON, text/plain and form bodies (None if the JSON is invalid)"""
+    body = request.body.decode('utf-8')
+    # Handle different content types
+    if request.content_type == 'text/plain':
+        # If content is text/plain, try to parse as JSON
+        try:
+            return json.loads(body)
+        except json.JSONDecodeError:
+            # If not JSON, treat as plain text message
+            return {'message': body}
+    if request.content_type == 'application/json':
+        try:
+            return json.loads(body or '{}')
+        except json.JSONDecodeError:
+            return None
+    return request.POST.dict()
+
+
+def _sse_event(event, data):
+    """Format a Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+async def _validated_chat_message(request):
+    """
+    Validate the chat request and load the pipeline
 
+    Returns:
+        tuple: (message, pipeline, None) or (None, None, error JsonResponse)
+    """
+    data = _chat_request_data(request)
+    if data is None:
+        return None, None, JsonResponse({"detail": "JSON parse error"}, status=status.HTTP_400_BAD_REQUEST)
 
-class ChatbotChatView(APIView):
-    """API endpoint for chatting with the RAG chatbot"""
+    serializer = ChatMessageSerializer(data=data)
+    if not serializer.is_valid():
+        return None, None, JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    # Use the loader to get the unique instance of the RAGPipeline (it may build the
+    # knowledge base on first use, so it runs outside the event loop)
+    pipeline = await sync_to_async(get_rag_pipeline, thread_sensitive=False)()
+    if pipeline is None:
+        # Fallback for when pipeline is not initialized
+        return None, None, JsonResponse(
+            {"error": "RAG pipeline not initialized"}, 
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+
+    return serializer.validated_data['message'], pipeline, None
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ChatbotChatView(View):
+    """API endpoint for chatting with the RAG chatbot (async: the worker is free while the AI model answers)"""
     
-    def post(self, request):
-        # Handle different content types
-        if request.content_type == 'text/plain':
-            # If content is text/plain, try to parse as JSON
-            try:
-                import json
-                data = json.loads(request.body.decode('utf-8'))
-            except json.JSONDecodeError:
-                # If not JSON, treat as plain text message
-                data = {'message': request.body.decode('utf-8')}
-        else:
-            data = request.data
+    async def post(self, request):
         """Handle chat messages"""
-        serializer = ChatMessageSerializer(data=data)
-        
-        if not serializer.is_valid():
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        user_message, pipeline, error_response = await _validated_chat_message(request)
+        if error_response is not None:
+            return error_response
         
         try:
-            user_message = serializer.validated_data['message']
-            
-            # Use the loader to get the unique instance of the RAGPipeline
-            pipeline = get_rag_pipeline()
-            
-            if pipeline is None:
-                # Fallback for when pipeline is not initialized
-                return Response(
-                    {"error": "RAG pipeline not initialized"}, 
-                    status=status.HTTP_503_SERVICE_UNAVAILABLE
-                )
-            
             # Get response from chatbot
-            response = pipeline.chat(user_message)
+            response = await pipeline.achat(user_message)
             
             # Parse the JSON response from the RAG pipeline
             if isinstance(response, str):
                 try:
                     response = json.loads(response)
                 except json.JSONDecodeError:
-                    return Response(
+                    return JsonResponse(
                         {"error": "Invalid question format from RAG pipeline"}, 
                         status=status.HTTP_500_INTERNAL_SERVER_ERROR
                     )
@@ -75,265 +118,132 @@ class ChatbotChatView(APIView):
                 'documents_used': response.get('documents_used', 0)
             }
             
-            return Response(response_data, status=status.HTTP_200_OK)
+            return JsonResponse(response_data, status=status.HTTP_200_OK)
             
         except Exception as e:
-            return Response(
+            return JsonResponse(
                 {"error": f"Error processing chat: {str(e)}"}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
 
+@method_decorator(csrf_exempt, name='dispatch')
+class ChatbotChatStreamView(View):
+    """API endpoint for chatting with the RAG chatbot, streaming the answer as Server-Sent Events"""
+    
+    async def post(self, request):
+        """
+        Handle chat messages. Events: "sources" first, then one "token" per generated
+        fragment and "done" with the full response ("error" on failure)
+        """
+        user_message, pipeline, error_response = await _validated_chat_message(request)
+        if error_response is not None:
+            return error_response
+        
+        async def events():
+            async for event in pipeline.achat_stream(user_message):
+                yield _sse_event(event["event"], event["data"])
+        
+        response = StreamingHttpResponse(events(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Disable proxy buffering so tokens reach the client as they are generated
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
 class QuestionGenerationView(APIView):
-    """API endpoint for generating multiple choice questions"""
+    """API endpoint for generating challenges (queued: the worker generates them in the background)"""
     
     def post(self, request):
-        """Generate a multiple choice question"""
+        """Queue a challenge generation and return the job to poll"""
         serializer = QuestionGenerationSerializer(data=request.data)
         
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            # Get data from serializer
-            program_name = serializer.validated_data['program']
-            track_name = serializer.validated_data['track']
-            topic = serializer.validated_data['topic']
-            difficulty = serializer.validated_data.get('difficulty', 'medium')
-            type = serializer.validated_data.get('type', 'Discursiva')
-            
-            # Use the loader to get the unique instance of the RAGPipeline
-            pipeline = get_rag_pipeline()
-            
-            if pipeline is None:
-                # Fallback response when pipeline is not available
-                fallback_response = {
-                    "sources": [{"file_name": "fallback.txt"}],
-                    "challenges": [
-                        {
-                            "challenge": f"Desafio sobre {topic}: Explique os conceitos fundamentais relacionados ao tema {topic}.",
-                            "challenge_answer": "Resposta esperada sobre os conceitos fundamentais do tema.",
-                            "challenge_justification": "Esta questão aborda os conceitos básicos necessários para compreender o tema."
-                        }
-                    ],
-                    "questions": [
-                        {
-                            "question": f"Qual é a importância do tema {topic}?",
-                            "options": {
-                                "A": "Opção A",
-                                "B": "Opção B", 
-                                "C": "Opção C",
-                                "D": "Opção D",
-                                "E": "Opção E"
-                            },
-                            "correct_answer": "A",
-                            "question_justification": "Justificativa da resposta correta."
-                        }
-                    ]
-                }
-                
-                # Save fallback challenge to database
-                try:
-                    with transaction.atomic():
-                        # Map difficulty from "Médio" to "MEDIUM"
-                        difficulty_map = {v: k for k, v in Question.Difficulty.choices}
-                        difficulty_enum = difficulty_map.get(difficulty.capitalize(), Question.Difficulty.MEDIUM)
-
-                        # Get or create Program and Track
-                        program, _ = Program.objects.get_or_create(name=program_name.upper())
-                        track, _ = Track.objects.get_or_create(program=program, name=track_name.capitalize())
-
-                        # Create Challenge
-                        challenge = Challenge.objects.create(
-                            track=track,
-                            title=f"{topic.capitalize()} (Fallback)",
-                            difficulty=difficulty_enum,
-                            status=Challenge.ChallengeStatus.PENDING
-                        )
-
-                        # Create and associate sources
-                        source_objects = []
-                        for source_data in fallback_response.get('sources', []):
-                            source, _ = Source.objects.get_or_create(file_name=source_data['file_name'])
-                            source_objects.append(source)
-                        challenge.sources.add(*source_objects)
-                        
-                        # Create Discursive or Problem Questions based on type
-                        is_calculation = str(type).strip().lower().startswith(('calc', 'cálc', 'c\u00e1lc'))
-                        is_discursive = str(type).strip().lower().startswith(('disc', 'discur', 'discurs', 'discursiva'))
-                        for pq_data in fallback_response.get('challenges', []):
-                            if is_discursive and not is_calculation:
-                                DiscursiveQuestion.objects.create(
-                                    challenge=challenge,
-                                    statement=pq_data['challenge'],
-                                    answer_text=pq_data['challenge_answer'],
-                                    justification=pq_data['challenge_justification']
-                                )
-                            else:
-                                from decimal import Decimal
-                                ProblemQuestion.objects.create(
-                                    challenge=challenge,
-                                    statement=pq_data['challenge'],
-                                    correct_answer=Decimal('0.0'),
-                                    justification=pq_data['challenge_justification']
-                                )
-                        
-                        # Create Multiple Choice Questions
-                        for mcq_data in fallback_response.get('questions', []):
-                            MultipleChoiceQuestion.objects.create(
-                                challenge=challenge,
-                                statement=mcq_data['question'],
-                                option_a=mcq_data['options']['A'],
-                                option_b=mcq_data['options']['B'],
-                                option_c=mcq_data['options']['C'],
-                                option_d=mcq_data['options']['D'],
-                                option_e=mcq_data['options']['E'],
-                                correct_option=mcq_data['correct_answer'],
-                                justification=mcq_data['question_justification']
-                            )
-                    
-                    # Return the persisted challenge
-                    from questions.serializers import ChallengeSerializer
-                    serialized = ChallengeSerializer(challenge)
-                    return Response(serialized.data, status=status.HTTP_200_OK)
-                    
-                except Exception as e:
-                    return Response(
-                        {"error": f"Error creating fallback challenge: {str(e)}"}, 
-                        status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                    )
-            
-            # Generate question
-            question_data = pipeline.generate_challenges_and_questions(topic, difficulty, type)
+            job = enqueue_generation(
+                serializer.validated_data['program'],
+                serializer.validated_data['track'],
+                serializer.validated_data['topic'],
+                serializer.validated_data.get('difficulty', 'medium'),
+                serializer.validated_data.get('type', 'Discursiva')
+            )
+            return Response(GenerationJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
             
-            # Parse the JSON response from the RAG pipeline
-            if isinstance(question_data, str):
-                try:
-                    question_data = json.loads(question_data)
-                except json.JSONDecodeError:
-                    return Response(
-                        {"error": "Invalid question format from RAG pipeline"}, 
-                        status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                    )
-
-            # Validate AI response before attempting DB writes
-            if not isinstance(question_data, dict):
-                return Response(
-                    {"error": "Unexpected format from RAG pipeline"},
-                    status=status.HTTP_502_BAD_GATEWAY
-                )
-
-            if question_data.get("error"):
-                return Response(
-                    {"error": question_data.get("error")},
-                    status=status.HTTP_502_BAD_GATEWAY
-                )
-
-            required_top_level_keys = ["sources", "challenges", "questions"]
-            missing_keys = [k for k in required_top_level_keys if k not in question_data]
-            if missing_keys:
-                return Response(
-                    {"error": f"Missing keys in AI response: {', '.join(missing_keys)}"},
-                    status=status.HTTP_502_BAD_GATEWAY
-                )
-
-            # --- Save to database ---
-            try:
-                with transaction.atomic():
-                    # Map difficulty from "Médio" to "MEDIUM"
-                    difficulty_map = {v: k for k, v in Question.Difficulty.choices}
-                    difficulty_enum = difficulty_map.get(difficulty.capitalize(), Question.Difficulty.MEDIUM)
-
-                    # Get or create Program and Track
-                    program, _ = Program.objects.get_or_create(name=program_name.upper())
-                    track, _ = Track.objects.get_or_create(program=program, name=track_name.capitalize())
-
-                    # Create Challenge
-                    challenge = Challenge.objects.create(
-                        track=track,
-                        title=f"{topic.capitalize()}",
-                        difficulty=difficulty_enum,
-                        status=Challenge.ChallengeStatus.PENDING
-                    )
+        except Exception as e:
+            return Response(
+                {"error": f"Error queuing question generation: {str(e)}"}, 
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
 
-                    # Create and associate sources
-                    source_objects = []
-                    for source_data in question_data.get('sources', []):
-                        source, _ = Source.objects.get_or_create(file_name=source_data['file_name'])
-                        source_objects.append(source)
-                    challenge.sources.add(*source_objects)
-                    
-                    # Create Discursive or Problem Questions based on type
-                    is_calculation = str(type).strip().lower().startswith(('calc', 'cálc', 'c\u00e1lc'))
-                    is_discursive = str(type).strip().lower().startswith(('disc', 'discur', 'discurs', 'discursiva'))
-                    for pq_data in question_data.get('challenges', []):
-                        if not all(key in pq_data for key in ['challenge', 'challenge_answer', 'challenge_justification']):
-                            raise ValueError("Malformed 'challenges' item from AI response")
-                        if is_discursive and not is_calculation:
-                            DiscursiveQuestion.objects.create(
-                                challenge=challenge,
-                                statement=pq_data['challenge'],
-                                answer_text=pq_data['challenge_answer'],
-                                justification=pq_data['challenge_justification']
-                            )
-                        else:
-                            # Parse decimal answer (accept formats with comma or dot)
-                            from decimal import Decimal, InvalidOperation
-                            import re
-                            raw_answer = str(pq_data['challenge_answer'])
-                            match = re.search(r"[-+]?\d+[\.,]?\d*", raw_answer)
-                            if not match:
-                                raise ValueError("challenge_answer must include a decimal number for calculation type")
-                            normalized_number = match.group(0).replace(',', '.')
-                            try:
-                                decimal_answer = Decimal(normalized_number)
-                            except InvalidOperation:
-                                raise ValueError("Invalid decimal value in challenge_answer")
-                            ProblemQuestion.objects.create(
-                                challenge=challenge,
-                                statement=pq_data['challenge'],
-                                correct_answer=decimal_answer,
-                                justification=pq_data['challenge_justification']
-                            )
-                    
-                    # Create Multiple Choice Questions
-                    for mcq_data in question_data.get('questions', []):
-                        if not all(key in mcq_data for key in ['question', 'options', 'correct_answer', 'question_justification']):
-                            raise ValueError("Malformed 'questions' item from AI response")
-                        options = mcq_data['options']
-                        if not isinstance(options, dict) or not all(k in options for k in ['A','B','C','D','E']):
-                            raise ValueError("Options must include A, B, C, D, E")
-                        MultipleChoiceQuestion.objects.create(
-                            challenge=challenge,
-                            statement=mcq_data['question'],
-                            option_a=mcq_data['options']['A'],
-                            option_b=mcq_data['options']['B'],
-                            option_c=mcq_data['options']['C'],
-                            option_d=mcq_data['options']['D'],
-                            option_e=mcq_data['options']['E'],
-                            correct_option=mcq_data['correct_answer'],
-                            justification=mcq_data['question_justification']
-                        )
-            except Exception as e:
-                # If database saving fails, return an error but don't expose details
-                return Response(
-                    {"error": f"Error saving generated challenge to the database: {str(e)}"},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                )
-            # --- End of save to database ---
 
-            # Return the persisted challenge with IDs so the frontend can edit
-            from questions.serializers import ChallengeSerializer
-            serialized = ChallengeSerializer(challenge)
-            return Response(serialized.data, status=status.HTTP_200_OK)
+class GenerationJobStatusView(APIView):
+    """API endpoint for polling a challenge generation job"""
+    
+    def get(self, request, job_id):
+        """Return the job status, with the persisted challenge once it succeeded"""
+        job = GenerationJob.objects.select_related('challenge').filter(id=job_id).first()
+        if job is None:
+            return Response({"error": "Generation job not found"}, status=status.HTTP_404_NOT_FOUND)
+        
+        return Response(GenerationJobSerializer(job).data, status=status.HTTP_200_OK)
+
+
+def _batch_status(batch):
+    """Summarize the jobs of a batch"""
+    jobs = list(GenerationJob.objects.filter(batch=batch).select_related('challenge'))
+    counts = {choice: 0 for choice in GenerationJob.Status.values}
+    for job in jobs:
+        counts[job.status] += 1
+    return {
+        "batch": str(batch),
+        "total": len(jobs),
+        "counts": counts,
+        "finished": counts[GenerationJob.Status.PENDING] + counts[GenerationJob.Status.RUNNING] == 0,
+        "jobs": GenerationJobSerializer(jobs, many=True).data
+    }
+
+
+class GenerationBatchView(APIView):
+    """API endpoint for generating challenges in bulk across programs, tracks and difficulties"""
+    
+    def post(self, request):
+        """Queue one challenge per program x track x difficulty combination as a batch"""
+        serializer = GenerationBatchSerializer(data=request.data)
+        
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            batch = enqueue_generation_batch(
+                serializer.validated_data.get('programs', DEFAULT_PROGRAMS),
+                serializer.validated_data.get('tracks', DEFAULT_TRACKS),
+                serializer.validated_data.get('difficulties', DEFAULT_DIFFICULTIES),
+                serializer.validated_data.get('type', DEFAULT_BATCH_TYPE),
+                serializer.validated_data.get('topic')
+            )
+            return Response(_batch_status(batch), status=status.HTTP_202_ACCEPTED)
             
         except Exception as e:
             return Response(
-                {"error": f"Error generating question: {str(e)}"}, 
+                {"error": f"Error queuing challenge batch: {str(e)}"}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
 
+class GenerationBatchStatusView(APIView):
+    """API endpoint for polling a bulk challenge generation"""
+    
+    def get(self, request, batch_id):
+        """Return the status of every job of the batch"""
+        data = _batch_status(batch_id)
+        if not data["total"]:
+            return Response({"error": "Generation batch not found"}, status=status.HTTP_404_NOT_FOUND)
+        
+        return Response(data, status=status.HTTP_200_OK)
+
+
 @api_view(['GET'])
 def health_check(request):
     """Health check endpoint"""
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0004_discursivequestion'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='challenge',
+            index=models.Index(fields=['track', 'status', 'difficulty'], name='questions_c_track_i_059e32_idx'),
+        ),
+    ]
@@ -131,6 +131,12 @@ class Challenge(models.Model):
     )
     sources = models.ManyToManyField('Source', related_name='challenges')
 
+    class Meta:
+        indexes = [
+            # Certificate tests draw from the approved HARD challenges of a track
+            models.Index(fields=['track', 'status', 'difficulty']),
+        ]
+
     def __str__(self):
         return self.title or f"Challenge {self.id}"
 
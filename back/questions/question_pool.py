@@ -0,0 +1,85 @@
+"""
+Certificate question pool - IDs of the questions certificate tests draw from, cached per track
+"""
+
+import random
+import threading
+import time
+
+from .models import Challenge, ProblemQuestion, Question
+
+CERTIFICATE_QUESTION_COUNT = 5
+# Signals clear the pool of this process on changes; the TTL bounds the staleness
+# of changes made by other processes (other web workers, the generation worker)
+POOL_TTL_SECONDS = 60
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _certificate_questions(track_id):
+    """Problem questions of the approved HARD challenges of a track"""
+    return ProblemQuestion.objects.filter(
+        challenge__track_id=track_id,
+        challenge__status=Challenge.ChallengeStatus.APPROVED,
+        challenge__difficulty=Question.Difficulty.HARD
+    )
+
+
+def certificate_question_ids(track_id):
+    """
+    Return the IDs of the problem questions of the approved HARD challenges of a track
+
+    Args:
+        track_id (int): Track of the certificate
+
+    Returns:
+        tuple: Question IDs
+    """
+    now = time.monotonic()
+    with _pools_lock:
+        cached = _pools.get(track_id)
+    if cached is not None and now - cached[0] < POOL_TTL_SECONDS:
+        return cached[1]
+
+    question_ids = tuple(_certificate_questions(track_id).order_by('id').values_list('id', flat=True))
+    with _pools_lock:
+        _pools[track_id] = (now, question_ids)
+    return question_ids
+
+
+def invalidate_certificate_pool(track_id=None):
+    """Drop the cached pool of a track (of every track if None)"""
+    with _pools_lock:
+        if track_id is None:
+            _pools.clear()
+        else:
+            _pools.pop(track_id, None)
+
+
+def sample_certificate_questions(track_id, count=CERTIFICATE_QUESTION_COUNT):
+    """
+    Draw random certificate questions, loading only the chosen rows
+
+    Args:
+        track_id (int): Track of the certificate
+        count (int): Number of questions
+
+    Returns:
+        tuple: (questions, number of questions available); no questions if fewer than count are available
+    """
+    for _ in range(2):
+        question_ids = certificate_question_ids(track_id)
+        if len(question_ids) < count:
+            return [], len(question_ids)
+
+        chosen_ids = random.sample(question_ids, count)
+        # Re-filtered: another process may have changed a challenge since the pool was loaded
+        questions = _certificate_questions(track_id).select_related('challenge').in_bulk(chosen_ids)
+        if len(questions) == count:
+            return [questions[question_id] for question_id in chosen_ids], len(question_ids)
+
+        # A chosen question was deleted, or its challenge was un-approved or re-graded
+        invalidate_certificate_pool(track_id)
+
+    return [questions[question_id] for question_id in chosen_ids if question_id in questions], len(question_ids)
@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Challenge, ProblemQuestion
+from .question_pool import invalidate_certificate_pool
+
+
+@receiver(post_save, sender=Challenge)
+@receiver(post_delete, sender=Challenge)
+def invalidate_challenge_track_pool(sender, instance, **kwargs):
+    """An approved, edited or deleted challenge changes the certificate pool of its track"""
+    invalidate_certificate_pool(instance.track_id)
+
+
+@receiver(post_save, sender=ProblemQuestion)
+@receiver(post_delete, sender=ProblemQuestion)
+def invalidate_question_pools(sender, instance, **kwargs):
+    """A question does not carry its track: drop every pool"""
+    invalidate_certificate_pool()
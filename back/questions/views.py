@@ -5,8 +5,8 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django.shortcuts import get_object_or_404
 from django.db.models import Q
-import random
 from .models import Question, Option, Challenge, ProblemQuestion, DiscursiveQuestion, MultipleChoiceQuestion, Program, Track
+from .question_pool import CERTIFICATE_QUESTION_COUNT, sample_certificate_questions
 from .serializers import (
     QuestionSerializer, 
     QuestionCreateSerializer, 
@@ -199,35 +199,23 @@ class CertificateQuestionsView(generics.GenericAPIView):
             program = Program.objects.get(name__iexact=program_name)
             track = Track.objects.get(program=program, name__iexact=track_name)
             
-            # Get approved challenges for this track with HARD difficulty only
-            challenges = Challenge.objects.filter(
-                track=track,
-                status=Challenge.ChallengeStatus.APPROVED,
-                difficulty='HARD'  # Only HARD difficulty for certificates
-            )
-            
-            # Get all problem questions from these challenges
-            problem_questions = ProblemQuestion.objects.filter(
-                challenge__in=challenges
-            ).select_related('challenge')
+            # Randomly select 5 problem questions of the approved HARD challenges (only HARD
+            # difficulty for certificates), sampling the cached IDs and loading only those rows
+            selected_questions, total_questions = sample_certificate_questions(track.id, CERTIFICATE_QUESTION_COUNT)
             
             # Check if there are at least 5 problem questions available
-            total_questions = problem_questions.count()
-            if total_questions < 5:
+            if len(selected_questions) < CERTIFICATE_QUESTION_COUNT:
                 return Response(
                     {
-                        "error": f"Not enough problem questions available for certificate. Found {total_questions} questions, need at least 5. Please create more challenges with calculation questions for this program and track.",
+                        "error": f"Not enough problem questions available for certificate. Found {total_questions} questions, need at least {CERTIFICATE_QUESTION_COUNT}. Please create more challenges with calculation questions for this program and track.",
                         "total_available": total_questions,
-                        "required": 5,
+                        "required": CERTIFICATE_QUESTION_COUNT,
                         "program": program_name,
                         "track": track_name
                     },
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Randomly select 5 questions
-            selected_questions = random.sample(list(problem_questions), 5)
-            
             # Serialize the questions
             serializer = ProblemQuestionSerializer(selected_questions, many=True)
             
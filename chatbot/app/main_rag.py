@@ -36,7 +36,8 @@ def initialize_rag_pipeline():
             collection_name=collection_name,
             persist_directory=persist_directory,
             chunk_size=2000,
-            chunk_overlap=200
+            chunk_overlap=200,
+            extraction_workers=os.cpu_count() or 1
         )
         
         # Try to load existing knowledge base
@@ -0,0 +1,289 @@
+"""
+Caching Module - In-memory caches shared by the search and chat components
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+import copy
+import re
+import threading
+import unicodedata
+
+import numpy as np
+
+from .text_processing import tokenize
+
+# Per-result scores kept by the retrieval cache; the rest of the metadata is read from the vector store
+SCORE_METADATA_KEYS = ('distance', 'similarity', 'rrf_score', 'bm25_score', 'rerank_score')
+
+
+class LRUCache:
+    """Thread-safe bounded least-recently-used cache with hit/miss counters"""
+
+    def __init__(self, max_size: int = 1024):
+        """
+        Initialize the cache
+
+        Args:
+            max_size (int): Maximum number of entries kept
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value (marking it as recently used) or None"""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the least recently used entry when full"""
+        with self._lock:
+            self._store(key, value)
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        """Store a value (lock held)"""
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove every entry"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return size and hit/miss counters"""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
+
+
+class QueryEmbeddingCache(LRUCache):
+    """
+    LRU of query embeddings. Keys are case-folded with collapsed whitespace: the
+    default MiniLM model is uncased, so "ICMS", "Icms" and "icms" share one vector.
+    Vectors are kept as float32 arrays (a list of Python floats takes ~8x the memory).
+    """
+
+    def __init__(self, max_size: int = 4096, case_sensitive: bool = False):
+        """
+        Initialize the cache
+
+        Args:
+            max_size (int): Maximum number of query embeddings kept
+            case_sensitive (bool): Keep case in keys, for cased embedding models
+        """
+        super().__init__(max_size)
+        self.case_sensitive = case_sensitive
+
+    def key(self, query: str) -> str:
+        """Return the cache key of a query"""
+        key = re.sub(r'\s+', ' ', unicodedata.normalize('NFC', query)).strip()
+        return key if self.case_sensitive else key.casefold()
+
+    def get_embedding(self, query: str) -> Optional[np.ndarray]:
+        """Return the cached embedding of a query or None (shared: do not modify it in place)"""
+        return self.get(self.key(query))
+
+    def put_embedding(self, query: str, embedding: Sequence[float]) -> np.ndarray:
+        """Store the embedding of a query and return the stored float32 vector"""
+        vector = np.asarray(embedding, dtype=np.float32)
+        self.put(self.key(query), vector)
+        return vector
+
+
+class RetrievalCache(LRUCache):
+    """
+    LRU of retrieval results: the chunk IDs and scores returned for a query, keyed by
+    search mode, normalized query, search parameters and index version
+    """
+
+    def __init__(self, max_size: int = 1024):
+        """
+        Initialize the cache
+
+        Args:
+            max_size (int): Maximum number of result lists kept
+        """
+        super().__init__(max_size)
+
+    def key(self,
+            mode: str,
+            query: str,
+            k: int,
+            score_threshold: Optional[float],
+            index_version: Optional[str],
+            options: Optional[Dict[str, Any]] = None) -> Tuple[Any, ...]:
+        """
+        Return the cache key of a search
+
+        Args:
+            mode (str): Search mode (e.g. "hybrid" or "similarity")
+            query (str): Query text (case and whitespace are normalized)
+            k (int): Number of results
+            score_threshold (Optional[float]): Distance threshold
+            index_version (Optional[str]): Version of the index searched
+            options (Optional[Dict[str, Any]]): Other search parameters
+
+        Returns:
+            Tuple[Any, ...]: Cache key
+        """
+        normalized = re.sub(r'\s+', ' ', unicodedata.normalize('NFC', query)).strip().casefold()
+        return (mode, normalized, k, score_threshold, index_version, tuple(sorted((options or {}).items())))
+
+    def get_results(self, key: Tuple[Any, ...]) -> Optional[List[Tuple[str, Dict[str, Any]]]]:
+        """Return the cached chunk IDs and scores of a search, or None"""
+        return self.get(key)
+
+    def put_results(self, key: Tuple[Any, ...], documents: List[Any]) -> bool:
+        """
+        Store the results of a search
+
+        Args:
+            key (Tuple[Any, ...]): Cache key
+            documents (List[Document]): Results, in order
+
+        Returns:
+            bool: False if a result has no ID and the search cannot be cached
+        """
+        if not all(getattr(doc, 'id', None) for doc in documents):
+            return False
+        self.put(key, [
+            (doc.id, {name: doc.metadata[name] for name in SCORE_METADATA_KEYS if name in doc.metadata})
+            for doc in documents
+        ])
+        return True
+
+
+class AnswerCache(LRUCache):
+    """
+    LRU of chat answers keyed by normalized question (accent/case/punctuation folded)
+    and, optionally, matched by query-embedding similarity. Every entry belongs to one
+    index version: the cache empties itself when the knowledge base changes.
+    """
+
+    def __init__(self, max_size: int = 256, similarity_threshold: Optional[float] = None):
+        """
+        Initialize the cache
+
+        Args:
+            max_size (int): Maximum number of answers kept
+            similarity_threshold (Optional[float]): Cosine similarity above which a question
+                reuses the answer of a previous one; exact matches only when None
+        """
+        super().__init__(max_size)
+        self.similarity_threshold = similarity_threshold
+        self.index_version: Optional[str] = None
+        self.similar_hits = 0
+
+    def key(self, query: str, params: Sequence[Any] = ()) -> Tuple[str, Tuple[Any, ...]]:
+        """Return the cache key of a question and the retrieval parameters of its answer"""
+        return " ".join(tokenize(query)), tuple(params)
+
+    def _sync_version(self, index_version: Optional[str]) -> None:
+        """Drop every answer produced with another version of the index (lock held)"""
+        if index_version != self.index_version:
+            self._data.clear()
+            self.index_version = index_version
+
+    def get_answer(self,
+                   query: str,
+                   index_version: Optional[str],
+                   params: Sequence[Any] = (),
+                   embedding: Optional[List[float]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Return a copy of the cached answer of a question or None
+
+        Args:
+            query (str): User's question
+            index_version (Optional[str]): Version of the index answers are valid for
+            params (Sequence[Any]): Retrieval parameters the answer was produced with
+            embedding (Optional[List[float]]): Question embedding, for similarity matching
+
+        Returns:
+            Optional[Dict[str, Any]]: Cached answer
+        """
+        key = self.key(query, params)
+        with self._lock:
+            self._sync_version(index_version)
+
+            if key not in self._data and self.similarity_threshold is not None and embedding is not None:
+                key = self._most_similar(key[1], embedding)
+                if key is not None:
+                    self.similar_hits += 1
+
+            if key is None or key not in self._data:
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            answer, _ = self._data[key]
+            return copy.deepcopy(answer)
+
+    def _most_similar(self, params: Tuple[Any, ...], embedding: List[float]) -> Optional[Tuple[str, Tuple[Any, ...]]]:
+        """Return the key of the most similar cached question above the threshold (lock held)"""
+        keys = [key for key, (_, vector) in self._data.items() if key[1] == params and vector is not None]
+        if not keys:
+            return None
+
+        matrix = np.asarray([self._data[key][1] for key in keys], dtype=np.float32)
+        query_vector = np.array(embedding, dtype=np.float32)
+        query_vector /= max(float(np.linalg.norm(query_vector)), 1e-12)
+        similarities = matrix @ query_vector
+
+        best = int(np.argmax(similarities))
+        return keys[best] if similarities[best] >= self.similarity_threshold else None
+
+    def put_answer(self,
+                   query: str,
+                   index_version: Optional[str],
+                   answer: Dict[str, Any],
+                   params: Sequence[Any] = (),
+                   embedding: Optional[List[float]] = None) -> None:
+        """
+        Store the answer of a question
+
+        Args:
+            query (str): User's question
+            index_version (Optional[str]): Version of the index the answer was produced with;
+                answers of an outdated version are not stored
+            answer (Dict[str, Any]): Answer to cache
+            params (Sequence[Any]): Retrieval parameters the answer was produced with
+            embedding (Optional[List[float]]): Question embedding, for similarity matching
+        """
+        vector = None
+        if embedding is not None:
+            vector = np.array(embedding, dtype=np.float32)
+            vector /= max(float(np.linalg.norm(vector)), 1e-12)
+
+        with self._lock:
+            if self.index_version is not None and index_version != self.index_version:
+                # Produced by a request that started before the index changed
+                return
+            self.index_version = index_version
+            self._store(self.key(query, params), (copy.deepcopy(answer), vector))
+
+    def stats(self) -> Dict[str, Any]:
+        """Return size and hit/miss counters"""
+        stats = super().stats()
+        stats["similar_hits"] = self.similar_hits
+        stats["index_version"] = self.index_version
+        return stats
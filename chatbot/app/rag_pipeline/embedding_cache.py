@@ -0,0 +1,202 @@
+"""
+Embedding Cache Module - Responsible for reusing the embeddings of chunk texts across builds
+"""
+
+from langchain_core.embeddings import Embeddings
+from typing import Dict, List, Optional
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import unicodedata
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only safe from a single process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+VECTOR_DTYPE = np.float32
+
+
+def normalize_chunk_text(text: str) -> str:
+    """Normalize a chunk text before hashing: Unicode NFC and collapsed whitespace"""
+    return re.sub(r'\s+', ' ', unicodedata.normalize('NFC', text)).strip()
+
+
+def text_key(text: str) -> str:
+    """Return the cache key of a chunk text"""
+    return hashlib.sha256(normalize_chunk_text(text).encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Class to persist embeddings keyed by text hash, one directory per embedding model.
+    Vectors are appended to a float32 file read through a memory map; a key file maps
+    each text hash to its row.
+    """
+
+    def __init__(self, directory: str, model_name: str):
+        """
+        Initialize the embedding cache
+
+        Args:
+            directory (str): Base directory of the cache
+            model_name (str): Embedding model the vectors were produced with
+        """
+        self.model_name = model_name
+        self.directory = os.path.join(directory, re.sub(r'[^\w.-]+', '_', model_name))
+        self.vectors_path = os.path.join(self.directory, "vectors.f32")
+        self.keys_path = os.path.join(self.directory, "keys.txt")
+        self.meta_path = os.path.join(self.directory, "meta.json")
+        self.lock_path = os.path.join(self.directory, ".lock")
+
+        os.makedirs(self.directory, exist_ok=True)
+
+        self.dimension: Optional[int] = None
+        self._index: Dict[str, int] = {}
+        self._vectors: Optional[np.memmap] = None
+        self._lock = threading.Lock()
+
+        self._load()
+
+    def _load(self) -> None:
+        """Read the metadata and the key file"""
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, 'r', encoding='utf-8') as file:
+                self.dimension = json.load(file).get("dimension")
+
+        self._index = {}
+        if self.dimension and os.path.exists(self.keys_path):
+            rows = os.path.getsize(self.vectors_path) // (self.dimension * 4) if os.path.exists(self.vectors_path) else 0
+            with open(self.keys_path, 'r', encoding='utf-8') as file:
+                for line in file:
+                    parts = line.split()
+                    # Ignore rows whose vector was not completely written
+                    if len(parts) == 2 and int(parts[1]) < rows:
+                        self._index[parts[0]] = int(parts[1])
+        self._vectors = None
+
+        logger.info(f"Embedding cache loaded: {len(self._index)} vectors for {self.model_name}")
+
+    def _memmap(self) -> Optional[np.memmap]:
+        """Return the (lazily opened) memory map of the vector file"""
+        if self._vectors is None and self.dimension and os.path.exists(self.vectors_path):
+            rows = os.path.getsize(self.vectors_path) // (self.dimension * 4)
+            if rows:
+                self._vectors = np.memmap(self.vectors_path, dtype=VECTOR_DTYPE, mode='r', shape=(rows, self.dimension))
+        return self._vectors
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def get_many(self, keys: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Return the cached vectors of the keys
+
+        Args:
+            keys (List[str]): Text keys
+
+        Returns:
+            List[Optional[np.ndarray]]: Vector of each key, None when missing
+        """
+        with self._lock:
+            vectors = self._memmap()
+            if vectors is None:
+                return [None] * len(keys)
+            return [
+                np.array(vectors[self._index[key]]) if key in self._index and self._index[key] < len(vectors) else None
+                for key in keys
+            ]
+
+    def put_many(self, keys: List[str], vectors: List[List[float]]) -> None:
+        """
+        Append vectors to the cache
+
+        Args:
+            keys (List[str]): Text keys
+            vectors (List[List[float]]): Vector of each key
+        """
+        if not keys:
+            return
+
+        matrix = np.asarray(vectors, dtype=VECTOR_DTYPE)
+        with self._lock:
+            if self.dimension is None:
+                self.dimension = int(matrix.shape[1])
+                with open(self.meta_path, 'w', encoding='utf-8') as file:
+                    json.dump({"model_name": self.model_name, "dimension": self.dimension}, file)
+            elif matrix.shape[1] != self.dimension:
+                logger.warning(f"Embedding dimension changed ({matrix.shape[1]} != {self.dimension}), not caching")
+                return
+
+            with open(self.lock_path, 'a') as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    # Rows are computed from the file size so concurrent writers never overlap
+                    first_row = os.path.getsize(self.vectors_path) // (self.dimension * 4) if os.path.exists(self.vectors_path) else 0
+                    with open(self.vectors_path, 'ab') as file:
+                        file.truncate(first_row * self.dimension * 4)
+                        file.write(matrix.tobytes())
+                    with open(self.keys_path, 'a', encoding='utf-8') as file:
+                        file.writelines(f"{key} {first_row + i}\n" for i, key in enumerate(keys))
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+            for i, key in enumerate(keys):
+                self._index[key] = first_row + i
+            # Re-open the memory map on the next read to see the new rows
+            self._vectors = None
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only encodes chunk texts missing from an EmbeddingCache"""
+
+    def __init__(self, base_embeddings: Embeddings, cache: EmbeddingCache):
+        """
+        Initialize the wrapper
+
+        Args:
+            base_embeddings (Embeddings): Model used for cache misses
+            cache (EmbeddingCache): Persistent cache of document embeddings
+        """
+        self.base_embeddings = base_embeddings
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents, encoding only the texts that are not cached yet"""
+        keys = [text_key(text) for text in texts]
+        cached = self.cache.get_many(keys)
+
+        # Encode each missing text once, even if it appears several times in the batch
+        missing: Dict[str, str] = {}
+        for key, text, vector in zip(keys, texts, cached):
+            if vector is None and key not in missing:
+                missing[key] = text
+
+        encoded: Dict[str, List[float]] = {}
+        if missing:
+            vectors = self.base_embeddings.embed_documents(list(missing.values()))
+            encoded = dict(zip(missing.keys(), vectors))
+            self.cache.put_many(list(encoded.keys()), list(encoded.values()))
+
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+
+        return [
+            vector.tolist() if vector is not None else list(encoded[key])
+            for key, vector in zip(keys, cached)
+        ]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Queries are not cached here: they are short lived and cached by the search engine"""
+        return self.base_embeddings.embed_query(text)
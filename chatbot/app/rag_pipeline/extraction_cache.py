@@ -0,0 +1,150 @@
+"""
+Extraction Cache Module - Responsible for storing the text extracted from each PDF page
+"""
+
+from langchain_core.documents import Document
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+import json
+import logging
+import os
+import sqlite3
+import time
+
+logger = logging.getLogger(__name__)
+
+# Metadata that depends on where the file is located, re-applied on every read
+PATH_METADATA_KEYS = ('source', 'file_name', 'directory')
+
+
+class ExtractionCache:
+    """Class to cache extracted pages keyed by file hash, page number and extractor version"""
+
+    def __init__(self, database_path: str = "data/extraction_cache.sqlite3"):
+        """
+        Initialize the extraction cache
+
+        Args:
+            database_path (str): Path of the SQLite database
+        """
+        self.database_path = database_path
+
+        directory = os.path.dirname(database_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as connection:
+            connection.execute(
+                """CREATE TABLE IF NOT EXISTS files (
+                    file_hash TEXT NOT NULL,
+                    extractor_version TEXT NOT NULL,
+                    page_count INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (file_hash, extractor_version)
+                )"""
+            )
+            connection.execute(
+                """CREATE TABLE IF NOT EXISTS pages (
+                    file_hash TEXT NOT NULL,
+                    extractor_version TEXT NOT NULL,
+                    page INTEGER NOT NULL,
+                    content TEXT NOT NULL,
+                    metadata TEXT NOT NULL,
+                    PRIMARY KEY (file_hash, extractor_version, page)
+                )"""
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a transaction on a new connection; one per operation so the cache can be shared between threads"""
+        connection = sqlite3.connect(self.database_path, timeout=30)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def contains(self, file_hash: str, extractor_version: str) -> bool:
+        """
+        Check whether the pages of a file are cached
+
+        Args:
+            file_hash (str): Content hash of the file
+            extractor_version (str): Version of the extractor that produced the pages
+
+        Returns:
+            bool: True if the file is cached
+        """
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT 1 FROM files WHERE file_hash = ? AND extractor_version = ?",
+                (file_hash, extractor_version)
+            ).fetchone()
+        return row is not None
+
+    def get(self, file_hash: str, extractor_version: str, file_path: str) -> Optional[List[Document]]:
+        """
+        Return the cached pages of a file
+
+        Args:
+            file_hash (str): Content hash of the file
+            extractor_version (str): Version of the extractor that produced the pages
+            file_path (str): Current path of the file, used for the path metadata
+
+        Returns:
+            Optional[List[Document]]: Cached pages or None if the file is not cached
+        """
+        if not self.contains(file_hash, extractor_version):
+            return None
+
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT content, metadata FROM pages "
+                "WHERE file_hash = ? AND extractor_version = ? ORDER BY page",
+                (file_hash, extractor_version)
+            ).fetchall()
+
+        documents = []
+        for content, metadata in rows:
+            metadata = json.loads(metadata)
+            metadata.update({
+                'source': file_path,
+                'file_name': os.path.basename(file_path),
+                'directory': os.path.dirname(file_path)
+            })
+            documents.append(Document(page_content=content, metadata=metadata))
+        return documents
+
+    def put(self, file_hash: str, extractor_version: str, documents: List[Document]) -> None:
+        """
+        Store the pages of a file, replacing any previous entry
+
+        Args:
+            file_hash (str): Content hash of the file
+            extractor_version (str): Version of the extractor that produced the pages
+            documents (List[Document]): Extracted pages
+        """
+        rows = []
+        for position, doc in enumerate(documents):
+            metadata = {k: v for k, v in doc.metadata.items() if k not in PATH_METADATA_KEYS}
+            rows.append((
+                file_hash,
+                extractor_version,
+                position,
+                doc.page_content,
+                json.dumps(metadata, default=str)
+            ))
+
+        try:
+            with self._connect() as connection:
+                connection.execute(
+                    "DELETE FROM pages WHERE file_hash = ? AND extractor_version = ?",
+                    (file_hash, extractor_version)
+                )
+                connection.executemany("INSERT INTO pages VALUES (?, ?, ?, ?, ?)", rows)
+                connection.execute(
+                    "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+                    (file_hash, extractor_version, len(rows), time.time())
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Could not store extraction cache entry for {file_hash}: {e}")
@@ -0,0 +1,221 @@
+"""
+Lexical Index Module - BM25 inverted index over accent-folded tokens, persisted next to the vector store
+"""
+
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+import gzip
+import heapq
+import json
+import logging
+import math
+import os
+import threading
+
+from .text_processing import PORTUGUESE_STOPWORDS, analyze
+
+logger = logging.getLogger(__name__)
+
+# Bump when the index layout or the tokenization changes
+LEXICAL_INDEX_FORMAT_VERSION = 2
+
+
+class BM25Index:
+    """Class to index chunks by term frequency and rank them with Okapi BM25"""
+
+    def __init__(self, path: str, k1: float = 1.5, b: float = 0.75, stemming: bool = False):
+        """
+        Initialize an empty index
+
+        Args:
+            path (str): File the index is persisted to (gzip-compressed JSON)
+            k1 (float): Term frequency saturation
+            b (float): Document length normalization
+            stemming (bool): Index (and search) singular forms of plural words
+        """
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.stemming = stemming
+
+        # Forward index: chunk ID -> term frequencies, plus the file each chunk belongs to
+        self._chunks: Dict[str, Dict[str, int]] = {}
+        self._file_paths: Dict[str, Optional[str]] = {}
+        self._lengths: Dict[str, int] = {}
+        # Inverted index: term -> chunk ID -> term frequency
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._total_length = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._chunks)
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self._chunks
+
+    def _add(self, chunk_id: str, frequencies: Dict[str, int], file_path: Optional[str]) -> None:
+        """Index the term frequencies of one chunk, replacing a previous entry with the same ID"""
+        if chunk_id in self._chunks:
+            self._remove(chunk_id)
+
+        self._chunks[chunk_id] = frequencies
+        self._file_paths[chunk_id] = file_path
+        length = sum(frequencies.values())
+        self._lengths[chunk_id] = length
+        self._total_length += length
+        for term, frequency in frequencies.items():
+            self._postings.setdefault(term, {})[chunk_id] = frequency
+
+    def _remove(self, chunk_id: str) -> None:
+        """Remove one chunk from the index"""
+        for term in self._chunks.pop(chunk_id, {}):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(chunk_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= self._lengths.pop(chunk_id, 0)
+        self._file_paths.pop(chunk_id, None)
+
+    def add(self, chunks: Iterable[Tuple[str, str, Optional[str]]]) -> int:
+        """
+        Index chunks
+
+        Args:
+            chunks (Iterable[Tuple[str, str, Optional[str]]]): Chunk ID, text and source file path of each chunk
+
+        Returns:
+            int: Number of chunks indexed
+        """
+        count = 0
+        with self._lock:
+            for chunk_id, text, file_path in chunks:
+                self._add(chunk_id, dict(Counter(analyze(text, self.stemming))), file_path)
+                count += 1
+        return count
+
+    def remove_files(self, file_paths: Iterable[str]) -> int:
+        """
+        Remove every chunk of the given files
+
+        Args:
+            file_paths (Iterable[str]): Paths of the files, relative to the documents directory
+
+        Returns:
+            int: Number of chunks removed
+        """
+        file_paths = set(file_paths)
+        with self._lock:
+            chunk_ids = [chunk_id for chunk_id, file_path in self._file_paths.items() if file_path in file_paths]
+            for chunk_id in chunk_ids:
+                self._remove(chunk_id)
+        return len(chunk_ids)
+
+    def clear(self) -> None:
+        """Remove every chunk"""
+        with self._lock:
+            self._chunks.clear()
+            self._file_paths.clear()
+            self._lengths.clear()
+            self._postings.clear()
+            self._total_length = 0
+
+    def term_frequencies(self, chunk_id: str) -> Dict[str, int]:
+        """Return the term frequencies of a chunk (empty if the chunk is not indexed)"""
+        return self._chunks.get(chunk_id, {})
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """
+        Rank the indexed chunks against a query
+
+        Args:
+            query (str): Query text, analyzed like the chunks; stopwords are ignored
+            k (int): Maximum number of results
+
+        Returns:
+            List[Tuple[str, float]]: Chunk IDs and BM25 scores, best first
+        """
+        terms = set(analyze(query, self.stemming)) - PORTUGUESE_STOPWORDS
+        if not terms or k <= 0:
+            return []
+
+        with self._lock:
+            total = len(self._chunks)
+            if not total:
+                return []
+            average_length = self._total_length / total
+
+            scores: Dict[str, float] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1.0 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+                for chunk_id, frequency in postings.items():
+                    norm = self.k1 * (1.0 - self.b + self.b * self._lengths[chunk_id] / average_length)
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * frequency * (self.k1 + 1.0) / (frequency + norm)
+
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def save(self) -> bool:
+        """
+        Write the index atomically
+
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        with self._lock:
+            data = {
+                "format": LEXICAL_INDEX_FORMAT_VERSION,
+                "k1": self.k1,
+                "b": self.b,
+                "stemming": self.stemming,
+                "chunks": {
+                    chunk_id: [self._file_paths.get(chunk_id), frequencies]
+                    for chunk_id, frequencies in self._chunks.items()
+                }
+            }
+
+        temporary_path = f"{self.path}.tmp"
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with gzip.open(temporary_path, 'wt', encoding='utf-8') as file:
+                json.dump(data, file, separators=(',', ':'))
+            os.replace(temporary_path, self.path)
+            return True
+        except OSError as e:
+            logger.error(f"Error saving lexical index {self.path}: {e}")
+            return False
+
+    @classmethod
+    def load(cls, path: str) -> Optional["BM25Index"]:
+        """
+        Read a persisted index
+
+        Args:
+            path (str): File the index was persisted to
+
+        Returns:
+            Optional[BM25Index]: Index or None if it is missing, unreadable or outdated
+        """
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as file:
+                data = json.load(file)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read lexical index {path}: {e}")
+            return None
+
+        if data.get("format") != LEXICAL_INDEX_FORMAT_VERSION:
+            logger.info(f"Lexical index format changed, ignoring {path}")
+            return None
+
+        index = cls(path, k1=data.get("k1", 1.5), b=data.get("b", 0.75), stemming=data.get("stemming", False))
+        for chunk_id, (file_path, frequencies) in data.get("chunks", {}).items():
+            index._add(chunk_id, frequencies, file_path)
+        logger.info(f"Lexical index loaded: {len(index)} chunks, {len(index._postings)} terms")
+        return index
@@ -0,0 +1,212 @@
+"""
+Manifest Module - Responsible for tracking which documents are indexed in the vector store
+"""
+
+from typing import List, Dict, Any, Optional
+import hashlib
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Bump when the manifest layout changes in a backwards incompatible way
+MANIFEST_FORMAT_VERSION = 1
+
+SUPPORTED_EXTENSIONS = ('.pdf',)
+
+
+def file_sha256(file_path: str, block_size: int = 1024 * 1024) -> str:
+    """
+    Compute the SHA-256 digest of a file, reading it in blocks
+
+    Args:
+        file_path (str): Path to the file
+        block_size (int): Number of bytes read at a time
+
+    Returns:
+        str: Hexadecimal digest
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class KnowledgeBaseManifest:
+    """Class that describes the content of a persisted knowledge base"""
+
+    def __init__(self,
+                 persist_directory: str,
+                 collection_name: str,
+                 settings: Dict[str, Any],
+                 files: Optional[Dict[str, Dict[str, Any]]] = None):
+        """
+        Initialize the manifest
+
+        Args:
+            persist_directory (str): Directory where the vector store is persisted
+            collection_name (str): Name of the collection in the vector store
+            settings (Dict[str, Any]): Settings that affect the content of the index
+                (chunker settings, embedding model, ...)
+            files (Dict[str, Dict[str, Any]]): Indexed files keyed by path relative
+                to the documents directory, with size, mtime and sha256
+        """
+        self.persist_directory = persist_directory
+        self.collection_name = collection_name
+        self.settings = settings
+        self.files = files or {}
+
+    @property
+    def path(self) -> str:
+        """Path of the manifest file, stored next to the Chroma collection"""
+        return os.path.join(self.persist_directory, f"{self.collection_name}.manifest.json")
+
+    @property
+    def version(self) -> str:
+        """
+        Content address of the knowledge base: changes whenever a document or a
+        setting that affects the index changes
+        """
+        payload = json.dumps(
+            {
+                "settings": self.settings,
+                "files": sorted((path, entry["sha256"]) for path, entry in self.files.items())
+            },
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+    @classmethod
+    def load(cls, persist_directory: str, collection_name: str) -> Optional['KnowledgeBaseManifest']:
+        """
+        Load the manifest stored in the persist directory
+
+        Args:
+            persist_directory (str): Directory where the vector store is persisted
+            collection_name (str): Name of the collection in the vector store
+
+        Returns:
+            Optional[KnowledgeBaseManifest]: Loaded manifest or None if missing or unreadable
+        """
+        manifest = cls(persist_directory, collection_name, settings={})
+        if not os.path.exists(manifest.path):
+            return None
+
+        try:
+            with open(manifest.path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read manifest {manifest.path}: {e}")
+            return None
+
+        if data.get("format_version") != MANIFEST_FORMAT_VERSION:
+            logger.info("Manifest format changed, ignoring previous manifest")
+            return None
+
+        manifest.settings = data.get("settings", {})
+        manifest.files = data.get("files", {})
+        return manifest
+
+    @classmethod
+    def scan(cls,
+             documents_path: str,
+             persist_directory: str,
+             collection_name: str,
+             settings: Dict[str, Any],
+             previous: Optional['KnowledgeBaseManifest'] = None) -> 'KnowledgeBaseManifest':
+        """
+        Build a manifest describing the documents currently on disk.
+        Files whose size and mtime match the previous manifest reuse its hash
+        instead of being read again.
+
+        Args:
+            documents_path (str): Directory where the documents are located
+            persist_directory (str): Directory where the vector store is persisted
+            collection_name (str): Name of the collection in the vector store
+            settings (Dict[str, Any]): Settings that affect the content of the index
+            previous (Optional[KnowledgeBaseManifest]): Previously saved manifest
+
+        Returns:
+            KnowledgeBaseManifest: Manifest of the current documents
+        """
+        previous_files = previous.files if previous else {}
+        files = {}
+
+        for root, dirs, file_names in os.walk(documents_path):
+            dirs.sort()
+            for file_name in sorted(file_names):
+                if not file_name.lower().endswith(SUPPORTED_EXTENSIONS):
+                    continue
+
+                file_path = os.path.join(root, file_name)
+                relative_path = os.path.relpath(file_path, documents_path).replace(os.sep, '/')
+                stat = os.stat(file_path)
+
+                entry = {"size": stat.st_size, "mtime": stat.st_mtime}
+                known = previous_files.get(relative_path)
+                if known and known.get("size") == entry["size"] and known.get("mtime") == entry["mtime"]:
+                    entry["sha256"] = known["sha256"]
+                else:
+                    entry["sha256"] = file_sha256(file_path)
+
+                files[relative_path] = entry
+
+        return cls(persist_directory, collection_name, settings, files)
+
+    def save(self) -> None:
+        """Atomically write the manifest next to the Chroma collection"""
+        os.makedirs(self.persist_directory, exist_ok=True)
+        data = {
+            "format_version": MANIFEST_FORMAT_VERSION,
+            "version": self.version,
+            "updated_at": time.time(),
+            "settings": self.settings,
+            "files": self.files
+        }
+
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(data, file, indent=2, sort_keys=True)
+        os.replace(temp_path, self.path)
+        logger.info(f"Manifest saved: {self.path} (version {self.version})")
+
+    def delete(self) -> None:
+        """Remove the manifest file, so a partially rebuilt collection is never trusted"""
+        try:
+            os.remove(self.path)
+            logger.info(f"Manifest removed: {self.path}")
+        except FileNotFoundError:
+            pass
+
+    def diff(self, previous: 'KnowledgeBaseManifest') -> Dict[str, List[str]]:
+        """
+        Compare this manifest with a previous one by content hash
+
+        Args:
+            previous (KnowledgeBaseManifest): Manifest of the indexed documents
+
+        Returns:
+            Dict[str, List[str]]: Relative paths grouped in added, modified,
+                removed and unchanged
+        """
+        changes = {"added": [], "modified": [], "removed": [], "unchanged": []}
+
+        for path, entry in self.files.items():
+            known = previous.files.get(path)
+            if known is None:
+                changes["added"].append(path)
+            elif known["sha256"] != entry["sha256"]:
+                changes["modified"].append(path)
+            else:
+                changes["unchanged"].append(path)
+
+        changes["removed"] = [path for path in previous.files if path not in self.files]
+        return changes
+
+    def file_hash(self, relative_path: str) -> Optional[str]:
+        """Return the content hash of an indexed file"""
+        entry = self.files.get(relative_path)
+        return entry["sha256"] if entry else None
@@ -3,12 +3,17 @@ RAG Pipeline - Main module to integrate all RAG pipelines steps
 """
 
 from .step1_extraction import DocumentExtractor
-from .step2_chunking import DocumentChunker
+from .step2_chunking import CHUNK_ID_VERSION, DocumentChunker
 from .step3_embedding import EmbeddingManager
 from .step4_search import SearchEngine
 from .step5_chat import RAGChatbot
+from .manifest import KnowledgeBaseManifest
+from .extraction_cache import ExtractionCache
+from .caching import AnswerCache, QueryEmbeddingCache, RetrievalCache
+from .reranking import CrossEncoderReranker
 
-from typing import List, Dict, Any, Optional
+from langchain_core.documents import Document
+from typing import List, Dict, Any, AsyncIterator, Iterator, Optional
 import logging
 import os
 
@@ -22,7 +27,21 @@ class RAGPipeline:
                  collection_name: str = "sefaz_docs",
                  persist_directory: str = "data/chroma_db",
                  chunk_size: int = 800,  # Reduced for memory optimization
-                 chunk_overlap: int = 100):  # Reduced for memory optimization
+                 chunk_overlap: int = 100,  # Reduced for memory optimization
+                 embedding_batch_size: int = 50,
+                 extraction_workers: int = 1,
+                 ocr_dpi: int = 200,
+                 ocr_dpi_overrides: Optional[Dict[str, int]] = None,
+                 ocr_workers: int = 2,
+                 use_extraction_cache: bool = True,
+                 use_embedding_cache: bool = True,
+                 lexical_stemming: bool = False,
+                 rerank_model: Optional[str] = None,
+                 rerank_time_budget: float = 1.5,
+                 rerank_top_n: int = 6,
+                 answer_cache_size: int = 256,
+                 answer_similarity_threshold: Optional[float] = None,
+                 retrieval_cache_size: int = 1024):
         """
         Initializes the RAG pipeline
         
@@ -32,27 +51,171 @@ class RAGPipeline:
             persist_directory (str): Directory to persist the vector store
             chunk_size (int): Size of the chunks
             chunk_overlap (int): Overlap between chunks
+            embedding_batch_size (int): Number of chunks embedded and written per batch
+            extraction_workers (int): Number of processes used to extract PDFs
+            ocr_dpi (int): Resolution used to OCR scanned PDFs
+            ocr_dpi_overrides (Optional[Dict[str, int]]): OCR resolution per file name
+            ocr_workers (int): Number of scanned pages rendered and recognized in parallel
+            use_extraction_cache (bool): Reuse previously extracted pages stored in
+                extraction_cache.sqlite3, next to the persist directory
+            use_embedding_cache (bool): Reuse the embeddings of chunk texts stored in
+                embedding_cache/, next to the persist directory
+            lexical_stemming (bool): Match singular and plural forms in lexical search
+            rerank_model (Optional[str]): Cross-encoder used to re-rank hybrid search results
+                (e.g. reranking.DEFAULT_RERANK_MODEL); disabled when None
+            rerank_time_budget (float): Seconds the cross-encoder may spend per query before
+                falling back to the heuristic ranking
+            rerank_top_n (int): Number of re-ranked chunks sent to the chat model
+            answer_cache_size (int): Number of chat answers cached in memory (0 disables the cache)
+            answer_similarity_threshold (Optional[float]): Cosine similarity above which a
+                question reuses the cached answer of a similar question (e.g. 0.95);
+                exact (normalized) matches only when None
+            retrieval_cache_size (int): Number of search results cached in memory (0 disables the cache)
         """
         self.documents_path = documents_path
         self.collection_name = collection_name
         self.persist_directory = persist_directory
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.embedding_batch_size = embedding_batch_size
+        self.extraction_workers = extraction_workers
+        self.ocr_dpi = ocr_dpi
+        self.ocr_dpi_overrides = ocr_dpi_overrides or {}
+        self.ocr_workers = ocr_workers
+        cache_directory = os.path.dirname(os.path.normpath(persist_directory))
+        self.extraction_cache = None
+        if use_extraction_cache:
+            self.extraction_cache = ExtractionCache(os.path.join(cache_directory, "extraction_cache.sqlite3"))
         
         # Initializes components
-        self.extractor = DocumentExtractor(documents_path)
+        self.extractor = self._create_extractor(documents_path)
         self.chunker = DocumentChunker(chunk_size, chunk_overlap)
-        self.embedding_manager = EmbeddingManager(collection_name, persist_directory)
+        self.embedding_manager = EmbeddingManager(
+            collection_name,
+            persist_directory,
+            cache_directory=os.path.join(cache_directory, "embedding_cache") if use_embedding_cache else None,
+            lexical_stemming=lexical_stemming
+        )
+        
+        self.reranker = CrossEncoderReranker(rerank_model, time_budget=rerank_time_budget) if rerank_model else None
+        self.rerank_top_n = rerank_top_n
+        
+        # Query embeddings survive index rebuilds: they only depend on the embedding model
+        self.query_cache = QueryEmbeddingCache()
+        # Answers are tied to the index version and dropped when the knowledge base changes
+        self.answer_cache = AnswerCache(answer_cache_size, answer_similarity_threshold) if answer_cache_size > 0 else None
+        # Search results are keyed by index version, so stale entries are never served
+        self.retrieval_cache = RetrievalCache(retrieval_cache_size) if retrieval_cache_size > 0 else None
         
         # Components that will be initialized after processing
         self.search_engine = None
         self.chatbot = None
         
+        # Content address of the loaded index, read from the manifest
+        self.index_version = None
+        self.last_build_stats = None
+        
         logger.info("RAG pipeline initialized")
     
+    def _create_extractor(self, documents_path: str) -> DocumentExtractor:
+        """Creates the document extractor with the pipeline's extraction settings"""
+        return DocumentExtractor(
+            documents_path,
+            workers=self.extraction_workers,
+            ocr_dpi=self.ocr_dpi,
+            ocr_dpi_overrides=self.ocr_dpi_overrides,
+            ocr_workers=self.ocr_workers,
+            cache=self.extraction_cache
+        )
+    
+    def _index_settings(self) -> Dict[str, Any]:
+        """
+        Settings that change the content of the index; any change forces a full rebuild
+        
+        Returns:
+            Dict[str, Any]: Index settings stored in the manifest
+        """
+        return {
+            "chunk_size": self.chunk_size,
+            "chunk_overlap": self.chunk_overlap,
+            "embedding_model": self.embedding_manager.embedding_model,
+            "chunk_id_version": CHUNK_ID_VERSION,
+            "ocr_dpi": self.ocr_dpi,
+            "ocr_dpi_overrides": self.ocr_dpi_overrides
+        }
+    
+    def _initialize_components(self, vector_store) -> None:
+        """Initializes search and chat components on top of the vector store"""
+        self.search_engine = SearchEngine(
+            vector_store,
+            query_cache=self.query_cache,
+            lexical_index=self.embedding_manager.get_lexical_index(vector_store),
+            reranker=self.reranker
+        )
+        self.chatbot = RAGChatbot(
+            self.search_engine,
+            rerank_top_n=self.rerank_top_n,
+            answer_cache=self.answer_cache,
+            retrieval_cache=self.retrieval_cache,
+            index_version=self.index_version
+        )
+    
+    def _index_files(self, relative_paths: List[str], manifest: KnowledgeBaseManifest) -> bool:
+        """
+        Extracts, chunks and embeds the given files into the vector store as a stream.
+        Files that produced no chunks (e.g. extraction failed) are dropped from the
+        manifest, so the next build sees them as added and tries them again.
+        
+        Args:
+            relative_paths (List[str]): Files to index, relative to documents_path
+            manifest (KnowledgeBaseManifest): Manifest with the hash of each file
+            
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        file_hashes = {
+            os.path.join(self.documents_path, path): manifest.file_hash(path)
+            for path in relative_paths
+        }
+        file_paths = {os.path.join(self.documents_path, path): path for path in relative_paths}
+        
+        # Steps 1-3 are chained generators: pages are extracted, chunked and embedded
+        # batch by batch, so peak memory is bounded by one embedding batch
+        logger.info(f"Indexing {len(relative_paths)} documents (extraction -> chunking -> embedding)...")
+        
+        def tagged_documents() -> Iterator[Document]:
+            for doc in self.extractor.iter_files(list(file_hashes), file_hashes):
+                doc.metadata['file_hash'] = file_hashes.get(doc.metadata.get('source'))
+                doc.metadata['file_path'] = file_paths.get(doc.metadata.get('source'))
+                yield doc
+        
+        indexed_paths = set()
+        
+        def tracked_chunks() -> Iterator[Document]:
+            for chunk in self.chunker.iter_chunks(tagged_documents()):
+                indexed_paths.add(chunk.metadata.get('file_path'))
+                yield chunk
+        
+        stats = self.embedding_manager.write_chunks(tracked_chunks(), batch_size=self.embedding_batch_size)
+        if stats is None:
+            logger.error("Error writing chunks to the vector store")
+            return False
+        
+        failed_paths = [path for path in relative_paths if path not in indexed_paths]
+        if failed_paths:
+            logger.warning(f"{len(failed_paths)} documents produced no chunks and will be retried: {failed_paths}")
+            for path in failed_paths:
+                manifest.files.pop(path, None)
+        
+        self.last_build_stats = stats
+        return True
+    
     def build_knowledge_base(self, force_rebuild: bool = False) -> bool:
         """
-        Builds the complete knowledge base
+        Builds the complete knowledge base.
+        The documents on disk are compared with the manifest stored next to the
+        vector store: when nothing changed the existing index is loaded, when some
+        files changed only those are re-indexed.
         
         Args:
             force_rebuild (bool): Forces rebuild even if it already exists
@@ -63,71 +226,68 @@ class RAGPipeline:
         try:
             logger.info("Starting knowledge base construction")
             
-            # Checks if vector store already exists
-            if not force_rebuild:
-                vector_store_info = self.embedding_manager.get_vector_store_info()
-                if vector_store_info.get("status") == "loaded":
-                    logger.info("Vector store already exists, loading...")
-                    vector_store = self.embedding_manager.load_vector_store()
-                    if vector_store:
-                        self.search_engine = SearchEngine(vector_store)
-                        self.chatbot = RAGChatbot(self.search_engine)
-                        logger.info("Knowledge base loaded successfully")
-                        return True
-            
-            # Step 1: Extraction
-            logger.info("Step 1: Extracting documents...")
-            documents = self.extractor.extract_documents()
-            if not documents:
+            previous = KnowledgeBaseManifest.load(self.persist_directory, self.collection_name)
+            current = KnowledgeBaseManifest.scan(
+                self.documents_path,
+                self.persist_directory,
+                self.collection_name,
+                self._index_settings(),
+                previous
+            )
+            if not current.files:
                 logger.error("No documents found to process")
                 return False
             
-            logger.info(f"Extracted {len(documents)} documents")
-            
-            # Step 2: Chunking
-            logger.info("Step 2: Chunking documents...")
-            chunks = self.chunker.chunk_documents(documents)
-            if not chunks:
-                logger.error("Error creating chunks of documents")
-                return False
+            vector_store_info = self.embedding_manager.get_vector_store_info()
+            can_reuse = (
+                not force_rebuild
+                and previous is not None
+                and previous.settings == current.settings
+                and vector_store_info.get("status") == "loaded"
+                and vector_store_info.get("document_count", 0) > 0
+            )
             
-            logger.info(f"Created {len(chunks)} chunks")
-            
-            # Step 3: Embedding (with memory optimization)
-            logger.info("Step 3: Creating embeddings and vector store...")
-            
-            # Process chunks in smaller batches to save memory
-            batch_size = 50  # Process 50 chunks at a time
-            all_chunks_processed = []
-            
-            for i in range(0, len(chunks), batch_size):
-                batch = chunks[i:i + batch_size]
-                logger.info(f"Processing embedding batch {i//batch_size + 1}/{(len(chunks)-1)//batch_size + 1}")
+            if can_reuse:
+                changes = current.diff(previous)
+                if not (changes["added"] or changes["modified"] or changes["removed"]):
+                    logger.info(f"Knowledge base is up to date (version {current.version}), loading...")
+                    if current.files != previous.files:
+                        # Only mtimes changed: remember them to skip hashing on the next boot
+                        current.save()
+                    return self.load_knowledge_base()
                 
-                # Create vector store for this batch
-                batch_vector_store = self.embedding_manager.create_vector_store(batch)
-                if not batch_vector_store:
-                    logger.error(f"Error creating vector store for batch {i//batch_size + 1}")
+                logger.info(
+                    f"Updating knowledge base: {len(changes['added'])} added, "
+                    f"{len(changes['modified'])} modified, {len(changes['removed'])} removed"
+                )
+                stale_paths = changes["modified"] + changes["removed"]
+                if stale_paths and not self.embedding_manager.update_vector_store([], removed_file_paths=stale_paths):
                     return False
-                
-                all_chunks_processed.extend(batch)
-                
-                # Clear batch from memory
-                del batch
-                import gc
-                gc.collect()
+                paths_to_index = changes["added"] + changes["modified"]
+            else:
+                logger.info("Rebuilding knowledge base from scratch")
+                # Drop the manifest first: if the rebuild stops halfway, the next boot
+                # must not take the partial collection for the previous version
+                current.delete()
+                if not self.embedding_manager.reset_vector_store():
+                    logger.error("Error resetting vector store")
+                    return False
+                paths_to_index = sorted(current.files)
             
-            # Create final vector store with all processed chunks
-            vector_store = self.embedding_manager.create_vector_store(all_chunks_processed)
+            if paths_to_index and not self._index_files(paths_to_index, current):
+                return False
+            
+            current.save()
+            self.index_version = current.version
+            
+            vector_store = self.embedding_manager.load_vector_store()
             if not vector_store:
-                logger.error("Error creating final vector store")
+                logger.error("Error loading vector store")
                 return False
             
             logger.info("Vector store created successfully")
             
-            # Initializes search and chat components
-            self.search_engine = SearchEngine(vector_store)
-            self.chatbot = RAGChatbot(self.search_engine)
+            self._initialize_components(vector_store)
             
             logger.info("Knowledge base built successfully")
             return True
@@ -151,8 +311,10 @@ class RAGPipeline:
                 logger.error("Vector store not found")
                 return False
             
-            self.search_engine = SearchEngine(vector_store)
-            self.chatbot = RAGChatbot(self.search_engine)
+            manifest = KnowledgeBaseManifest.load(self.persist_directory, self.collection_name)
+            self.index_version = manifest.version if manifest else None
+            
+            self._initialize_components(vector_store)
             
             logger.info("Knowledge base loaded successfully")
             return True
@@ -181,6 +343,67 @@ class RAGPipeline:
         
         return self.chatbot.chat(query, **kwargs)
     
+    def chat_stream(self, query: str, **kwargs) -> Iterator[Dict[str, Any]]:
+        """
+        Processes a user's question, streaming the response
+        
+        Args:
+            query (str): User's question
+            **kwargs: Additional arguments for the chat
+            
+        Yields:
+            Dict[str, Any]: Chatbot events (see RAGChatbot.chat_stream)
+        """
+        if not self.chatbot:
+            yield {
+                "event": "error",
+                "data": {"response": "Error: Knowledge base not loaded. Execute build_knowledge_base() first."}
+            }
+            return
+        
+        yield from self.chatbot.chat_stream(query, **kwargs)
+    
+    async def achat(self, query: str, **kwargs) -> Dict[str, Any]:
+        """
+        Processes a user's question without blocking the event loop
+        
+        Args:
+            query (str): User's question
+            **kwargs: Additional arguments for the chat
+            
+        Returns:
+            Dict[str, Any]: Chatbot's response
+        """
+        if not self.chatbot:
+            return {
+                "response": "Error: Knowledge base not loaded. Execute build_knowledge_base() first.",
+                "sources": [],
+                "confidence": "error"
+            }
+        
+        return await self.chatbot.achat(query, **kwargs)
+    
+    async def achat_stream(self, query: str, **kwargs) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Processes a user's question, streaming the response without blocking the event loop
+        
+        Args:
+            query (str): User's question
+            **kwargs: Additional arguments for the chat
+            
+        Yields:
+            Dict[str, Any]: Chatbot events (see RAGChatbot.chat_stream)
+        """
+        if not self.chatbot:
+            yield {
+                "event": "error",
+                "data": {"response": "Error: Knowledge base not loaded. Execute build_knowledge_base() first."}
+            }
+            return
+        
+        async for event in self.chatbot.achat_stream(query, **kwargs):
+            yield event
+    
     def search(self, query: str, **kwargs) -> List[Dict[str, Any]]:
         """
         Performs semantic search
@@ -223,7 +446,12 @@ class RAGPipeline:
             "collection_name": self.collection_name,
             "persist_directory": self.persist_directory,
             "chunk_size": self.chunk_size,
-            "chunk_overlap": self.chunk_overlap
+            "chunk_overlap": self.chunk_overlap,
+            "index_version": self.index_version,
+            "last_build": self.last_build_stats,
+            "query_cache": self.query_cache.stats(),
+            "answer_cache": self.answer_cache.stats() if self.answer_cache else None,
+            "retrieval_cache": self.retrieval_cache.stats() if self.retrieval_cache else None
         }
         
         # Vector store information
@@ -234,10 +462,14 @@ class RAGPipeline:
     
     def update_knowledge_base(self, new_documents_path: str = None) -> bool:
         """
-        Updates the knowledge base with new documents
+        Updates the knowledge base with the documents on disk.
+        Chunks of deleted or modified files are removed and only the chunks of new
+        or modified files are embedded; chunk IDs are deterministic, so re-running
+        the update never duplicates chunks.
         
         Args:
-            new_documents_path (str): Path to new documents
+            new_documents_path (str): Path to new documents. The index then mirrors
+                the content of this directory.
             
         Returns:
             bool: True if successful, False otherwise
@@ -245,29 +477,12 @@ class RAGPipeline:
         try:
             if new_documents_path:
                 self.documents_path = new_documents_path
-                self.extractor = DocumentExtractor(new_documents_path)
-            
-            # Extracts new documents
-            new_documents = self.extractor.extract_documents()
-            if not new_documents:
-                logger.warning("No new documents found")
-                return True
-            
-            # Chunks new documents
-            new_chunks = self.chunker.chunk_documents(new_documents)
-            
-            # Updates vector store
-            vector_store = self.embedding_manager.update_vector_store(new_chunks)
-            if not vector_store:
-                logger.error("Error updating vector store")
-                return False
+                self.extractor = self._create_extractor(new_documents_path)
             
-            # Updates components
-            self.search_engine = SearchEngine(vector_store)
-            self.chatbot = RAGChatbot(self.search_engine)
-            
-            logger.info("Knowledge base updated successfully")
-            return True
+            success = self.build_knowledge_base(force_rebuild=False)
+            if success:
+                logger.info("Knowledge base updated successfully")
+            return success
             
         except Exception as e:
             logger.error(f"Error updating knowledge base: {e}")
@@ -300,6 +515,32 @@ class RAGPipeline:
         
         return self.chatbot.generate_challenges_and_questions(topic, difficulty, type, k, score_threshold)
 
+    def generate_challenge_set(self, 
+                               requests: List[Dict[str, str]], 
+                               k: int = 10, 
+                               score_threshold: float = 0.7,
+                               max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Generates challenges for many topic, difficulty and type combinations, retrieving
+        each topic once and calling the AI model in parallel.
+        
+        Args:
+            requests (List[Dict[str, str]]): "topic", "difficulty" and "type" of each challenge.
+            k (int): Number of documents to search per topic.
+            score_threshold (float): Minimum similarity score.
+            max_workers (Optional[int]): Challenges generated in parallel.
+            
+        Returns:
+            List[Dict[str, Any]]: Challenges and questions generated for each request, in order.
+        """
+        if not self.chatbot:
+            return [
+                {"error": "Knowledge base not loaded. Execute build_knowledge_base() or load_knowledge_base() first."}
+                for _ in requests
+            ]
+        
+        return self.chatbot.generate_challenge_set(requests, k, score_threshold, max_workers)
+
     def generate_multiple_choice_question(self, 
                                         topic: str, 
                                         k: int = 4, 
@@ -330,7 +571,8 @@ class RAGPipeline:
     def generate_quiz_set(self, 
                          topics: List[str], 
                          k: int = 4, 
-                         score_threshold: float = 0.7) -> Dict[str, Any]:
+                         score_threshold: float = 0.7,
+                         max_workers: Optional[int] = None) -> Dict[str, Any]:
         """
         Generate a set of multiple choice questions for multiple topics
         
@@ -338,9 +580,10 @@ class RAGPipeline:
             topics (List[str]): List of topics to generate questions about
             k (int): Number of documents to search per topic
             score_threshold (float): Minimum similarity score
+            max_workers (Optional[int]): Questions generated in parallel
             
         Returns:
-            Dict[str, Any]: Set of generated questions
+            Dict[str, Any]: Set of generated questions, in the order of the topics
         """
         if not self.chatbot:
             return {
@@ -352,4 +595,4 @@ class RAGPipeline:
                 "topics": topics
             }
         
-        return self.chatbot.generate_quiz_set(topics, k, score_threshold)
+        return self.chatbot.generate_quiz_set(topics, k, score_threshold, max_workers)
@@ -0,0 +1,102 @@
+"""
+Re-ranking Module - Responsible for re-ordering retrieved chunks with a local cross-encoder
+"""
+
+from langchain_core.documents import Document
+from typing import List, Optional
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Small multilingual cross-encoder (trained on mMARCO, which includes Portuguese)
+DEFAULT_RERANK_MODEL = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"
+
+
+class CrossEncoderReranker:
+    """Class to score (query, chunk) pairs with a cross-encoder on CPU under a time budget"""
+
+    def __init__(self,
+                 model_name: str = DEFAULT_RERANK_MODEL,
+                 batch_size: int = 8,
+                 time_budget: float = 1.5,
+                 max_length: int = 512):
+        """
+        Initialize the re-ranker and load the model
+
+        Args:
+            model_name (str): Cross-encoder model to be used
+            batch_size (int): Number of pairs scored per forward pass
+            time_budget (float): Maximum number of seconds spent scoring one query;
+                when it would be exceeded the re-ranking is abandoned
+            max_length (int): Maximum number of tokens of a (query, chunk) pair
+        """
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.time_budget = time_budget
+        self.model = None
+        self.timeouts = 0
+
+        try:
+            # Imported here: sentence-transformers pulls in torch, only needed when re-ranking is enabled
+            from sentence_transformers import CrossEncoder
+
+            self.model = CrossEncoder(model_name, device='cpu', max_length=max_length)
+            logger.info(f"Cross-encoder re-ranker initialized: {model_name}")
+        except Exception as e:
+            logger.error(f"Error initializing cross-encoder {model_name}, re-ranking disabled: {e}")
+
+    @property
+    def available(self) -> bool:
+        """Whether the model was loaded"""
+        return self.model is not None
+
+    def rerank(self, query: str, documents: List[Document], top_n: Optional[int] = None) -> Optional[List[Document]]:
+        """
+        Re-order documents by cross-encoder score
+
+        Args:
+            query (str): User query
+            documents (List[Document]): Candidate chunks, best first according to the retrieval
+            top_n (Optional[int]): Number of documents to return (all by default)
+
+        Returns:
+            Optional[List[Document]]: Re-ranked documents, or None if the model is not
+                available or the time budget ran out (the caller keeps its own order)
+        """
+        if not self.available or not documents:
+            return None
+
+        start_time = time.perf_counter()
+        scores: List[float] = []
+        try:
+            for offset in range(0, len(documents), self.batch_size):
+                batch = documents[offset:offset + self.batch_size]
+                batch_start = time.perf_counter()
+                scores.extend(float(score) for score in self.model.predict(
+                    [(query, doc.page_content) for doc in batch],
+                    batch_size=self.batch_size,
+                    show_progress_bar=False
+                ))
+
+                # Stop before the next batch would exceed the budget
+                elapsed = time.perf_counter() - start_time
+                if offset + self.batch_size < len(documents) and elapsed + (time.perf_counter() - batch_start) > self.time_budget:
+                    self.timeouts += 1
+                    logger.warning(
+                        f"Re-ranking time budget exceeded ({elapsed:.2f}s for {len(scores)}/{len(documents)} chunks), "
+                        f"keeping the heuristic order"
+                    )
+                    return None
+
+        except Exception as e:
+            logger.error(f"Error re-ranking documents: {e}")
+            return None
+
+        for doc, score in zip(documents, scores):
+            doc.metadata['rerank_score'] = score
+
+        # Stable sort: equal scores keep the retrieval order
+        ranked = sorted(documents, key=lambda doc: doc.metadata['rerank_score'], reverse=True)
+        logger.info(f"Re-ranked {len(documents)} chunks in {time.perf_counter() - start_time:.2f}s")
+        return ranked[:top_n] if top_n else ranked
@@ -2,124 +2,452 @@
 Extraction Module - Responsável por carregar documentos de diferentes fontes
 """
 
-from langchain_community.document_loaders import PyPDFLoader
 from langchain_core.documents import Document
+from pypdf import PdfReader
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import multiprocessing
 import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 import logging
 
+from .extraction_cache import ExtractionCache
+from .manifest import file_sha256
+
 # OCR imports
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, pdfinfo_from_path
 import pytesseract
 
 logger = logging.getLogger(__name__)
 
+# Bump when a change to the extraction code changes the extracted text
+EXTRACTOR_VERSION = "2"
+
+OCR_TESSERACT_CONFIG = '--psm 6 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789.,!?()[]{}":; '
+
+
+def _count_pdf_pages(file_path: str) -> int:
+    """Return the number of pages of a PDF"""
+    return len(PdfReader(file_path).pages)
+
+
+def _load_pdf_page_range(file_path: str, start: int = 0, stop: Optional[int] = None) -> List[Document]:
+    """
+    Extract the text layer of the pages [start, stop) of a PDF.
+    Module level so it can run in a worker process; the serial path uses it too, so
+    both produce the same pages and metadata under the same cache version.
+    
+    Args:
+        file_path (str): Path to the PDF file
+        start (int): First page (0-based)
+        stop (Optional[int]): Page after the last one, None for the end of the file
+        
+    Returns:
+        List[Document]: One document per page
+    """
+    reader = PdfReader(file_path)
+    total_pages = len(reader.pages)
+    documents = []
+    stop = total_pages if stop is None else min(stop, total_pages)
+    for page_number in range(start, stop):
+        documents.append(Document(
+            page_content=reader.pages[page_number].extract_text() or "",
+            metadata={
+                'source': file_path,
+                'page': page_number,
+                'total_pages': total_pages
+            }
+        ))
+    return documents
+
+
+def _ocr_pdf_page(file_path: str, page_index: int, dpi: int) -> str:
+    """
+    Render a single page of a PDF and recognize its text with Tesseract
+    
+    Args:
+        file_path (str): Path to the PDF file
+        page_index (int): Page to recognize (0-based)
+        dpi (int): Rendering resolution
+        
+    Returns:
+        str: Recognized text
+    """
+    images = convert_from_path(file_path, dpi=dpi, first_page=page_index + 1, last_page=page_index + 1)
+    try:
+        if not images:
+            return ""
+        return pytesseract.image_to_string(images[0], lang="por", config=OCR_TESSERACT_CONFIG)
+    finally:
+        # Release the page image immediately
+        for image in images:
+            image.close()
+
+
+def _ordered_submit(executor, fn, tasks: Iterable[Tuple], window: int) -> Iterator[Tuple[Tuple, Any]]:
+    """
+    Submit tasks to an executor keeping at most `window` in flight and yield
+    (task, future) pairs in submission order
+    """
+    pending = deque()
+    for task in tasks:
+        pending.append((task, executor.submit(fn, *task)))
+        if len(pending) >= window:
+            yield pending.popleft()
+    while pending:
+        yield pending.popleft()
+
+
 class DocumentExtractor:
     """Class to extract documents"""
     
-    def __init__(self, base_directory: str):
+    def __init__(self, 
+                 base_directory: str,
+                 workers: int = 1,
+                 pages_per_task: int = 25,
+                 ocr_dpi: int = 200,
+                 ocr_dpi_overrides: Optional[Dict[str, int]] = None,
+                 ocr_workers: int = 2,
+                 cache: Optional[ExtractionCache] = None):
         """
         Initialize document extractor
         
         Args:
             base_directory (str): Directory where the documents are located
+            workers (int): Number of worker processes. 1 extracts serially in the current process.
+            pages_per_task (int): Pages handled by each worker task; large PDFs are split
+                in page ranges of this size so they are spread over the pool
+            ocr_dpi (int): Resolution used to render pages for OCR
+            ocr_dpi_overrides (Optional[Dict[str, int]]): OCR resolution per file name,
+                for scans that need a different quality/memory trade-off
+            ocr_workers (int): Number of pages rendered and recognized in parallel
+            cache (Optional[ExtractionCache]): Cache of previously extracted pages
         """
         self.base_directory = base_directory
+        self.workers = max(1, workers)
+        self.pages_per_task = max(1, pages_per_task)
+        self.ocr_dpi = ocr_dpi
+        self.ocr_dpi_overrides = ocr_dpi_overrides or {}
+        self.ocr_workers = max(1, ocr_workers)
+        self.cache = cache
+    
+    def _ocr_dpi(self, file_path: str) -> int:
+        """Return the OCR resolution configured for a file"""
+        file_name = os.path.basename(file_path)
+        return self.ocr_dpi_overrides.get(file_name, self.ocr_dpi)
     
-    def _ocr_pdf(self, file_path: str) -> List[Document]:
+    def _ocr_pdf(self, file_path: str) -> Tuple[List[Document], bool]:
         """
         Perform OCR on a PDF file and return a list of page Documents.
         Uses Tesseract with Portuguese language if available.
-        Heavily optimized for memory usage.
+        Pages are rendered and recognized one at a time by a small thread pool, so at
+        most ocr_workers page images are in memory at once. A page that fails is logged
+        and skipped; the other pages are kept.
+        
+        Returns:
+            Tuple[List[Document], bool]: Recognized pages and whether every page was processed
         """
         try:
-            logger.info(f"Running OCR fallback for: {file_path}")
-            # Heavily reduced DPI and pages to save memory
-            images = convert_from_path(file_path, dpi=75, first_page=1, last_page=3)  # Limit to first 3 pages only
-            ocr_docs: List[Document] = []
-            for page_index, image in enumerate(images):
-                # Process image with memory-optimized settings
-                text = pytesseract.image_to_string(image, lang="por", config='--psm 6 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789.,!?()[]{}":; ')
-                if text.strip():  # Only add if text was extracted
-                    page_doc = Document(
-                        page_content=text,
-                        metadata={
-                            'source': file_path,
-                            'file_name': os.path.basename(file_path),
-                            'directory': os.path.dirname(file_path),
-                            'document_type': 'pdf',
-                            'extraction': 'ocr',
-                            'page_index': page_index
-                        }
-                    )
-                    ocr_docs.append(page_doc)
-                # Clear image from memory immediately
-                del image
-            logger.info(f"OCR produced {len(ocr_docs)} pages for {file_path}")
-            return ocr_docs
+            dpi = self._ocr_dpi(file_path)
+            try:
+                total_pages = _count_pdf_pages(file_path)
+            except Exception:
+                total_pages = pdfinfo_from_path(file_path)["Pages"]
+            
+            logger.info(f"Running OCR fallback for: {file_path} ({total_pages} pages at {dpi} dpi)")
+            
+            failed_pages = []
+            
+            def recognize(page_index: int) -> str:
+                # A failing page must not discard the pages recognized around it
+                try:
+                    return _ocr_pdf_page(file_path, page_index, dpi)
+                except Exception as e:
+                    logger.warning(f"OCR failed for page {page_index + 1} of {file_path}: {e}")
+                    failed_pages.append(page_index)
+                    return ""
+            
+            with ThreadPoolExecutor(max_workers=self.ocr_workers) as executor:
+                texts = executor.map(recognize, range(total_pages))
+                
+                ocr_docs: List[Document] = []
+                for page_index, text in enumerate(texts):
+                    if text.strip():  # Only add if text was extracted
+                        ocr_docs.append(Document(
+                            page_content=text,
+                            metadata={
+                                'source': file_path,
+                                'file_name': os.path.basename(file_path),
+                                'directory': os.path.dirname(file_path),
+                                'document_type': 'pdf',
+                                'extraction': 'ocr',
+                                'page': page_index,
+                                'page_index': page_index,
+                                'ocr_dpi': dpi
+                            }
+                        ))
+            
+            logger.info(f"OCR produced {len(ocr_docs)} pages for {file_path} ({len(failed_pages)} failed)")
+            return ocr_docs, not failed_pages
         except Exception as e:
             logger.error(f"OCR fallback failed for {file_path}: {e}")
-            return []
+            return [], False
         
-    def extract_pdfs(self) -> List[Document]:
+    def _extract_pdf(self, file_path: str) -> Tuple[List[Document], bool]:
         """
-        Extract PDFs from base_directory and subdirectories with memory optimization
+        Extract the pages of a single PDF, falling back to OCR when it has no text layer
         
+        Args:
+            file_path (str): Path to the PDF file
+            
         Returns:
-            List[Document]: List of extracted documents
+            Tuple[List[Document], bool]: Extracted pages and whether they may be cached
         """
-        documents = []
-        # ORIGINAL CONFIGURATION - process all files like it was working
-        processed_files = 0
+        logger.info(f"Processando PDF: {file_path}")
         
-        if not os.path.isdir(self.base_directory):
-            logger.error(f"Diretório base não encontrado: {self.base_directory}")
-            return documents
+        # Same page loader as the worker processes, so the cached pages do not depend on the mode
+        return self._finalize_pdf(file_path, _load_pdf_page_range(file_path))
+    
+    def _finalize_pdf(self, file_path: str, pdf_documents: List[Document]) -> Tuple[List[Document], bool]:
+        """
+        Add metadata to the extracted pages and fall back to OCR when the PDF has no text layer
+        
+        Args:
+            file_path (str): Path to the PDF file
+            pdf_documents (List[Document]): Pages extracted from the text layer
             
-        logger.info(f"Iniciando extração de PDFs em: {self.base_directory} (ORIGINAL - all files)")
+        Returns:
+            Tuple[List[Document], bool]: Final pages of the PDF, and False when OCR was
+                needed but produced nothing or failed on some pages (the pages must not be
+                cached, so the next build tries the OCR again)
+        """
+        file_name = os.path.basename(file_path)
         
-        # Recursively traverse the base directory - ORIGINAL CONFIGURATION
+        # Add additional metadata
+        for doc in pdf_documents:
+            doc.metadata.update({
+                'source': file_path,
+                'file_name': file_name,
+                'directory': os.path.dirname(file_path),
+                'document_type': 'pdf',
+                'extraction': 'text'
+            })
+        
+        # If text extraction produced too little content, try OCR fallback
+        complete = True
+        total_chars = sum(len(d.page_content.strip()) for d in pdf_documents)
+        if total_chars < 10:  # Very restrictive threshold to avoid unnecessary OCR
+            logger.warning(f"Extremely low text content detected ({total_chars} chars). Attempting OCR for: {file_name}")
+            ocr_docs, ocr_complete = self._ocr_pdf(file_path)
+            if ocr_docs:
+                pdf_documents = ocr_docs
+            complete = bool(ocr_docs) and ocr_complete
+        
+        logger.info(f"  - {len(pdf_documents)} pages extracted from {file_name}")
+        return pdf_documents, complete
+    
+    def _list_pdfs(self) -> List[str]:
+        """
+        List the PDFs in base_directory and subdirectories in a deterministic order
+        
+        Returns:
+            List[str]: Paths of the PDF files
+        """
+        file_paths = []
         for root, dirs, files in os.walk(self.base_directory):
-            for file_name in files:
+            dirs.sort()
+            for file_name in sorted(files):
                 if file_name.lower().endswith('.pdf'):
-                    file_path = os.path.join(root, file_name)
-                    try:
-                        logger.info(f"Processando PDF: {file_path}")
-                        
-                        # Load the PDF document
-                        loader = PyPDFLoader(file_path)
-                        pdf_documents = loader.load()
-                        
-                        # ORIGINAL CONFIGURATION - no page limits
-                        
-                        # Add additional metadata
-                        for doc in pdf_documents:
-                            doc.metadata.update({
-                                'source': file_path,
-                                'file_name': file_name,
-                                'directory': root,
-                                'document_type': 'pdf',
-                                'extraction': 'text'
-                            })
-                        
-                        # If text extraction produced too little content, try OCR fallback
-                        total_chars = sum(len(d.page_content.strip()) for d in pdf_documents)
-                        if total_chars < 10:  # Very restrictive threshold to avoid unnecessary OCR
-                            logger.warning(f"Extremely low text content detected ({total_chars} chars). Attempting OCR for: {file_name}")
-                            ocr_docs = self._ocr_pdf(file_path)
-                            if ocr_docs:
-                                pdf_documents = ocr_docs
-                        
-                        documents.extend(pdf_documents)
-                        processed_files += 1
-                        logger.info(f"  - {len(pdf_documents)} pages extracted from {file_name}")
-                        
-                    except Exception as e:
+                    file_paths.append(os.path.join(root, file_name))
+        return file_paths
+    
+    def _page_range_tasks(self, file_paths: List[str]) -> Iterator[Tuple[str, int, int]]:
+        """
+        Split the files into (file_path, start, stop) page ranges
+        
+        Args:
+            file_paths (List[str]): Paths of the PDF files
+            
+        Yields:
+            Tuple[str, int, int]: Page range of a file
+        """
+        for file_path in file_paths:
+            try:
+                total_pages = _count_pdf_pages(file_path)
+            except Exception:
+                # Unreadable file: a single task lets the worker report the error
+                total_pages = 0
+            
+            for start in range(0, max(total_pages, 1), self.pages_per_task):
+                yield (file_path, start, start + self.pages_per_task)
+    
+    def _iter_pdfs_parallel(self, file_paths: List[str]) -> Iterator[Tuple[str, Optional[List[Document]], bool]]:
+        """
+        Extract the files with a process pool, yielding the pages of each file in the
+        order of file_paths
+        
+        Args:
+            file_paths (List[str]): Paths of the PDF files
+            
+        Yields:
+            Tuple[str, Optional[List[Document]], bool]: Path and pages of a file (None if it
+                failed), and whether the pages may be cached
+        """
+        # spawn instead of fork: the parent may hold model and database threads
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as executor:
+            current_file, current_pages, failed = None, [], False
+            
+            for (file_path, start, stop), future in _ordered_submit(
+                executor, _load_pdf_page_range, self._page_range_tasks(file_paths), self.workers * 2
+            ):
+                if file_path != current_file:
+                    if current_file is not None:
+                        pages, complete = (None, False) if failed else self._finalize_pdf(current_file, current_pages)
+                        yield current_file, pages, complete
+                    current_file, current_pages, failed = file_path, [], False
+                    logger.info(f"Processando PDF: {file_path}")
+                
+                try:
+                    current_pages.extend(future.result())
+                except Exception as e:
+                    if not failed:
                         logger.error(f"Error while processing file: {file_path}: {e}")
-                        continue
+                    failed = True
+            
+            if current_file is not None:
+                pages, complete = (None, False) if failed else self._finalize_pdf(current_file, current_pages)
+                yield current_file, pages, complete
+    
+    def _iter_pdfs_serial(self, file_paths: List[str]) -> Iterator[Tuple[str, Optional[List[Document]], bool]]:
+        """
+        Extract the files one at a time in the current process
         
-        logger.info(f"Total of {len(documents)} documents extracted from {processed_files} files")
-        return documents
+        Args:
+            file_paths (List[str]): Paths of the PDF files
+            
+        Yields:
+            Tuple[str, Optional[List[Document]], bool]: Path and pages of a file (None if it
+                failed), and whether the pages may be cached
+        """
+        for file_path in file_paths:
+            try:
+                pages, complete = self._extract_pdf(file_path)
+            except Exception as e:
+                logger.error(f"Error while processing file: {file_path}: {e}")
+                pages, complete = None, False
+            yield file_path, pages, complete
+    
+    def _cache_version(self, file_path: str) -> str:
+        """
+        Version under which the pages of a file are cached: changes when the extraction
+        code or the OCR resolution of the file changes
+        """
+        return f"{EXTRACTOR_VERSION}-dpi{self._ocr_dpi(file_path)}"
+    
+    def iter_files(self, 
+                   file_paths: List[str], 
+                   file_hashes: Optional[Dict[str, str]] = None) -> Iterator[Document]:
+        """
+        Lazily extract the given files, yielding their pages in the order of file_paths.
+        Only the file being processed (plus the pages in flight in the process pool) is
+        held in memory. Files already present in the extraction cache are read from it
+        instead of being parsed and OCR'd again.
+        
+        Args:
+            file_paths (List[str]): Paths of the files to extract
+            file_hashes (Optional[Dict[str, str]]): Known content hash of each file;
+                missing hashes are computed when the cache is enabled
+            
+        Yields:
+            Document: Extracted pages
+        """
+        extracted_pages = 0
+        processed_files = 0
+        cached_files = 0
+        
+        hashes = {}
+        if self.cache is not None:
+            file_hashes = file_hashes or {}
+            for file_path in file_paths:
+                hashes[file_path] = file_hashes.get(file_path) or file_sha256(file_path)
+        
+        cached = {
+            file_path for file_path in file_paths
+            if self.cache is not None and self.cache.contains(hashes[file_path], self._cache_version(file_path))
+        }
+        to_extract = [file_path for file_path in file_paths if file_path not in cached]
+        
+        if self.workers > 1 and len(to_extract) > 0:
+            pdf_iterator = self._iter_pdfs_parallel(to_extract)
+        else:
+            pdf_iterator = self._iter_pdfs_serial(to_extract)
+        
+        for file_path in file_paths:
+            if file_path in cached:
+                pdf_documents = self.cache.get(hashes[file_path], self._cache_version(file_path), file_path)
+                cached_files += 1
+            else:
+                _, pdf_documents, complete = next(pdf_iterator)
+                if pdf_documents is None:
+                    continue
+                if self.cache is not None and pdf_documents and complete:
+                    self.cache.put(hashes[file_path], self._cache_version(file_path), pdf_documents)
+            
+            processed_files += 1
+            extracted_pages += len(pdf_documents or [])
+            yield from pdf_documents or []
+        
+        logger.info(
+            f"Total of {extracted_pages} documents extracted from {processed_files} files "
+            f"({cached_files} from the extraction cache)"
+        )
+    
+    def extract_files(self, 
+                      file_paths: List[str], 
+                      file_hashes: Optional[Dict[str, str]] = None) -> List[Document]:
+        """
+        Extract only the given files
+        
+        Args:
+            file_paths (List[str]): Paths of the files to extract
+            file_hashes (Optional[Dict[str, str]]): Known content hash of each file
+            
+        Returns:
+            List[Document]: List of extracted documents, in the order of file_paths
+        """
+        return list(self.iter_files(file_paths, file_hashes))
+    
+    def extract_pdfs(self) -> List[Document]:
+        """
+        Extract PDFs from base_directory and subdirectories
+        
+        Returns:
+            List[Document]: List of extracted documents
+        """
+        if not os.path.isdir(self.base_directory):
+            logger.error(f"Diretório base não encontrado: {self.base_directory}")
+            return []
+            
+        logger.info(f"Iniciando extração de PDFs em: {self.base_directory}")
+        
+        return self.extract_files(self._list_pdfs())
+    
+    def iter_documents(self) -> Iterator[Document]:
+        """
+        Lazily extract all supported documents
+        
+        Yields:
+            Document: Extracted pages
+        """
+        if not os.path.isdir(self.base_directory):
+            logger.error(f"Diretório base não encontrado: {self.base_directory}")
+            return
+        
+        logger.info(f"Iniciando extração de PDFs em: {self.base_directory}")
+        
+        # Add other types of documents here, like .txt, .docx, etc.
+        yield from self.iter_files(self._list_pdfs())
     
     def extract_documents(self) -> List[Document]:
         """
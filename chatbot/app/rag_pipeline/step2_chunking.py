@@ -4,11 +4,15 @@ Chunking Module - Responsible for dividing documents into smaller chunks for pro
 
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator
+import hashlib
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Bump when the layout of deterministic chunk IDs changes (stored IDs must be rebuilt)
+CHUNK_ID_VERSION = 2
+
 class DocumentChunker:
     """Class to divide documents into smaller chunks"""
     
@@ -39,39 +43,52 @@ class DocumentChunker:
             is_separator_regex=False
         )
     
-    def chunk_documents(self, documents: List[Document]) -> List[Document]:
+    def _chunk_id(self, document: Document, document_index: int, chunk_index: int) -> str:
         """
-        Divide a list of documents into smaller chunks
+        Build the ID of a chunk. Documents tagged with the hash and path of their source file
+        get a deterministic ID (file hash + path digest + page + chunk index), stable across
+        rebuilds; the path keeps identical files stored at different paths apart.
         
         Args:
-            documents (List[Document]): List of documents to divide
+            document (Document): Document the chunk was split from
+            document_index (int): Position of the document in the current batch
+            chunk_index (int): Position of the chunk within the document
             
         Returns:
-            List[Document]: List of document chunks
+            str: Chunk ID
         """
-        if not documents:
-            logger.warning("No documents provided for chunking")
-            return []
+        file_hash = document.metadata.get('file_hash')
+        if not file_hash:
+            return f"{document_index}_{chunk_index}"
         
-        logger.info(f"Starting chunking of {len(documents)} documents")
-
+        file_path = document.metadata.get('file_path') or document.metadata.get('source') or ''
+        path_digest = hashlib.sha256(file_path.encode('utf-8')).hexdigest()[:12]
+        page = document.metadata.get('page', document.metadata.get('page_index', 0))
+        return f"{file_hash[:16]}:{path_digest}:{page}:{chunk_index}"
+    
+    def iter_chunks(self, documents: Iterable[Document]) -> Iterator[Document]:
+        """
+        Lazily divide documents into smaller chunks, one document at a time
         
-        all_chunks = []
+        Args:
+            documents (Iterable[Document]): Documents to divide, consumed lazily
+            
+        Yields:
+            Document: Document chunks
+        """
+        total_documents = 0
+        total_chunks = 0
         
         for i, doc in enumerate(documents):
+            total_documents += 1
             try:
-                # Process documents in smaller batches to save memory
-                if i % 5 == 0:  # Process every 5 documents and clear memory
-                    import gc
-                    gc.collect()
-                
                 # Divide the document into chunks
                 chunks = self.text_splitter.split_documents([doc])
                 
                 # Add specific chunking metadata (minimal to save memory)
                 for j, chunk in enumerate(chunks):
                     chunk.metadata.update({
-                        'chunk_id': f"{i}_{j}",
+                        'chunk_id': self._chunk_id(doc, i, j),
                         'chunk_index': j,
                         'chunk_size': len(chunk.page_content)
                     })
@@ -81,18 +98,34 @@ class DocumentChunker:
                         f"Document {i+1} produced 0 chunks | file_name={doc.metadata.get('file_name')}"
                     )
                 
-                all_chunks.extend(chunks)
                 logger.info(f"  - Document {i+1}: {len(chunks)} chunks created")
                 
-                # Clear document from memory after processing
-                del doc
-                
             except Exception as e:
                 logger.error(f"Error chunking document {i}: {e}")
                 continue
+            
+            total_chunks += len(chunks)
+            yield from chunks
+        
+        logger.info(f"Total of {total_chunks} chunks created from {total_documents} documents")
+    
+    def chunk_documents(self, documents: List[Document]) -> List[Document]:
+        """
+        Divide a list of documents into smaller chunks
+        
+        Args:
+            documents (List[Document]): List of documents to divide
+            
+        Returns:
+            List[Document]: List of document chunks
+        """
+        if not documents:
+            logger.warning("No documents provided for chunking")
+            return []
+        
+        logger.info(f"Starting chunking of {len(documents)} documents")
         
-        logger.info(f"Total of {len(all_chunks)} chunks created")
-        return all_chunks
+        return list(self.iter_chunks(documents))
     
     def chunk_single_document(self, document: Document) -> List[Document]:
         """
@@ -6,11 +6,15 @@ Embedding Module - Responsible for creating embeddings and managing the vector s
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_chroma import Chroma
 from langchain_core.documents import Document
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable, Optional, Tuple
 import os
 import logging
+import time
 from dotenv import load_dotenv
 
+from .embedding_cache import CachedEmbeddings, EmbeddingCache
+from .lexical_index import BM25Index
+
 # Uncomment to use with OpenAIEmbeddings
 # load_dotenv()
 
@@ -22,7 +26,9 @@ class EmbeddingManager:
     def __init__(self, 
                  collection_name: str = "sefaz_docs",
                  persist_directory: str = "data/chroma_db",
-                 embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2"):
+                 embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2",
+                 cache_directory: Optional[str] = None,
+                 lexical_stemming: bool = False):
         """
         Initialize the embedding manager
         
@@ -30,6 +36,9 @@ class EmbeddingManager:
             collection_name (str): Name of the collection in the vector store
             persist_directory (str): Directory to persist the vector store
             embedding_model (str): Embedding model to be used
+            cache_directory (Optional[str]): Directory of the persistent embedding cache;
+                when set, only chunk texts that were never embedded are encoded
+            lexical_stemming (bool): Reduce plural words to the singular in the BM25 index
         """
         self.collection_name = collection_name
         self.persist_directory = persist_directory
@@ -38,6 +47,13 @@ class EmbeddingManager:
         # Create the persistence directory if it doesn't exist
         os.makedirs(self.persist_directory, exist_ok=True)
         
+        # BM25 index kept in sync with the collection for lexical search
+        lexical_index_path = os.path.join(self.persist_directory, f"{self.collection_name}.bm25.json.gz")
+        self.lexical_index = BM25Index.load(lexical_index_path)
+        if self.lexical_index is None or self.lexical_index.stemming != lexical_stemming:
+            # Left empty, it is rebuilt from the collection by get_lexical_index
+            self.lexical_index = BM25Index(lexical_index_path, stemming=lexical_stemming)
+        
         # Uncomment to use OpenAI embedding model
         # try:
         #     self.embeddings = OpenAIEmbeddings(model=embedding_model)
@@ -59,6 +75,12 @@ class EmbeddingManager:
         except Exception as e:
             logger.error(f"Error initializing embedding model: {e}")
             raise
+        
+        if cache_directory:
+            self.embeddings = CachedEmbeddings(
+                self.embeddings,
+                EmbeddingCache(cache_directory, self.embedding_model)
+            )
     
     def create_vector_store(self, chunks: List[Document]) -> Optional[Chroma]:
         """
@@ -80,10 +102,14 @@ class EmbeddingManager:
             vector_store = Chroma.from_documents(
                 documents=chunks,
                 embedding=self.embeddings,
+                ids=self._chunk_ids(chunks),
                 collection_name=self.collection_name,
                 persist_directory=self.persist_directory
             )
             
+            self._index_lexically(chunks)
+            self.lexical_index.save()
+            
             logger.info(f"Vector store '{self.collection_name}' created and persisted successfully")
             
             return vector_store
@@ -115,17 +141,137 @@ class EmbeddingManager:
             logger.error(f"Error loading vector store: {e}")
             return None
     
-    def update_vector_store(self, new_chunks: List[Document]) -> Optional[Chroma]:
+    def _chunk_ids(self, chunks: List[Document]) -> Optional[List[str]]:
+        """
+        Return the deterministic IDs of the chunks, or None if any chunk has no ID
+        (Chroma then generates random IDs)
+        
+        Args:
+            chunks (List[Document]): Chunks created by the DocumentChunker
+            
+        Returns:
+            Optional[List[str]]: Chunk IDs
+        """
+        ids = [chunk.metadata.get('chunk_id') for chunk in chunks]
+        if not all(ids) or len(set(ids)) != len(ids):
+            return None
+        return ids
+    
+    def _index_lexically(self, chunks: List[Document]) -> None:
+        """Add the chunks that have a deterministic ID to the BM25 index"""
+        self.lexical_index.add(
+            (chunk.metadata['chunk_id'], chunk.page_content, chunk.metadata.get('file_path'))
+            for chunk in chunks
+            if chunk.metadata.get('chunk_id')
+        )
+    
+    def _add_new_chunks(self, vector_store: Chroma, chunks: List[Document]) -> Tuple[int, int]:
+        """
+        Embed and add the chunks whose ID is not stored yet
+        
+        Args:
+            vector_store (Chroma): Vector store to write to
+            chunks (List[Document]): Chunks to add
+            
+        Returns:
+            Tuple[int, int]: Number of chunks written and number of chunks skipped
+        """
+        ids = self._chunk_ids(chunks)
+        if ids is None:
+            vector_store.add_documents(chunks)
+            return len(chunks), 0
+        
+        # Skip chunks that are already stored: same ID means same file content
+        existing_ids = set(vector_store._collection.get(ids=ids, include=[])["ids"])
+        missing = [(chunk_id, chunk) for chunk_id, chunk in zip(ids, chunks) if chunk_id not in existing_ids]
+        if missing:
+            vector_store.add_documents(
+                [chunk for _, chunk in missing],
+                ids=[chunk_id for chunk_id, _ in missing]
+            )
+        # Re-indexing stored chunks is idempotent and repairs an outdated lexical index
+        self._index_lexically(chunks)
+        return len(missing), len(existing_ids)
+    
+    def write_chunks(self, chunks: Iterable[Document], batch_size: int = 50) -> Optional[Dict[str, Any]]:
         """
-        Update the existing vector store with new chunks
+        Stream chunks into the collection: every batch is embedded exactly once and
+        appended to the same collection, so only one batch is held in memory at a time
         
         Args:
-            new_chunks (List[Document]): New chunks to add
+            chunks (Iterable[Document]): Chunks to write, consumed lazily
+            batch_size (int): Number of chunks embedded per batch
+            
+        Returns:
+            Optional[Dict[str, Any]]: Write statistics or None if there is an error
+        """
+        vector_store = self.load_vector_store()
+        if vector_store is None:
+            return None
+        
+        stats = {"batches": 0, "chunks_written": 0, "chunks_skipped": 0}
+        cached_embeddings = self.embeddings if isinstance(self.embeddings, CachedEmbeddings) else None
+        cache_counters = (cached_embeddings.hits, cached_embeddings.misses) if cached_embeddings else (0, 0)
+        start_time = time.perf_counter()
+        
+        def flush(batch: List[Document]) -> None:
+            written, skipped = self._add_new_chunks(vector_store, batch)
+            stats["batches"] += 1
+            stats["chunks_written"] += written
+            stats["chunks_skipped"] += skipped
+            elapsed = max(time.perf_counter() - start_time, 1e-9)
+            logger.info(
+                f"Embedding batch {stats['batches']}: {stats['chunks_written']} chunks written, "
+                f"{stats['chunks_skipped']} skipped ({stats['chunks_written'] / elapsed:.1f} chunks/sec)"
+            )
+        
+        try:
+            batch = []
+            for chunk in chunks:
+                batch.append(chunk)
+                if len(batch) >= batch_size:
+                    flush(batch)
+                    batch = []
+            if batch:
+                flush(batch)
+            
+        except Exception as e:
+            logger.error(f"Error writing chunks to vector store: {e}")
+            return None
+        
+        finally:
+            # Keep the lexical index in sync with whatever reached the collection
+            self.lexical_index.save()
+        
+        if cached_embeddings:
+            stats["embedding_cache_hits"] = cached_embeddings.hits - cache_counters[0]
+            stats["embedding_cache_misses"] = cached_embeddings.misses - cache_counters[1]
+        
+        elapsed = time.perf_counter() - start_time
+        stats["elapsed_seconds"] = round(elapsed, 3)
+        stats["chunks_per_second"] = round(stats["chunks_written"] / elapsed, 2) if elapsed > 0 else 0.0
+        logger.info(
+            f"Wrote {stats['chunks_written']} chunks in {stats['batches']} batches "
+            f"({stats['elapsed_seconds']}s, {stats['chunks_per_second']} chunks/sec)"
+        )
+        return stats
+    
+    def update_vector_store(self, 
+                            new_chunks: List[Document], 
+                            removed_file_paths: Optional[List[str]] = None) -> Optional[Chroma]:
+        """
+        Update the existing vector store: chunks of removed or modified files are deleted
+        and only chunks whose ID is not stored yet are embedded
+        
+        Args:
+            new_chunks (List[Document]): Chunks to upsert
+            removed_file_paths (Optional[List[str]]): Relative paths of files whose chunks
+                must be removed (deleted files and previous versions of modified files)
             
         Returns:
             Optional[Chroma]: Updated vector store or None if there is an error
         """
-        if not new_chunks:
+        if not new_chunks and not removed_file_paths:
             logger.warning("No new chunks provided to update")
             return None
         
@@ -136,11 +282,17 @@ class EmbeddingManager:
             logger.info("Vector store not found, creating new")
             return self.create_vector_store(new_chunks)
         
-        logger.info(f"Adding {len(new_chunks)} new chunks to vector store")
-        
         try:
-            # Add the new chunks
-            vector_store.add_documents(new_chunks)
+            if removed_file_paths and not self.delete_file_chunks(removed_file_paths):
+                return None
+            
+            if not new_chunks:
+                logger.info("Vector store updated successfully")
+                return vector_store
+            
+            written, skipped = self._add_new_chunks(vector_store, new_chunks)
+            self.lexical_index.save()
+            logger.info(f"Added {written} new chunks to vector store ({skipped} already indexed)")
             
             logger.info("Vector store updated successfully")
             return vector_store
@@ -149,6 +301,95 @@ class EmbeddingManager:
             logger.error(f"Error updating vector store: {e}")
             return None
     
+    def delete_file_chunks(self, file_paths: List[str]) -> bool:
+        """
+        Remove every chunk that was extracted from the given files. Chunks are matched by
+        path, so an identical copy of a file stored elsewhere keeps its chunks.
+
+        Args:
+            file_paths (List[str]): Paths, relative to the documents directory, of the files
+                whose chunks must be removed
+
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        if not file_paths:
+            return True
+
+        vector_store = self.load_vector_store()
+        if vector_store is None:
+            return False
+
+        try:
+            vector_store._collection.delete(where={"file_path": {"$in": list(file_paths)}})
+            self.lexical_index.remove_files(file_paths)
+            self.lexical_index.save()
+            logger.info(f"Removed chunks of {len(file_paths)} files from vector store")
+            return True
+
+        except Exception as e:
+            logger.error(f"Error removing chunks from vector store: {e}")
+            return False
+
+    def reset_vector_store(self) -> bool:
+        """
+        Remove every chunk of the collection, keeping the persist directory
+
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        vector_store = self.load_vector_store()
+        if vector_store is None:
+            return False
+
+        try:
+            vector_store.delete_collection()
+            self.lexical_index.clear()
+            self.lexical_index.save()
+            logger.info(f"Collection '{self.collection_name}' reset")
+            return True
+
+        except Exception as e:
+            logger.error(f"Error resetting vector store: {e}")
+            return False
+
+    def get_lexical_index(self, vector_store: Optional[Chroma] = None, page_size: int = 1000) -> Optional[BM25Index]:
+        """
+        Return the BM25 index of the collection, rebuilding it from the stored chunks
+        when it is missing or out of sync (e.g. a vector store built before it existed)
+        
+        Args:
+            vector_store (Optional[Chroma]): Loaded vector store, loaded if not given
+            page_size (int): Number of chunks read from the collection at a time
+            
+        Returns:
+            Optional[BM25Index]: Lexical index or None if there is an error
+        """
+        vector_store = vector_store or self.load_vector_store()
+        if vector_store is None:
+            return None
+        
+        try:
+            collection = vector_store._collection
+            count = collection.count()
+            if count == len(self.lexical_index):
+                return self.lexical_index
+            
+            logger.info(f"Rebuilding lexical index from {count} stored chunks")
+            self.lexical_index.clear()
+            for offset in range(0, count, page_size):
+                page = collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+                self.lexical_index.add(
+                    (chunk_id, content or "", (metadata or {}).get('file_path'))
+                    for chunk_id, content, metadata in zip(page["ids"], page["documents"], page["metadatas"])
+                )
+            self.lexical_index.save()
+            return self.lexical_index
+            
+        except Exception as e:
+            logger.error(f"Error loading lexical index: {e}")
+            return None
+    
     def get_vector_store_info(self) -> Dict[str, Any]:
         """
         Return information about the vector store
@@ -3,22 +3,120 @@ Search Module - Responsible for performing semantic searches in the vector store
 """
 
 from langchain_core.documents import Document
-from typing import List, Dict, Any, Optional
+from collections import Counter
+from typing import List, Dict, Any, Optional, Sequence, Tuple, Union
 import logging
 
+import numpy as np
+
+from .caching import QueryEmbeddingCache
+from .lexical_index import BM25Index
+from .reranking import CrossEncoderReranker
+from .text_processing import analyze, fold_text
+from .tokens import count_tokens
+
 logger = logging.getLogger(__name__)
 
+# Rank offset of reciprocal-rank fusion; 60 is the value from the original RRF paper
+RRF_K = 60
+
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], rrf_k: int = RRF_K) -> List[Document]:
+    """
+    Merge ranked result lists with reciprocal-rank fusion: each document scores
+    sum(1 / (rrf_k + rank)) over the lists it appears in
+    
+    Args:
+        rankings (List[List[Document]]): Result lists, best first; documents are matched by ID
+        rrf_k (int): Rank offset
+        
+    Returns:
+        List[Document]: Unique documents sorted by fused score, stored in metadata['rrf_score']
+    """
+    scores: Dict[str, float] = {}
+    documents: Dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            scores[doc.id] = scores.get(doc.id, 0.0) + 1.0 / (rrf_k + rank)
+            # The first list wins, so dense results keep their own distance
+            documents.setdefault(doc.id, doc)
+    
+    fused = sorted(documents.values(), key=lambda doc: scores[doc.id], reverse=True)
+    for doc in fused:
+        doc.metadata['rrf_score'] = scores[doc.id]
+    return fused
+
 class SearchEngine:
     """Class to perform semantic searches in the vector store"""
     
-    def __init__(self, vector_store):
+    def __init__(self, 
+                 vector_store, 
+                 query_cache: Optional[QueryEmbeddingCache] = None,
+                 lexical_index: Optional[BM25Index] = None,
+                 reranker: Optional[CrossEncoderReranker] = None,
+                 mmr_lambda: float = 0.7,
+                 duplicate_threshold: float = 0.95):
         """
         Initialize the search engine
         
         Args:
             vector_store: Loaded vector store (Chroma)
+            query_cache (Optional[QueryEmbeddingCache]): Cache of query embeddings, shared
+                across requests (and across search engines of the same pipeline)
+            lexical_index (Optional[BM25Index]): BM25 index of the same collection; without it
+                hybrid search falls back to dense searches per keyword
+            reranker (Optional[CrossEncoderReranker]): Cross-encoder applied after the
+                hybrid search heuristic
+            mmr_lambda (float): Trade-off between relevance (1.0) and diversity (0.0) when
+                selecting hybrid search results
+            duplicate_threshold (float): Cosine similarity above which a chunk is considered
+                a near-duplicate of an already selected chunk and dropped
         """
         self.vector_store = vector_store
+        self.query_cache = query_cache if query_cache is not None else QueryEmbeddingCache()
+        self.lexical_index = lexical_index
+        self.reranker = reranker
+        self.mmr_lambda = mmr_lambda
+        self.duplicate_threshold = duplicate_threshold
+    
+    def embed_query(self, query: str) -> np.ndarray:
+        """
+        Return the embedding of a query, encoding it only on a cache miss
+        
+        Args:
+            query (str): Query to be embedded
+            
+        Returns:
+            np.ndarray: Query embedding (float32, shared with the cache)
+        """
+        embedding = self.query_cache.get_embedding(query)
+        if embedding is None:
+            # Bypass the document embedding cache: queries must not be persisted with chunks
+            embeddings = self.vector_store.embeddings
+            embeddings = getattr(embeddings, 'base_embeddings', embeddings)
+            embedding = self.query_cache.put_embedding(query, embeddings.embed_query(query))
+        return embedding
+    
+    def _search_with_score(self, 
+                           query: str, 
+                           k: int, 
+                           metadata_filter: Optional[Dict[str, Any]] = None) -> List[Tuple[Document, float]]:
+        """
+        Nearest-neighbor search by the (cached) query embedding
+        
+        Args:
+            query (str): Query to be searched
+            k (int): Maximum number of results
+            metadata_filter (Optional[Dict[str, Any]]): Metadata filters
+            
+        Returns:
+            List[Tuple[Document, float]]: Documents and their distances
+        """
+        return self.vector_store.similarity_search_by_vector_with_relevance_scores(
+            self.embed_query(query).tolist(),
+            k=k,
+            filter=metadata_filter
+        )
     
     def similarity_search(self, 
                         query: str, 
@@ -43,10 +141,7 @@ class SearchEngine:
             logger.info(f"Performing search for: '{query}'")
             
             # Perform similarity search;
-            results = self.vector_store.similarity_search_with_score(
-                query, 
-                k=k
-            )
+            results = self._search_with_score(query, k=k)
             
             # Sort by ascending distance
             results = sorted(results, key=lambda pair: pair[1])
@@ -68,6 +163,173 @@ class SearchEngine:
             logger.error(f"Error in similarity search: {e}")
             return []
     
+    def embed_queries(self, queries: Sequence[str]) -> List[np.ndarray]:
+        """
+        Return the embeddings of several queries, encoding all cache misses in one
+        model forward pass
+        
+        Args:
+            queries (Sequence[str]): Queries to be embedded
+            
+        Returns:
+            List[np.ndarray]: One embedding per query, in order (float32)
+        """
+        embeddings = [self.query_cache.get_embedding(query) for query in queries]
+        
+        # Queries that share a cache key are encoded once
+        missing: Dict[str, str] = {}
+        for query, embedding in zip(queries, embeddings):
+            if embedding is None:
+                missing.setdefault(self.query_cache.key(query), query)
+        
+        if missing:
+            model = self.vector_store.embeddings
+            model = getattr(model, 'base_embeddings', model)
+            # Same encoding as embed_query for the (instruction-free) sentence-transformers models
+            encoded = {
+                key: self.query_cache.put_embedding(query, embedding)
+                for (key, query), embedding in zip(missing.items(), model.embed_documents(list(missing.values())))
+            }
+            embeddings = [
+                embedding if embedding is not None else encoded[self.query_cache.key(query)]
+                for query, embedding in zip(queries, embeddings)
+            ]
+        
+        return embeddings
+    
+    def batch_similarity_search(self, 
+                                queries: Sequence[str], 
+                                k: Union[int, Sequence[int]] = 4, 
+                                metadata_filter: Optional[Dict[str, Any]] = None) -> List[List[Document]]:
+        """
+        Perform several similarity searches with one embedding pass and one
+        multi-query nearest-neighbor lookup
+        
+        Args:
+            queries (Sequence[str]): Queries to be searched
+            k (Union[int, Sequence[int]]): Maximum number of results, for all queries or per query
+            metadata_filter (Optional[Dict[str, Any]]): Metadata filters
+            
+        Returns:
+            List[List[Document]]: Documents of each query sorted by ascending distance
+        """
+        if not self.vector_store:
+            logger.error("Vector store not available for search")
+            return [[] for _ in queries]
+        
+        limits = [k] * len(queries) if isinstance(k, int) else list(k)
+        active = [i for i, limit in enumerate(limits) if limit > 0]
+        results: List[List[Document]] = [[] for _ in queries]
+        if not active:
+            return results
+        
+        try:
+            logger.info(f"Performing batched search for {len(active)} queries")
+            
+            embeddings = self.embed_queries([queries[i] for i in active])
+            response = self.vector_store._collection.query(
+                query_embeddings=[embedding.tolist() for embedding in embeddings],
+                n_results=max(limits[i] for i in active),
+                where=metadata_filter or None,
+                include=["documents", "metadatas", "distances"]
+            )
+            
+            for position, i in enumerate(active):
+                rows = zip(
+                    response["ids"][position],
+                    response["documents"][position],
+                    response["metadatas"][position],
+                    response["distances"][position]
+                )
+                for chunk_id, content, metadata, distance in list(rows)[:limits[i]]:
+                    metadata = dict(metadata or {})
+                    metadata['distance'] = distance
+                    metadata['similarity'] = 1.0 / (1.0 + float(distance))
+                    results[i].append(Document(id=chunk_id, page_content=content, metadata=metadata))
+            
+            return results
+            
+        except Exception as e:
+            logger.error(f"Error in batched similarity search: {e}")
+            return [[] for _ in queries]
+    
+    def lexical_search(self, query: str, k: int = 10) -> List[Document]:
+        """
+        Perform BM25 search on the lexical index. Chunks are read back from the
+        vector store in one call and get the same distance/similarity metadata as
+        dense results, computed from their stored embeddings
+        
+        Args:
+            query (str): Query to be searched
+            k (int): Maximum number of results
+            
+        Returns:
+            List[Document]: Documents sorted by descending BM25 score
+        """
+        if not self.vector_store or self.lexical_index is None:
+            return []
+        
+        try:
+            hits = self.lexical_index.search(query, k=k)
+            if not hits:
+                return []
+            
+            ids = [chunk_id for chunk_id, _ in hits]
+            stored = self.vector_store._collection.get(
+                ids=ids,
+                include=["documents", "metadatas", "embeddings"]
+            )
+            rows = {
+                chunk_id: (content, metadata, embedding)
+                for chunk_id, content, metadata, embedding in zip(
+                    stored["ids"], stored["documents"], stored["metadatas"], stored["embeddings"]
+                )
+            }
+            
+            # Squared L2, the distance of the default Chroma space
+            query_embedding = self.embed_query(query)
+            results = []
+            for chunk_id, bm25_score in hits:
+                if chunk_id not in rows:
+                    continue
+                content, metadata, embedding = rows[chunk_id]
+                distance = float(np.sum((np.asarray(embedding, dtype=np.float32) - query_embedding) ** 2))
+                metadata = dict(metadata or {})
+                metadata['distance'] = distance
+                metadata['similarity'] = 1.0 / (1.0 + distance)
+                metadata['bm25_score'] = bm25_score
+                results.append(Document(id=chunk_id, page_content=content, metadata=metadata))
+            
+            return results
+            
+        except Exception as e:
+            logger.error(f"Error in lexical search: {e}")
+            return []
+    
+    def get_documents(self, chunk_ids: List[str]) -> List[Document]:
+        """
+        Read chunks from the vector store by ID
+        
+        Args:
+            chunk_ids (List[str]): Chunk IDs
+            
+        Returns:
+            List[Document]: Chunks in the order of the IDs (missing chunks are skipped)
+        """
+        if not self.vector_store or not chunk_ids:
+            return []
+        
+        stored = self.vector_store._collection.get(ids=list(chunk_ids), include=["documents", "metadatas"])
+        rows = {
+            chunk_id: (content, metadata)
+            for chunk_id, content, metadata in zip(stored["ids"], stored["documents"], stored["metadatas"])
+        }
+        return [
+            Document(id=chunk_id, page_content=rows[chunk_id][0], metadata=dict(rows[chunk_id][1] or {}))
+            for chunk_id in chunk_ids
+            if chunk_id in rows
+        ]
+    
     def search_by_metadata(self, 
                           metadata_filter: Dict[str, Any], 
                           k: int = 10) -> List[Document]:
@@ -126,17 +388,7 @@ class SearchEngine:
         try:
             logger.info(f"Performing hybrid search for: '{query}'")
             
-            if metadata_filter:
-                results = self.vector_store.similarity_search_with_score(
-                    query, 
-                    k=k,
-                    filter=metadata_filter
-                )
-            else:
-                results = self.vector_store.similarity_search_with_score(
-                    query, 
-                    k=k
-                )
+            results = self._search_with_score(query, k=k, metadata_filter=metadata_filter or None)
             
             # Sort by ascending distance
             results = sorted(results, key=lambda pair: pair[1])
@@ -160,7 +412,9 @@ class SearchEngine:
                                   query: str, 
                                   keywords: List[str] = None,
                                   k: int = 16, 
-                                  score_threshold: Optional[float] = None) -> List[Document]:
+                                  score_threshold: Optional[float] = None,
+                                  top_n: Optional[int] = None,
+                                  token_budget: Optional[int] = None) -> List[Document]:
         """
         Perform hybrid search combining semantic and keyword search
         
@@ -169,6 +423,9 @@ class SearchEngine:
             keywords (List[str]): Additional keywords to search for
             k (int): Maximum number of results
             score_threshold (Optional[float]): Optional maximum distance threshold (ignored for hybrid search)
+            top_n (Optional[int]): Number of results kept when the cross-encoder re-ranking
+                succeeds (k by default); the heuristic fallback returns k results
+            token_budget (Optional[int]): Maximum number of tokens of the returned chunks
             
         Returns:
             List[Document]: List of relevant documents
@@ -180,40 +437,49 @@ class SearchEngine:
         try:
             logger.info(f"Performing hybrid search for: '{query}' with keywords: {keywords}")
             
-            # First, do semantic search without threshold filtering
-            semantic_results = self.similarity_search(query, k=k//2, score_threshold=None)
-            
-            # Then, do keyword search if keywords provided (also without threshold filtering)
-            keyword_results = []
-            if keywords:
-                for keyword in keywords:
-                    keyword_docs = self.similarity_search(keyword, k=k//4, score_threshold=None)
-                    keyword_results.extend(keyword_docs)
-            
-            # Combine all results
-            all_results = semantic_results + keyword_results
+            keywords = keywords or []
+            if self.lexical_index is not None and len(self.lexical_index):
+                # Dense search for the query fused with BM25 search for the query and keywords
+                semantic_results = self.batch_similarity_search([query], k=k)[0]
+                keyword_results = self.lexical_search(" ".join([query] + keywords), k=k)
+                all_results = reciprocal_rank_fusion([semantic_results, keyword_results])
+            else:
+                # Semantic search for the query and every keyword in one batched lookup,
+                # without threshold filtering
+                batch_results = self.batch_similarity_search(
+                    [query] + keywords,
+                    k=[k//2] + [k//4] * len(keywords)
+                )
+                semantic_results = batch_results[0]
+                keyword_results = [doc for docs in batch_results[1:] for doc in docs]
+                
+                # Combine all results
+                all_results = semantic_results + keyword_results
             
-            # Less aggressive deduplication - only remove exact duplicates
-            seen_contents = set()
+            # The same chunk can be returned by several searches
+            seen_ids = set()
             unique_results = []
             for doc in all_results:
-                # Use a more lenient hash to avoid removing similar but different chunks
-                content_hash = hash(doc.page_content[:50])  # Use first 50 chars as hash
-                if content_hash not in seen_contents:
-                    seen_contents.add(content_hash)
+                key = doc.id or doc.page_content
+                if key not in seen_ids:
+                    seen_ids.add(key)
                     unique_results.append(doc)
             
-            # Score chunks based on relevance to user query
-            scored_results = []
-            for doc in unique_results:
-                score = self._calculate_chunk_relevance_score(doc, query, keywords)
-                scored_results.append((doc, score))
+            # Score all chunks against the user query in one pass
+            scores = self._score_candidates(unique_results, query, keywords)
+            
+            # Take the top k relevant and mutually diverse chunks, without near-duplicates
+            # (neighboring chunks share their overlap)
+            final_results = self._select_diverse(unique_results, scores, k)
             
-            # Sort by relevance score (higher is better)
-            scored_results.sort(key=lambda x: x[1], reverse=True)
+            # Optional cross-encoder stage; keeps the heuristic order when over its time budget
+            if self.reranker is not None:
+                reranked = self.reranker.rerank(query, final_results, top_n=top_n or k)
+                if reranked is not None:
+                    final_results = reranked
             
-            # Take top k results
-            final_results = [doc for doc, score in scored_results[:k]]
+            if token_budget is not None:
+                final_results = self._limit_tokens(final_results, token_budget)
             
             logger.info(f"Found {len(final_results)} unique documents (semantic: {len(semantic_results)}, keyword: {len(keyword_results)})")
             return final_results
@@ -222,47 +488,184 @@ class SearchEngine:
             logger.error(f"Error in hybrid search: {e}")
             return []
     
-    def _calculate_chunk_relevance_score(self, doc: Document, query: str, keywords: List[str] = None) -> float:
+    def _stored_embeddings(self, docs: List[Document]) -> Optional[np.ndarray]:
         """
-        Calculate a relevance score for a chunk based on multiple factors
+        Read the embeddings of the chunks from the vector store (no re-encoding)
         
         Args:
-            doc (Document): The document chunk to score
+            docs (List[Document]): Chunks with their IDs
+            
+        Returns:
+            Optional[np.ndarray]: L2-normalized embedding of each chunk, or None if any is missing
+        """
+        ids = [doc.id for doc in docs]
+        if not all(ids):
+            return None
+        
+        stored = self.vector_store._collection.get(ids=ids, include=["embeddings"])
+        rows = dict(zip(stored["ids"], stored["embeddings"]))
+        if any(chunk_id not in rows for chunk_id in ids):
+            return None
+        
+        embeddings = np.asarray([rows[chunk_id] for chunk_id in ids], dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.maximum(norms, 1e-12)
+    
+    def _select_diverse(self, docs: List[Document], scores: np.ndarray, k: int) -> List[Document]:
+        """
+        Select chunks with maximal marginal relevance: each step takes the chunk that
+        maximizes lambda * relevance - (1 - lambda) * max similarity to the chunks already
+        selected; near-duplicates of a selected chunk are never taken
+        
+        Args:
+            docs (List[Document]): Candidate chunks
+            scores (np.ndarray): Relevance score of each chunk (higher is better)
+            k (int): Maximum number of chunks
+            
+        Returns:
+            List[Document]: Selected chunks in selection order
+        """
+        # Sort by relevance score (higher is better, ties keep the retrieval order)
+        order = np.argsort(-scores, kind='stable')
+        
+        try:
+            embeddings = self._stored_embeddings(docs) if len(docs) > 1 else None
+        except Exception as e:
+            logger.warning(f"Could not read chunk embeddings, selecting by relevance only: {e}")
+            embeddings = None
+        if embeddings is None:
+            return [docs[i] for i in order[:k]]
+        
+        # Relevance scaled to [0, 1] so it is comparable with cosine similarities
+        spread = float(scores.max() - scores.min())
+        relevance = (scores - scores.min()) / spread if spread > 0 else np.ones_like(scores)
+        
+        similarity = embeddings @ embeddings.T
+        max_similarity = np.full(len(docs), -np.inf)
+        available = np.ones(len(docs), dtype=bool)
+        selected: List[int] = []
+        
+        while len(selected) < k and available.any():
+            if selected:
+                mmr = self.mmr_lambda * relevance - (1.0 - self.mmr_lambda) * max_similarity
+            else:
+                mmr = relevance.copy()
+            mmr[~available] = -np.inf
+            # Ties resolve to the most relevant chunk
+            best = int(order[np.argmax(mmr[order])])
+            
+            selected.append(best)
+            max_similarity = np.maximum(max_similarity, similarity[best])
+            available[best] = False
+            available &= max_similarity < self.duplicate_threshold
+        
+        removed = len(docs) - len(selected) - int(available.sum())
+        if removed:
+            logger.info(f"Dropped {removed} near-duplicate chunks")
+        return [docs[i] for i in selected]
+    
+    def _limit_tokens(self, docs: List[Document], token_budget: int) -> List[Document]:
+        """
+        Keep chunks in order while they fit in the token budget; chunks too large for the
+        remaining budget are skipped
+        
+        Args:
+            docs (List[Document]): Ranked chunks
+            token_budget (int): Maximum number of tokens
+            
+        Returns:
+            List[Document]: Chunks that fit in the budget
+        """
+        kept = []
+        remaining = token_budget
+        for doc in docs:
+            tokens = count_tokens(doc.page_content)
+            if tokens <= remaining:
+                kept.append(doc)
+                remaining -= tokens
+        return kept
+    
+    def _term_frequencies(self, doc: Document, stemming: bool) -> Dict[str, int]:
+        """Term frequencies of a chunk: precomputed by the lexical index, or computed for unindexed chunks"""
+        if self.lexical_index is not None and doc.id in self.lexical_index:
+            return self.lexical_index.term_frequencies(doc.id)
+        return Counter(analyze(doc.page_content, stemming))
+    
+    def _score_candidates(self, docs: List[Document], query: str, keywords: List[str] = None) -> np.ndarray:
+        """
+        Calculate the relevance score of every candidate chunk at once: the fused
+        (dense + BM25) rank score when the candidates come from reciprocal-rank fusion,
+        otherwise the similarity, plus bonuses for keyword matches, query term matches
+        and an exact phrase match.
+        Matches are computed on the term frequencies stored in the lexical index, as a
+        chunk x term presence matrix
+        
+        Args:
+            docs (List[Document]): Candidate chunks
             query (str): Original user query
             keywords (List[str]): Keywords extracted from the query
             
         Returns:
-            float: Relevance score (higher is better)
+            np.ndarray: Relevance score of each chunk (higher is better)
         """
-        content_lower = doc.page_content.lower()
-        query_lower = query.lower()
+        if not docs:
+            return np.zeros(0)
+        
+        stemming = self.lexical_index.stemming if self.lexical_index is not None else False
+        keyword_terms = [terms for terms in (set(analyze(keyword, stemming)) for keyword in keywords or []) if terms]
+        query_terms = {term for term in analyze(query, stemming) if len(term) > 2 or term.isdigit()}
+        vocabulary = {term: i for i, term in enumerate(sorted(query_terms.union(*keyword_terms)))}
         
-        # Base score from similarity (normalize to 0-1 range)
-        similarity = doc.metadata.get('similarity', 0)
-        base_score = float(similarity) if similarity else 0.0
+        presence = np.zeros((len(docs), len(vocabulary)), dtype=np.float32)
+        for row, doc in enumerate(docs):
+            columns = [vocabulary[term] for term in vocabulary.keys() & self._term_frequencies(doc, stemming).keys()]
+            presence[row, columns] = 1.0
         
-        # Keyword presence bonus
-        keyword_bonus = 0.0
-        if keywords:
-            # Count how many keywords are present in this chunk
-            keyword_matches = sum(1 for keyword in keywords if keyword.lower() in content_lower)
-            # Bonus increases with more keyword matches
-            keyword_bonus = min(0.5, keyword_matches * 0.1)  # Max 0.5 bonus
+        if all('rrf_score' in doc.metadata for doc in docs):
+            # Base score from the fused rank, relative to the best candidate (0-1 range), so a
+            # strong BM25 hit can outrank a weak dense hit
+            fused = np.array([float(doc.metadata['rrf_score']) for doc in docs])
+            scores = fused / fused.max()
+        else:
+            # Base score from similarity (normalize to 0-1 range)
+            scores = np.array([float(doc.metadata.get('similarity') or 0.0) for doc in docs])
+        
+        # Keyword presence bonus: a keyword matches when all of its terms are present
+        if keyword_terms:
+            keyword_matrix = np.zeros((len(keyword_terms), len(vocabulary)), dtype=np.float32)
+            for row, terms in enumerate(keyword_terms):
+                keyword_matrix[row, [vocabulary[term] for term in terms]] = 1.0
+            keyword_matches = (presence @ keyword_matrix.T >= keyword_matrix.sum(axis=1)).sum(axis=1)
+            scores += np.minimum(0.5, keyword_matches * 0.1)  # Max 0.5 bonus
         
         # Query term density bonus
-        query_terms = query_lower.split()
-        query_term_matches = sum(1 for term in query_terms if len(term) > 2 and term in content_lower)
-        query_density_bonus = min(0.3, query_term_matches * 0.05)  # Max 0.3 bonus
+        query_vector = np.zeros(len(vocabulary), dtype=np.float32)
+        query_vector[[vocabulary[term] for term in query_terms]] = 1.0
+        query_term_matches = presence @ query_vector
+        scores += np.minimum(0.3, query_term_matches * 0.05)  # Max 0.3 bonus
         
-        # Exact phrase match bonus
-        exact_phrase_bonus = 0.0
-        if query_lower in content_lower:
-            exact_phrase_bonus = 0.4  # High bonus for exact phrase matches
+        # Exact phrase match bonus, only checked on chunks that contain every query term
+        query_folded = fold_text(query).strip()
+        if query_terms and query_folded:
+            for row in np.flatnonzero(query_term_matches >= len(query_terms)):
+                if query_folded in fold_text(docs[row].page_content):
+                    scores[row] += 0.4  # High bonus for exact phrase matches
         
-        # Combine all scores
-        total_score = base_score + keyword_bonus + query_density_bonus + exact_phrase_bonus
+        return scores
+    
+    def _calculate_chunk_relevance_score(self, doc: Document, query: str, keywords: List[str] = None) -> float:
+        """
+        Calculate a relevance score for a chunk based on multiple factors
         
-        return total_score
+        Args:
+            doc (Document): The document chunk to score
+            query (str): Original user query
+            keywords (List[str]): Keywords extracted from the query
+            
+        Returns:
+            float: Relevance score (higher is better)
+        """
+        return float(self._score_candidates([doc], query, keywords)[0])
     
     def get_search_statistics(self, query: str) -> Dict[str, Any]:
         """
@@ -286,7 +689,8 @@ class SearchEngine:
             "avg_score": sum(scores) / len(scores) if scores else 0,
             "min_score": min(scores) if scores else 0,
             "max_score": max(scores) if scores else 0,
-            "query": query
+            "query": query,
+            "query_cache": self.query_cache.stats()
         }
         
         return stats
@@ -2,20 +2,35 @@
 Chat Module - Responsible for integrating search with AI model to generate responses
 """
 
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI, RateLimitError
 from langchain_core.documents import Document
-from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, AsyncIterator, Iterator, Optional, Tuple
+import asyncio
 import os
 import logging
+import random
+import time
 import unicodedata
 from dotenv import load_dotenv
-import re
+
+from .text_processing import extract_keywords
+from .tokens import count_tokens
+from .caching import AnswerCache, RetrievalCache
 
 # Load environment variables
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+NO_DOCUMENTS_RESPONSE = "Sorry, I couldn't find relevant information about your question in the available documentation."
+EMPTY_RESPONSE = "Desculpe, não consegui gerar uma resposta apropriada."
+ERROR_RESPONSE = "Desculpe, ocorreu um erro ao processar sua pergunta. Tente novamente."
+
+# Retries of a completion rejected by the API rate limit, waiting 1s, 2s, 4s... (plus jitter)
+RATE_LIMIT_RETRIES = 4
+RATE_LIMIT_BACKOFF = 1.0
+
 class RAGChatbot:
     """Class responsible for integrating RAG with AI model for chat"""
     
@@ -23,7 +38,14 @@ class RAGChatbot:
                  search_engine,
                  model: str = "gpt-4o-mini",
                  max_tokens: int = 1000,
-                 temperature: float = 0.7):
+                 temperature: float = 0.7,
+                 rerank_top_n: int = 6,
+                 context_token_budget: int = 3000,
+                 retrieval_workers: int = 4,
+                 generation_workers: int = 4,
+                 answer_cache: Optional[AnswerCache] = None,
+                 retrieval_cache: Optional[RetrievalCache] = None,
+                 index_version: Optional[str] = None):
         """
         Initialize the RAG chatbot
         
@@ -32,11 +54,27 @@ class RAGChatbot:
             model (str): AI model to be used
             max_tokens (int): Maximum number of tokens in the response
             temperature (float): Temperature for response generation
+            rerank_top_n (int): Number of chunks sent to the model when the search engine
+                re-ranks them with a cross-encoder
+            context_token_budget (int): Maximum number of tokens of the chunks sent to the model
+            retrieval_workers (int): Threads running retrieval for the async methods
+            generation_workers (int): Questions generated in parallel by generate_quiz_set
+            answer_cache (Optional[AnswerCache]): Cache of chat answers, shared across requests
+            retrieval_cache (Optional[RetrievalCache]): Cache of search results, shared by chat
+                and question generation
+            index_version (Optional[str]): Version of the knowledge base; cached answers of
+                other versions are discarded
         """
         self.search_engine = search_engine
         self.model = model
         self.max_tokens = max_tokens
         self.temperature = temperature
+        self.rerank_top_n = rerank_top_n
+        self.context_token_budget = context_token_budget
+        self.generation_workers = generation_workers
+        self.answer_cache = answer_cache
+        self.retrieval_cache = retrieval_cache
+        self.index_version = index_version
         
         # Initialize OpenAI client
         api_key = os.getenv("OPENAI_API_KEY")
@@ -44,14 +82,76 @@ class RAGChatbot:
             raise ValueError("OPENAI_API_KEY not found in environment variables")
         
         self.client = OpenAI(api_key=api_key)
+        self.async_client = AsyncOpenAI(api_key=api_key)
+        
+        # Retrieval is CPU bound (embedding model, vector search): the async methods run it
+        # on a bounded pool so the event loop only waits on the network
+        self._retrieval_executor = ThreadPoolExecutor(max_workers=retrieval_workers, thread_name_prefix="rag-retrieval")
         logger.info(f"RAG chatbot initialized with model: {model}")
     
-    def _create_context_from_documents(self, documents: List[Document]) -> str:
+    def _group_adjacent_chunks(self, documents: List[Document]) -> List[List[Document]]:
+        """
+        Group chunks that follow each other on the same page, keeping the rank order:
+        a group takes the position of its best ranked chunk
+        
+        Args:
+            documents (List[Document]): Ranked chunks
+            
+        Returns:
+            List[List[Document]]: Groups of chunks, each sorted by position on the page
+        """
+        groups: List[List[Document]] = []
+        group_of: Dict[Any, int] = {}
+        
+        for doc in documents:
+            page_key = (doc.metadata.get('source'), doc.metadata.get('page'))
+            chunk_index = doc.metadata.get('chunk_index')
+            
+            group = None
+            if chunk_index is not None:
+                group = group_of.get((page_key, chunk_index - 1), group_of.get((page_key, chunk_index + 1)))
+            if group is None:
+                group = len(groups)
+                groups.append([])
+            
+            groups[group].append(doc)
+            if chunk_index is not None:
+                group_of[(page_key, chunk_index)] = group
+        
+        for group in groups:
+            group.sort(key=lambda doc: doc.metadata.get('chunk_index') or 0)
+        return groups
+    
+    def _merge_chunk_texts(self, texts: List[str], max_overlap: int = 400) -> str:
+        """
+        Join consecutive chunk texts, removing the text they share because of the chunk overlap
+        
+        Args:
+            texts (List[str]): Texts of consecutive chunks
+            max_overlap (int): Longest overlap looked for, in characters
+            
+        Returns:
+            str: Merged text
+        """
+        merged = texts[0]
+        for text in texts[1:]:
+            overlap = 0
+            for size in range(min(len(merged), len(text), max_overlap), 0, -1):
+                if merged.endswith(text[:size]):
+                    overlap = size
+                    break
+            merged = merged + text[overlap:] if overlap else f"{merged}\n{text}"
+        return merged
+    
+    def _create_context_from_documents(self, documents: List[Document], token_budget: Optional[int] = None) -> str:
         """
-        Create context from the found documents
+        Create context from the found documents: adjacent chunks of the same page are
+        merged and the best ranked blocks are packed until the token budget is reached
         
         Args:
-            documents (List[Document]): List of relevant documents
+            documents (List[Document]): List of relevant documents, best first
+            token_budget (Optional[int]): Maximum number of context tokens
+                (context_token_budget by default)
             
         Returns:
             str: Formatted context
@@ -59,42 +159,28 @@ class RAGChatbot:
         if not documents:
             return ""
         
+        budget = self.context_token_budget if token_budget is None else token_budget
         context_parts = []
-        agreste_chunks = []
-        
-        for i, doc in enumerate(documents):
-            # Add document information
-            source = doc.metadata.get('source', 'Unknown source')
-            distance = doc.metadata.get('distance', 'N/A')
-            similarity = doc.metadata.get('similarity', 'N/A')
-            context_parts.append(f"Document {i+1} (Distance: {distance}, Similarity: {similarity}):")
-            context_parts.append(f"Source: {source}")
-            context_parts.append(f"Content: {doc.page_content}")
-            context_parts.append("-" * 50)
-            
-            # Check if this chunk contains "agreste"
-            if "agreste" in doc.page_content.lower():
-                agreste_chunks.append({
-                    "index": i+1,
-                    "source": source,
-                    "content": doc.page_content[:200] + "..." if len(doc.page_content) > 200 else doc.page_content,
-                    "similarity": similarity
-                })
-        
-        context = "\n".join(context_parts)
-        
-        # Log agreste chunks if found
-        if agreste_chunks:
-            logger.info(f"Found {len(agreste_chunks)} chunks containing 'agreste':")
-            for chunk in agreste_chunks:
-                logger.info(f"  Chunk {chunk['index']} (similarity: {chunk['similarity']}): {chunk['content']}")
-        else:
-            logger.warning("No chunks containing 'agreste' found in the retrieved documents")
+        used_tokens = 0
         
-        # Temporary logging for debugging (increased to 2000 chars)
-        logger.info(f"Context being sent to GPT (first 2000 chars): {context[:2000]}...")
+        for group in self._group_adjacent_chunks(documents):
+            metadata = group[0].metadata
+            source = metadata.get('file_name') or metadata.get('source', 'Unknown source')
+            page = metadata.get('page')
+            header = f"Source: {source}" + (f" (page {int(page) + 1})" if isinstance(page, (int, float)) else "")
+            content = self._merge_chunk_texts([doc.page_content for doc in group])
+            
+            block = f"Document {len(context_parts) + 1} - {header}\n{content}"
+            tokens = count_tokens(block)
+            if used_tokens + tokens > budget:
+                # Smaller, lower ranked blocks may still fit
+                continue
+            
+            context_parts.append(block)
+            used_tokens += tokens
         
-        return context
+        logger.debug(f"Context: {len(context_parts)} blocks from {len(documents)} chunks, {used_tokens} tokens")
+        return "\n\n".join(context_parts)
     
     def _create_system_prompt(self) -> str:
         """
@@ -305,44 +391,278 @@ Lembre-se de seguir TODAS as regras e a estrutura JSON exata definida em suas in
             query (str): User's question
             
         Returns:
-            List[str]: List of relevant keywords with case variations
+            List[str]: Unique accent- and case-folded keywords, without stopwords
+        """
+        # Case and accent variants of a word embed and match the same way,
+        # so each concept is searched only once
+        return extract_keywords(query)
+
+    def _create_completion(self, **kwargs):
         """
+        Create a chat completion, retrying with exponential backoff when rate limited
         
-        # Remove punctuation and split into words
-        words = re.findall(r'\b\w+\b', query.lower())
+        Args:
+            **kwargs: Arguments of chat.completions.create
+            
+        Returns:
+            ChatCompletion: Model response
+        """
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            try:
+                return self.client.chat.completions.create(**kwargs)
+            except RateLimitError:
+                if attempt == RATE_LIMIT_RETRIES:
+                    raise
+                delay = RATE_LIMIT_BACKOFF * 2 ** attempt + random.uniform(0, RATE_LIMIT_BACKOFF)
+                logger.warning(f"Rate limited by the model API, retrying in {delay:.1f}s")
+                time.sleep(delay)
+    
+    def _search_documents(self, 
+                          query: str, 
+                          k: int, 
+                          score_threshold: Optional[float], 
+                          mode: str = "hybrid",
+                          **search_kwargs) -> List[Document]:
+        """
+        Search documents in the vector store
         
-        # Filter out common stop words and very short words
-        stop_words = {
-            'a', 'o', 'e', 'de', 'da', 'do', 'em', 'um', 'uma', 'com', 'para', 'por', 'se', 'que', 
-            'não', 'na', 'no', 'meu', 'minha', 'me', 'eu', 'você', 'seu', 'sua', 'está', 'estou',
-            'qual', 'quem', 'onde', 'quando', 'como', 'porque', 'qual', 'meu', 'minha',
-            'se', 'está', 'localizado', 'na', 'no', 'em', 'do', 'da', 'de', 'com', 'para', 'por'
-        }
+        Args:
+            query (str): Normalized query
+            k (int): Number of documents to search
+            score_threshold (Optional[float]): Optional maximum distance threshold for filtering (lower is better)
+            mode (str): "hybrid" (semantic + keywords) or "similarity"
+            **search_kwargs: Additional arguments for the hybrid search
+            
+        Returns:
+            List[Document]: Relevant documents, best first
+        """
+        # Search relevant documents using hybrid search
+        if mode == "hybrid" and hasattr(self.search_engine, 'hybrid_search_with_keywords'):
+            # Extract keywords for hybrid search
+            keywords = self._extract_keywords(query)
+            logger.info(f"Extracted keywords: {keywords}")
+            
+            return self.search_engine.hybrid_search_with_keywords(
+                query, 
+                keywords=keywords,
+                k=k, 
+                score_threshold=score_threshold,
+                **search_kwargs
+            )
         
-        # Keep meaningful words (longer than 2 characters and not stop words)
-        meaningful_words = [word for word in words if len(word) > 2 and word not in stop_words]
-        
-        # Generate case variations for each meaningful word
-        keywords = []
-        for word in meaningful_words:
-            # Add original word and common case variations
-            variations = [
-                word,  # original lowercase
-                word.capitalize(),  # first letter uppercase
-                word.upper(),  # all uppercase
-            ]
-            keywords.extend(variations)
-        
-        # Remove duplicates while preserving order
-        unique_keywords = []
-        seen = set()
-        for keyword in keywords:
-            if keyword not in seen:
-                seen.add(keyword)
-                unique_keywords.append(keyword)
-        
-        return unique_keywords
-
+        # Fallback to regular search
+        return self.search_engine.similarity_search(
+            query, 
+            k=k, 
+            score_threshold=score_threshold
+        )
+    
+    def _retrieve_documents(self, 
+                            query: str, 
+                            k: int, 
+                            score_threshold: Optional[float], 
+                            mode: str = "hybrid",
+                            **search_kwargs) -> List[Document]:
+        """
+        Search documents, reusing the results of an identical search on the same index version
+        
+        Args:
+            query (str): Normalized query
+            k (int): Number of documents to search
+            score_threshold (Optional[float]): Optional maximum distance threshold for filtering (lower is better)
+            mode (str): "hybrid" (semantic + keywords) or "similarity"
+            **search_kwargs: Additional arguments for the hybrid search
+            
+        Returns:
+            List[Document]: Relevant documents, best first
+        """
+        cache_key = None
+        if self.retrieval_cache is not None and hasattr(self.search_engine, 'get_documents'):
+            cache_key = self.retrieval_cache.key(mode, query, k, score_threshold, self.index_version, search_kwargs)
+            cached = self.retrieval_cache.get_results(cache_key)
+            if cached is not None:
+                documents = self.search_engine.get_documents([chunk_id for chunk_id, _ in cached])
+                if len(documents) == len(cached):
+                    for doc, (_, scores) in zip(documents, cached):
+                        doc.metadata.update(scores)
+                    logger.info(f"Retrieval served from cache ({len(documents)} documents)")
+                    return documents
+        
+        documents = self._search_documents(query, k, score_threshold, mode, **search_kwargs)
+        
+        # The search methods return [] on errors too: empty results are never cached, so a
+        # transient vector store failure does not stick for the whole index version
+        if cache_key is not None and documents:
+            self.retrieval_cache.put_results(cache_key, documents)
+        return documents
+    
+    def _retrieve_for_chat(self, 
+                           query: str, 
+                           k: int, 
+                           score_threshold: Optional[float]) -> List[Document]:
+        """
+        Search the documents used to answer a question
+        
+        Args:
+            query (str): Normalized user's question
+            k (int): Number of documents to search
+            score_threshold (Optional[float]): Optional maximum distance threshold for filtering (lower is better)
+            
+        Returns:
+            List[Document]: Relevant documents, best first
+        """
+        return self._retrieve_documents(
+            query, 
+            k, 
+            score_threshold, 
+            top_n=self.rerank_top_n, 
+            token_budget=self.context_token_budget
+        )
+    
+    def _create_chat_messages(self, query: str, documents: List[Document]) -> List[Dict[str, str]]:
+        """
+        Create the messages sent to the AI model to answer a question
+        
+        Args:
+            query (str): Normalized user's question
+            documents (List[Document]): Relevant documents
+            
+        Returns:
+            List[Dict[str, str]]: System and user messages
+        """
+        # Create context from the documents
+        context = self._create_context_from_documents(documents)
+        
+        return [
+            {"role": "system", "content": self._create_system_prompt()},
+            {"role": "user", "content": self._create_user_prompt(query, context)}
+        ]
+    
+    def _prepare_chat(self, 
+                      query: str, 
+                      k: int, 
+                      score_threshold: Optional[float]) -> Tuple[List[Document], Optional[List[Dict[str, str]]]]:
+        """
+        Retrieve the documents of a question and create the messages sent to the AI model
+        
+        Args:
+            query (str): Normalized user's question
+            k (int): Number of documents to search
+            score_threshold (Optional[float]): Optional maximum distance threshold for filtering (lower is better)
+            
+        Returns:
+            Tuple[List[Document], Optional[List[Dict[str, str]]]]: Relevant documents and
+                messages (None when no document was found)
+        """
+        relevant_docs = self._retrieve_for_chat(query, k, score_threshold)
+        if not relevant_docs:
+            return [], None
+        return relevant_docs, self._create_chat_messages(query, relevant_docs)
+    
+    async def _aprepare_chat(self, 
+                             query: str, 
+                             k: int, 
+                             score_threshold: Optional[float]) -> Tuple[List[Document], Optional[List[Dict[str, str]]]]:
+        """Run _prepare_chat on the retrieval thread pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._retrieval_executor, self._prepare_chat, query, k, score_threshold)
+    
+    def _cached_answer(self, 
+                       query: str, 
+                       k: int, 
+                       score_threshold: Optional[float]) -> Tuple[Optional[Dict[str, Any]], Optional[List[float]]]:
+        """
+        Look up the answer of a question in the answer cache
+        
+        Args:
+            query (str): Normalized user's question
+            k (int): Number of documents to search
+            score_threshold (Optional[float]): Optional maximum distance threshold for filtering
+            
+        Returns:
+            Tuple[Optional[Dict[str, Any]], Optional[List[float]]]: Cached answer (None on a
+                miss) and the question embedding used for similarity matching, if any
+        """
+        if self.answer_cache is None:
+            return None, None
+        
+        embedding = None
+        if self.answer_cache.similarity_threshold is not None and hasattr(self.search_engine, 'embed_query'):
+            # Cached by the search engine, so retrieval does not encode the question again
+            embedding = self.search_engine.embed_query(query)
+        
+        answer = self.answer_cache.get_answer(query, self.index_version, (k, score_threshold), embedding)
+        if answer is not None:
+            answer["cached"] = True
+            logger.info("Answer served from the answer cache")
+        return answer, embedding
+    
+    async def _acached_answer(self, 
+                              query: str, 
+                              k: int, 
+                              score_threshold: Optional[float]) -> Tuple[Optional[Dict[str, Any]], Optional[List[float]]]:
+        """Run _cached_answer on the retrieval thread pool (it may encode the question)"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._retrieval_executor, self._cached_answer, query, k, score_threshold)
+    
+    def _cache_answer(self, 
+                      query: str, 
+                      k: int, 
+                      score_threshold: Optional[float], 
+                      result: Dict[str, Any], 
+                      embedding: Optional[List[float]]) -> None:
+        """Store an answer grounded on documents in the answer cache"""
+        if self.answer_cache is not None and result.get("sources") and result.get("confidence") != "error":
+            self.answer_cache.put_answer(query, self.index_version, result, (k, score_threshold), embedding)
+    
+    def _answer_events(self, answer: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Stream events of a complete (cached) answer"""
+        return [
+            {"event": "sources", "data": {key: value for key, value in answer.items() if key != "response"}},
+            {"event": "token", "data": {"content": answer["response"]}},
+            {"event": "done", "data": {"response": answer["response"]}}
+        ]
+    
+    def _describe_sources(self, documents: List[Document]) -> Dict[str, Any]:
+        """
+        Describe the sources of an answer and the confidence derived from their similarity
+        
+        Args:
+            documents (List[Document]): Documents used to answer
+            
+        Returns:
+            Dict[str, Any]: sources, confidence, avg_score and documents_used
+        """
+        # Prepare source information
+        sources = []
+        for doc in documents:
+            source_info = {
+                "source": doc.metadata.get('source', 'Unknown source'),
+                "file_name": doc.metadata.get('file_name', 'N/A'),
+                "distance": doc.metadata.get('distance', 'N/A'),
+                "similarity": doc.metadata.get('similarity', 'N/A')
+            }
+            sources.append(source_info)
+        
+        # Determine confidence level using derived similarity if available
+        similarities = [doc.metadata.get('similarity') for doc in documents if isinstance(doc.metadata.get('similarity'), (int, float))]
+        if similarities:
+            avg_similarity = sum(similarities) / len(similarities)
+        else:
+            # Fallback: try previous key or default
+            scores = [doc.metadata.get('similarity_score', 0) for doc in documents]
+            # If "similarity_score" was actually a distance, transform it
+            avg_similarity = sum([1.0 / (1.0 + float(s)) if isinstance(s, (int, float)) else 0 for s in scores]) / len(scores) if scores else 0
+        
+        confidence = "high" if avg_similarity > 0.8 else "medium" if avg_similarity > 0.6 else "low"
+        
+        return {
+            "sources": sources,
+            "confidence": confidence,
+            "avg_score": avg_similarity,  # keep key name for compatibility; now represents similarity in [0,1]
+            "documents_used": len(documents)
+        }
+    
     def chat(self, 
              query: str, 
              k: int = 24, 
@@ -364,55 +684,24 @@ Lembre-se de seguir TODAS as regras e a estrutura JSON exata definida em suas in
             
             logger.info(f"Processing question: '{normalized_query}'")
             
-            # Search relevant documents using regular similarity search
-            # relevant_docs = self.search_engine.similarity_search(
-            #     normalized_query, 
-            #     k=k, 
-            #     score_threshold=score_threshold
-            # )
-
-            # Extract keywords for hybrid search
-            keywords = self._extract_keywords(normalized_query)
-            logger.info(f"Extracted keywords: {keywords}")
+            cached, query_embedding = self._cached_answer(normalized_query, k, score_threshold)
+            if cached is not None:
+                return cached
             
-            # Search relevant documents using hybrid search
-            if hasattr(self.search_engine, 'hybrid_search_with_keywords'):
-                relevant_docs = self.search_engine.hybrid_search_with_keywords(
-                    normalized_query, 
-                    keywords=keywords,
-                    k=k, 
-                    score_threshold=score_threshold
-                )
-            else:
-                # Fallback to regular search
-                relevant_docs = self.search_engine.similarity_search(
-                    normalized_query, 
-                    k=k, 
-                    score_threshold=score_threshold
-                )
+            relevant_docs, messages = self._prepare_chat(normalized_query, k, score_threshold)
             
             if not relevant_docs:
                 logger.warning("No relevant documents found")
                 return {
-                    "response": "Sorry, I couldn't find relevant information about your question in the available documentation.",
+                    "response": NO_DOCUMENTS_RESPONSE,
                     "sources": [],
                     "confidence": "low"
                 }
             
-            # Create context from the documents
-            context = self._create_context_from_documents(relevant_docs)
-            
-            # Create prompts
-            system_prompt = self._create_system_prompt()
-            user_prompt = self._create_user_prompt(normalized_query, context)
-            
             # Generate response
             response = self.client.chat.completions.create(
                 model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
+                messages=messages,
                 max_tokens=self.max_tokens,
                 temperature=self.temperature
             )
@@ -421,50 +710,228 @@ Lembre-se de seguir TODAS as regras e a estrutura JSON exata definida em suas in
             if response.choices and response.choices[0].message:
                 ai_response = response.choices[0].message.content.strip()
             else:
-                ai_response = "Desculpe, não consegui gerar uma resposta apropriada."
+                ai_response = EMPTY_RESPONSE
             
-            # Prepare source information
-            sources = []
-            for doc in relevant_docs:
-                source_info = {
-                    "source": doc.metadata.get('source', 'Unknown source'),
-                    "file_name": doc.metadata.get('file_name', 'N/A'),
-                    "distance": doc.metadata.get('distance', 'N/A'),
-                    "similarity": doc.metadata.get('similarity', 'N/A')
+            result = {"response": ai_response, **self._describe_sources(relevant_docs)}
+            self._cache_answer(normalized_query, k, score_threshold, result, query_embedding)
+            
+            logger.info(f"Response generated with confidence: {result['confidence']}")
+            return result
+            
+        except Exception as e:
+            logger.error(f"Error processing chat: {e}")
+            return {
+                "response": ERROR_RESPONSE,
+                "sources": [],
+                "confidence": "error",
+                "error": str(e)
+            }
+    
+    def chat_stream(self, 
+                    query: str, 
+                    k: int = 24, 
+                    score_threshold: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Process a user's question and stream the response as it is generated
+        
+        Args:
+            query (str): User's question
+            k (int): Number of documents to search
+            score_threshold (Optional[float]): Optional maximum distance threshold for filtering (lower is better)
+            
+        Yields:
+            Dict[str, Any]: Events with an "event" name and its "data": first "sources"
+                (sources, confidence, avg_score, documents_used), then one "token" per
+                generated fragment ({"content": ...}) and finally "done" ({"response": ...}),
+                or "error" ({"response": ..., "error": ...})
+        """
+        try:
+            # Normalize the query
+            normalized_query = unicodedata.normalize('NFC', query)
+            
+            logger.info(f"Processing question (streaming): '{normalized_query}'")
+            
+            cached, query_embedding = self._cached_answer(normalized_query, k, score_threshold)
+            if cached is not None:
+                for event in self._answer_events(cached):
+                    yield event
+                return
+            
+            relevant_docs, messages = self._prepare_chat(normalized_query, k, score_threshold)
+            
+            if not relevant_docs:
+                logger.warning("No relevant documents found")
+                for event in self._no_documents_events():
+                    yield event
+                return
+            
+            # Sources are known before the model starts answering
+            sources_info = self._describe_sources(relevant_docs)
+            yield {"event": "sources", "data": sources_info}
+            
+            stream = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                max_tokens=self.max_tokens,
+                temperature=self.temperature,
+                stream=True
+            )
+            
+            parts = []
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                content = chunk.choices[0].delta.content
+                if content:
+                    parts.append(content)
+                    yield {"event": "token", "data": {"content": content}}
+            
+            ai_response = "".join(parts).strip() or EMPTY_RESPONSE
+            self._cache_answer(normalized_query, k, score_threshold, {"response": ai_response, **sources_info}, query_embedding)
+            logger.info(f"Streamed response of {len(ai_response)} characters")
+            yield {"event": "done", "data": {"response": ai_response}}
+            
+        except Exception as e:
+            logger.error(f"Error processing chat stream: {e}")
+            yield {"event": "error", "data": {"response": ERROR_RESPONSE, "error": str(e)}}
+
+    async def achat(self, 
+                    query: str, 
+                    k: int = 24, 
+                    score_threshold: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Async version of chat: retrieval runs on a thread pool and the AI model is
+        called with the async client, so many questions can be in flight at once
+        
+        Args:
+            query (str): User's question
+            k (int): Number of documents to search
+            score_threshold (Optional[float]): Optional maximum distance threshold for filtering (lower is better)
+            
+        Returns:
+            Dict[str, Any]: Response with detailed information
+        """
+        try:
+            # Normalize the query
+            normalized_query = unicodedata.normalize('NFC', query)
+            
+            logger.info(f"Processing question (async): '{normalized_query}'")
+            
+            cached, query_embedding = await self._acached_answer(normalized_query, k, score_threshold)
+            if cached is not None:
+                return cached
+            
+            relevant_docs, messages = await self._aprepare_chat(normalized_query, k, score_threshold)
+            
+            if not relevant_docs:
+                logger.warning("No relevant documents found")
+                return {
+                    "response": NO_DOCUMENTS_RESPONSE,
+                    "sources": [],
+                    "confidence": "low"
                 }
-                sources.append(source_info)
             
-            # Determine confidence level using derived similarity if available
-            similarities = [doc.metadata.get('similarity') for doc in relevant_docs if isinstance(doc.metadata.get('similarity'), (int, float))]
-            if similarities:
-                avg_similarity = sum(similarities) / len(similarities)
-            else:
-                # Fallback: try previous key or default
-                scores = [doc.metadata.get('similarity_score', 0) for doc in relevant_docs]
-                # If "similarity_score" was actually a distance, transform it
-                avg_similarity = sum([1.0 / (1.0 + float(s)) if isinstance(s, (int, float)) else 0 for s in scores]) / len(scores) if scores else 0
+            # Generate response
+            response = await self.async_client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                max_tokens=self.max_tokens,
+                temperature=self.temperature
+            )
             
-            confidence = "high" if avg_similarity > 0.8 else "medium" if avg_similarity > 0.6 else "low"
+            # Extract response
+            if response.choices and response.choices[0].message:
+                ai_response = response.choices[0].message.content.strip()
+            else:
+                ai_response = EMPTY_RESPONSE
             
-            result = {
-                "response": ai_response,
-                "sources": sources,
-                "confidence": confidence,
-                "avg_score": avg_similarity,  # keep key name for compatibility; now represents similarity in [0,1]
-                "documents_used": len(relevant_docs)
-            }
+            result = {"response": ai_response, **self._describe_sources(relevant_docs)}
+            self._cache_answer(normalized_query, k, score_threshold, result, query_embedding)
             
-            logger.info(f"Response generated with confidence: {confidence}")
+            logger.info(f"Response generated with confidence: {result['confidence']}")
             return result
             
         except Exception as e:
             logger.error(f"Error processing chat: {e}")
             return {
-                "response": "Desculpe, ocorreu um erro ao processar sua pergunta. Tente novamente.",
+                "response": ERROR_RESPONSE,
                 "sources": [],
                 "confidence": "error",
                 "error": str(e)
             }
+    
+    async def achat_stream(self, 
+                           query: str, 
+                           k: int = 24, 
+                           score_threshold: Optional[float] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Async version of chat_stream
+        
+        Args:
+            query (str): User's question
+            k (int): Number of documents to search
+            score_threshold (Optional[float]): Optional maximum distance threshold for filtering (lower is better)
+            
+        Yields:
+            Dict[str, Any]: Same events as chat_stream
+        """
+        try:
+            # Normalize the query
+            normalized_query = unicodedata.normalize('NFC', query)
+            
+            logger.info(f"Processing question (async streaming): '{normalized_query}'")
+            
+            cached, query_embedding = await self._acached_answer(normalized_query, k, score_threshold)
+            if cached is not None:
+                for event in self._answer_events(cached):
+                    yield event
+                return
+            
+            relevant_docs, messages = await self._aprepare_chat(normalized_query, k, score_threshold)
+            
+            if not relevant_docs:
+                logger.warning("No relevant documents found")
+                for event in self._no_documents_events():
+                    yield event
+                return
+            
+            # Sources are known before the model starts answering
+            sources_info = self._describe_sources(relevant_docs)
+            yield {"event": "sources", "data": sources_info}
+            
+            stream = await self.async_client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                max_tokens=self.max_tokens,
+                temperature=self.temperature,
+                stream=True
+            )
+            
+            parts = []
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                content = chunk.choices[0].delta.content
+                if content:
+                    parts.append(content)
+                    yield {"event": "token", "data": {"content": content}}
+            
+            ai_response = "".join(parts).strip() or EMPTY_RESPONSE
+            self._cache_answer(normalized_query, k, score_threshold, {"response": ai_response, **sources_info}, query_embedding)
+            logger.info(f"Streamed response of {len(ai_response)} characters")
+            yield {"event": "done", "data": {"response": ai_response}}
+            
+        except Exception as e:
+            logger.error(f"Error processing chat stream: {e}")
+            yield {"event": "error", "data": {"response": ERROR_RESPONSE, "error": str(e)}}
+    
+    def _no_documents_events(self) -> List[Dict[str, Any]]:
+        """Events streamed when no relevant document was found"""
+        return [
+            {"event": "sources", "data": {"sources": [], "confidence": "low", "avg_score": 0, "documents_used": 0}},
+            {"event": "token", "data": {"content": NO_DOCUMENTS_RESPONSE}},
+            {"event": "done", "data": {"response": NO_DOCUMENTS_RESPONSE}}
+        ]
 
     def generate_multiple_choice_question(self, 
                                         topic: str, 
@@ -488,11 +955,7 @@ Lembre-se de seguir TODAS as regras e a estrutura JSON exata definida em suas in
             logger.info(f"Generating multiple choice question for topic: '{normalized_topic}'")
             
             # Search relevant documents
-            relevant_docs = self.search_engine.similarity_search(
-                normalized_topic, 
-                k=k, 
-                score_threshold=score_threshold
-            )
+            relevant_docs = self._retrieve_documents(normalized_topic, k, score_threshold, mode="similarity")
             
             if not relevant_docs:
                 logger.warning("No relevant documents found for question generation")
@@ -513,7 +976,7 @@ Lembre-se de seguir TODAS as regras e a estrutura JSON exata definida em suas in
             user_prompt = self._create_user_prompt_for_quiz(normalized_topic, context)
             
             # Generate question
-            response = self.client.chat.completions.create(
+            response = self._create_completion(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -623,37 +1086,49 @@ Lembre-se de seguir TODAS as regras e a estrutura JSON exata definida em suas in
                 "sources": []
             }
 
-    def generate_challenges_and_questions(self, 
-                                          topic: str, 
-                                          difficulty: str, 
-                                          type: str, 
-                                          k: int = 10, 
-                                          score_threshold: float = 0.7) -> Dict[str, Any]:
+    def _retrieve_for_challenge(self, 
+                                normalized_topic: str, 
+                                k: int, 
+                                score_threshold: float) -> List[Document]:
         """
-        Generates a set of challenges and questions of contextualization based on the topic.
+        Search the documents a challenge about a topic is generated from
+        
+        Args:
+            normalized_topic (str): Normalized topic
+            k (int): Number of documents to search
+            score_threshold (float): Maximum distance threshold for filtering (lower is better)
+            
+        Returns:
+            List[Document]: Relevant documents, best first
+        """
+        # Use hybrid search for better accuracy with specific terms; every difficulty
+        # and type of the same topic shares one retrieval through the cache
+        return self._retrieve_documents(
+            normalized_topic,
+            k,
+            score_threshold,
+            token_budget=self.context_token_budget
+        )
+
+    def _generate_challenge(self, 
+                            topic: str, 
+                            difficulty: str, 
+                            type: str, 
+                            relevant_docs: List[Document]) -> Dict[str, Any]:
+        """
+        Generate challenges and questions from already retrieved documents
+        
+        Args:
+            topic (str): Topic as given by the caller
+            difficulty (str): Difficulty level
+            type (str): Challenge type
+            relevant_docs (List[Document]): Documents retrieved for the topic
+            
+        Returns:
+            Dict[str, Any]: Generated challenges, questions and sources, or an error
         """
         try:
             normalized_topic = unicodedata.normalize('NFC', topic)
-            logger.info(f"Generating challenges for the topic: '{normalized_topic}' with difficulty '{difficulty}' and type '{type}'")
-
-            # Use hybrid search for better accuracy with specific terms
-            keywords = self._extract_keywords(normalized_topic)
-            logger.info(f"Extracted keywords for challenge generation: {keywords}")
-
-            if hasattr(self.search_engine, 'hybrid_search_with_keywords'):
-                relevant_docs = self.search_engine.hybrid_search_with_keywords(
-                    normalized_topic,
-                    keywords=keywords,
-                    k=k,
-                    score_threshold=score_threshold
-                )
-            else:
-                # Fallback to regular search
-                relevant_docs = self.search_engine.similarity_search(
-                    normalized_topic,
-                    k=k,
-                    score_threshold=score_threshold
-                )
 
             if not relevant_docs:
                 logger.warning("No relevant document found for challenge generation.")
@@ -664,7 +1139,7 @@ Lembre-se de seguir TODAS as regras e a estrutura JSON exata definida em suas in
             system_prompt = self._create_system_prompt_for_challenge()
             user_prompt = self._create_user_prompt_for_challenge(normalized_topic, difficulty, type, context)
 
-            response = self.client.chat.completions.create(
+            response = self._create_completion(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -695,10 +1170,77 @@ Lembre-se de seguir TODAS as regras e a estrutura JSON exata definida em suas in
             logger.error(f"Erro ao gerar desafios: {e}")
             return {"error": f"Ocorreu um erro inesperado: {str(e)}"}
 
+    def generate_challenges_and_questions(self, 
+                                          topic: str, 
+                                          difficulty: str, 
+                                          type: str, 
+                                          k: int = 10, 
+                                          score_threshold: float = 0.7) -> Dict[str, Any]:
+        """
+        Generates a set of challenges and questions of contextualization based on the topic.
+        """
+        try:
+            normalized_topic = unicodedata.normalize('NFC', topic)
+            logger.info(f"Generating challenges for the topic: '{normalized_topic}' with difficulty '{difficulty}' and type '{type}'")
+
+            relevant_docs = self._retrieve_for_challenge(normalized_topic, k, score_threshold)
+
+        except Exception as e:
+            logger.error(f"Erro ao gerar desafios: {e}")
+            return {"error": f"Ocorreu um erro inesperado: {str(e)}"}
+
+        return self._generate_challenge(topic, difficulty, type, relevant_docs)
+
+    def generate_challenge_set(self, 
+                               requests: List[Dict[str, str]], 
+                               k: int = 10, 
+                               score_threshold: float = 0.7,
+                               max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Generate challenges for many (topic, difficulty, type) combinations
+        
+        Every topic is retrieved once, then the model calls of all the combinations run
+        in parallel
+        
+        Args:
+            requests (List[Dict[str, str]]): "topic", "difficulty" and "type" of each challenge
+            k (int): Number of documents to search per topic
+            score_threshold (float): Maximum distance threshold for filtering (lower is better)
+            max_workers (Optional[int]): Model calls in parallel (generation_workers by default)
+            
+        Returns:
+            List[Dict[str, Any]]: Result of each request, in order (an "error" key on failure)
+        """
+        if not requests:
+            return []
+        
+        def retrieve(normalized_topic):
+            try:
+                return self._retrieve_for_challenge(normalized_topic, k, score_threshold)
+            except Exception as e:
+                logger.error(f"Erro ao buscar documentos para '{normalized_topic}': {e}")
+                return []
+        
+        def generate(request):
+            normalized_topic = unicodedata.normalize('NFC', request["topic"])
+            logger.info(f"Generating challenges for the topic: '{normalized_topic}' with difficulty '{request['difficulty']}' and type '{request['type']}'")
+            return self._generate_challenge(request["topic"], request["difficulty"], request["type"], documents[normalized_topic])
+        
+        topics = list(dict.fromkeys(unicodedata.normalize('NFC', request["topic"]) for request in requests))
+        workers = max_workers or self.generation_workers
+        with ThreadPoolExecutor(max_workers=min(workers, len(requests)), thread_name_prefix="rag-challenge") as executor:
+            documents = dict(zip(topics, executor.map(retrieve, topics)))
+            logger.info(f"Retrieved {len(topics)} topics for {len(requests)} challenges")
+            results = list(executor.map(generate, requests))
+        
+        logger.info(f"Challenge set generated: {sum('error' not in result for result in results)}/{len(results)} successful")
+        return results
+
     def generate_quiz_set(self, 
                          topics: List[str], 
                          k: int = 4, 
-                         score_threshold: float = 0.7) -> Dict[str, Any]:
+                         score_threshold: float = 0.7,
+                         max_workers: Optional[int] = None) -> Dict[str, Any]:
         """
         Generate a set of multiple choice questions for multiple topics
         
@@ -706,9 +1248,10 @@ Lembre-se de seguir TODAS as regras e a estrutura JSON exata definida em suas in
             topics (List[str]): List of topics to generate questions about
             k (int): Number of documents to search per topic
             score_threshold (float): Minimum similarity score
+            max_workers (Optional[int]): Questions generated in parallel (generation_workers by default)
             
         Returns:
-            Dict[str, Any]: Set of generated questions
+            Dict[str, Any]: Set of generated questions, in the order of the topics
         """
         quiz_set = {
             "questions": [],
@@ -718,11 +1261,20 @@ Lembre-se de seguir TODAS as regras e a estrutura JSON exata definida em suas in
             "topics": topics
         }
         
-        for i, topic in enumerate(topics):
+        if not topics:
+            return quiz_set
+        
+        def generate(indexed_topic):
+            i, topic = indexed_topic
             logger.info(f"Generating question {i+1}/{len(topics)} for topic: {topic}")
-            
-            question_result = self.generate_multiple_choice_question(topic)
-            
+            return self.generate_multiple_choice_question(topic, k, score_threshold)
+        
+        # Retrieval and the model call of every topic run in parallel; map keeps the topic order
+        workers = min(max_workers or self.generation_workers, len(topics))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rag-quiz") as executor:
+            results = list(executor.map(generate, enumerate(topics)))
+        
+        for topic, question_result in zip(topics, results):
             if "error" in question_result:
                 quiz_set["failed_questions"] += 1
                 logger.warning(f"Failed to generate question for topic '{topic}': {question_result['error']}")
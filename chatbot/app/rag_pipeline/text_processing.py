@@ -0,0 +1,119 @@
+"""
+Text Processing Module - Normalization and tokenization shared by lexical indexing and search
+"""
+
+from typing import FrozenSet, List
+import re
+import unicodedata
+
+# Ordinal indicators and degree signs are dropped so "art. 5º", "art. 5o" and "art. 5°" match "art 5"
+_ORDINAL_MARKS = str.maketrans('', '', 'ºª°')
+_TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+# Portuguese function words plus the question words users start their questions with,
+# in folded form (no accents) since they are compared with folded tokens
+PORTUGUESE_STOPWORDS: FrozenSet[str] = frozenset("""
+    a ao aos aquela aquelas aquele aqueles aquilo as ate com como da das de dela delas dele deles
+    depois do dos e ela elas ele eles em entre era eram essa essas esse esses esta estas este estes
+    estou estao eu foi foram ha isso isto ja la lhe lhes mais mas me mesmo meu meus minha minhas
+    muito na nao nas nem no nos nossa nossas nosso nossos num numa o os ou para pela pelas pelo pelos
+    por qual quais quando que quem se sem ser seu seus so sua suas tambem te tem ter teu tua um uma
+    umas uns voce voces vos
+    onde porque quanto quanta quantos quantas localizado localizada sobre pode posso devo
+    gostaria saber explique explica
+""".split())
+
+# Plural endings and their singular form, longest first (after accent folding: "oes" was "ões")
+_PLURAL_SUFFIXES = (
+    ('oes', 'ao'), ('aes', 'ao'), ('ais', 'al'), ('eis', 'el'), ('ois', 'ol'),
+    ('res', 'r'), ('zes', 'z'), ('ses', 's'), ('ns', 'm'), ('is', 'il'), ('s', '')
+)
+
+
+def fold_text(text: str) -> str:
+    """
+    Lowercase a text and remove its accent marks (NFKD folding, as in utils.string_functions)
+
+    Args:
+        text (str): Text to fold
+
+    Returns:
+        str: Folded text
+    """
+    text = unicodedata.normalize('NFKD', text.translate(_ORDINAL_MARKS).lower())
+    return text.encode('ascii', 'ignore').decode('ascii')
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split a text into accent-folded alphanumeric tokens
+
+    Args:
+        text (str): Text to tokenize
+
+    Returns:
+        List[str]: Tokens in order of appearance
+    """
+    return _TOKEN_PATTERN.findall(fold_text(text))
+
+
+def stem(token: str) -> str:
+    """
+    Light Portuguese stemming: reduce plural forms to the singular
+    ("incentivos" -> "incentivo", "operacoes" -> "operacao", "industriais" -> "industrial")
+
+    Args:
+        token (str): Folded token
+
+    Returns:
+        str: Stemmed token
+    """
+    if len(token) <= 3 or token.isdigit():
+        return token
+    for suffix, replacement in _PLURAL_SUFFIXES:
+        # Keep at least two letters of the word itself: "pais" is not the plural of "p"
+        if token.endswith(suffix) and len(token) - len(suffix) >= 2:
+            # "is" -> "il" only for words like "fuzis"; "pais" or "mais" stay untouched
+            if suffix == 'is' and len(token) <= 5:
+                return token
+            if suffix == 's' and token.endswith(('us', 'ss')):
+                return token
+            return token[:-len(suffix)] + replacement
+    return token
+
+
+def analyze(text: str, stemming: bool = False) -> List[str]:
+    """
+    Tokenize a text and optionally stem its tokens
+
+    Args:
+        text (str): Text to analyze
+        stemming (bool): Reduce plural forms to the singular
+
+    Returns:
+        List[str]: Tokens in order of appearance
+    """
+    tokens = tokenize(text)
+    return [stem(token) for token in tokens] if stemming else tokens
+
+
+def extract_keywords(text: str) -> List[str]:
+    """
+    Extract the unique meaningful terms of a text: folded tokens without stopwords and
+    without words of up to two letters (numbers such as article numbers are kept)
+
+    Args:
+        text (str): Text to extract keywords from
+
+    Returns:
+        List[str]: Unique folded keywords in order of appearance
+    """
+    keywords = []
+    seen = set()
+    for token in tokenize(text):
+        if token in seen or token in PORTUGUESE_STOPWORDS:
+            continue
+        if len(token) > 2 or token.isdigit():
+            seen.add(token)
+            keywords.append(token)
+    return keywords
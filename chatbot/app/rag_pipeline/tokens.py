@@ -0,0 +1,43 @@
+"""
+Tokens Module - Token counting for prompt budgets
+"""
+
+from functools import lru_cache
+from typing import Optional
+import logging
+
+import tiktoken
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOKEN_MODEL = "gpt-4o-mini"
+FALLBACK_ENCODING = "o200k_base"
+
+
+@lru_cache(maxsize=8)
+def _get_encoding(model: str) -> Optional["tiktoken.Encoding"]:
+    """Return the tokenizer of a model, or None if it cannot be loaded (e.g. offline on first use)"""
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding(FALLBACK_ENCODING)
+    except Exception as e:
+        logger.warning(f"Could not load tokenizer for {model}, estimating token counts: {e}")
+        return None
+
+
+def count_tokens(text: str, model: str = DEFAULT_TOKEN_MODEL) -> int:
+    """
+    Count the tokens of a text for a chat model
+
+    Args:
+        text (str): Text to count
+        model (str): Model whose tokenizer is used
+
+    Returns:
+        int: Number of tokens (estimated as 4 characters per token without a tokenizer)
+    """
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
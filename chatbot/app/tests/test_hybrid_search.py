@@ -0,0 +1,71 @@
+"""
+Tests of the hybrid (dense + BM25) search ranking
+"""
+
+import unittest
+
+import numpy as np
+from langchain_core.documents import Document
+
+from rag_pipeline.lexical_index import BM25Index
+from rag_pipeline.step4_search import SearchEngine
+
+
+class _FakeCollection:
+    """Chroma collection returning orthogonal embeddings, so MMR never drops a chunk as a duplicate"""
+
+    def __init__(self, ids):
+        self.embeddings = {chunk_id: np.eye(len(ids))[i].tolist() for i, chunk_id in enumerate(ids)}
+
+    def get(self, ids, include):
+        return {"ids": ids, "embeddings": [self.embeddings[chunk_id] for chunk_id in ids]}
+
+
+class _FakeVectorStore:
+    def __init__(self, ids):
+        self._collection = _FakeCollection(ids)
+
+
+def _chunk(chunk_id, text, similarity):
+    return Document(id=chunk_id, page_content=text, metadata={"similarity": similarity, "distance": 1.0 / similarity - 1.0})
+
+
+class HybridSearchRankingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.chunks = {
+            "dense-1": _chunk("dense-1", "Regras gerais de benefícios fiscais do estado.", 0.62),
+            "dense-2": _chunk("dense-2", "Procedimentos administrativos de concessão.", 0.60),
+            "dense-3": _chunk("dense-3", "Obrigações acessórias das empresas beneficiárias.", 0.58),
+            "bm25-1": _chunk("bm25-1", "O crédito presumido do Proind é de 12% sobre as vendas.", 0.45),
+        }
+        self.lexical_index = BM25Index("unused.bm25.json.gz")
+        self.lexical_index.add((chunk_id, doc.page_content, "hash") for chunk_id, doc in self.chunks.items())
+
+        self.engine = SearchEngine(_FakeVectorStore(list(self.chunks)), lexical_index=self.lexical_index)
+        # Dense search misses the BM25 hit; BM25 ranks it first
+        self.engine.batch_similarity_search = lambda queries, k, metadata_filter=None: [
+            [self.chunks["dense-1"], self.chunks["dense-2"], self.chunks["dense-3"]]
+        ]
+        self.engine.lexical_search = lambda query, k: [self.chunks["bm25-1"]]
+
+    def test_bm25_only_hit_outranks_weaker_dense_hit(self):
+        results = self.engine.hybrid_search_with_keywords("alíquota xyz", keywords=[], k=4)
+        ranking = [doc.id for doc in results]
+
+        # Fused ranks: bm25-1 (BM25 rank 1) scores 1/61, dense-3 (dense rank 3) scores 1/63
+        self.assertLess(ranking.index("bm25-1"), ranking.index("dense-3"))
+        self.assertLess(ranking.index("bm25-1"), ranking.index("dense-2"))
+
+    def test_fused_score_is_the_base_relevance(self):
+        docs = [self.chunks["dense-3"], self.chunks["bm25-1"]]
+        docs[0].metadata["rrf_score"] = 1.0 / 63
+        docs[1].metadata["rrf_score"] = 1.0 / 61
+        scores = self.engine._score_candidates(docs, "alíquota xyz", [])
+
+        self.assertGreater(scores[1], scores[0])
+        self.assertAlmostEqual(scores[1], 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
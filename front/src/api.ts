@@ -342,6 +342,12 @@ const chatbotApi = axios.create({
     },
 });
 
+const GENERATION_POLL_INTERVAL_MS = 2000;
+const GENERATION_TIMEOUT_MS = 15 * 60 * 1000;
+
+const sleep = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
+
+// Challenge generation runs in a background job: queue it, then poll until the challenge is saved
 export const generateQuestions = async (data: {
   program: string;
   track: string;
@@ -351,7 +357,23 @@ export const generateQuestions = async (data: {
 }) => {
   try {
     const response = await chatbotApi.post("/generate-question/", data);
-    return response.data;
+    let job = response.data;
+    const deadline = Date.now() + GENERATION_TIMEOUT_MS;
+
+    while (job.status === "PENDING" || job.status === "RUNNING") {
+      if (Date.now() > deadline) {
+        throw new Error("Tempo esgotado aguardando a geração do desafio");
+      }
+      await sleep(GENERATION_POLL_INTERVAL_MS);
+      const statusResponse = await chatbotApi.get(`/generate-question/jobs/${job.id}/`);
+      job = statusResponse.data;
+    }
+
+    if (job.status !== "SUCCEEDED") {
+      throw new Error(job.error || "Erro ao gerar desafio");
+    }
+    // Persisted Challenge with IDs
+    return job.challenge;
   } catch (error) {
     throw error;
   }